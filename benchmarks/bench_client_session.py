@@ -0,0 +1,62 @@
+""" Benchmarks requests/sec of unpooled requests.post calls against the pooled session
+used by BaseClient. Runs against a local keep-alive stub of the node normalizer.
+
+Usage: python bench_client_session.py [n_requests]
+"""
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from chp_utils import SriNodeNormalizerApiClient
+from chp_utils.client import close_sessions
+
+STUB_RESPONSE = json.dumps({
+    "HGNC:613": {
+        "id": {"identifier": "NCBIGene:348"},
+        "equivalent_identifiers": [{"identifier": "NCBIGene:348"}, {"identifier": "HGNC:613"}],
+        "type": ["biolink:Gene"],
+        }
+    }).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+def run(label, fn, n_requests):
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        fn()
+    elapsed = time.perf_counter() - start
+    print('{:<10} {:>8} requests in {:.2f}s: {:.0f} requests/sec'.format(label, n_requests, elapsed, n_requests / elapsed))
+
+def main(n_requests=2000):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    params = {"curies": ["HGNC:613"]}
+
+    run('unpooled', lambda: requests.post(url + 'get_normalized_nodes', json=params), n_requests)
+    client = SriNodeNormalizerApiClient(url=url)
+    # Measure pooled HTTP requests, not normalization cache hits
+    client.normalization_cache = None
+    run('pooled', lambda: client.get_normalized_nodes(["HGNC:613"], verbose=False), n_requests)
+
+    close_sessions()
+    server.shutdown()
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
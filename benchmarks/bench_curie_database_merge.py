@@ -0,0 +1,52 @@
+""" Benchmarks merge_curies_databases over several large synthetic curie databases, against the previous
+implementation that serialized every database with to_dict and unioned the info of overlapping curies.
+
+Usage: python bench_curie_database_merge.py [n_curies_per_database] [n_databases]
+"""
+import sys
+import time
+
+import trapi_model
+trapi_model.set_biolink_debug_mode(False)
+
+from chp_utils.curie_database import CurieDatabase, merge_curies_databases
+
+ENTITIES = ['biolink:Gene', 'biolink:Drug', 'biolink:Disease', 'biolink:PhenotypicFeature']
+
+def build_database(n_curies, offset):
+    # Consecutive databases overlap on half of their curies.
+    curies = {entity: {} for entity in ENTITIES}
+    for i in range(offset, offset + n_curies):
+        entity = ENTITIES[i % len(ENTITIES)]
+        curies[entity]['CURIE:{}'.format(i)] = ['NAME{}'.format(i % 1000), 'SOURCE{}'.format(offset)]
+    return CurieDatabase(curies=curies)
+
+def legacy_merge(list_of_curies_dbs):
+    merged = list_of_curies_dbs[0].to_dict()
+    for curies_db in list_of_curies_dbs[1:]:
+        for biolink_entity, curies_info_dict in curies_db.to_dict().items():
+            if biolink_entity not in merged:
+                merged[biolink_entity] = curies_info_dict
+                continue
+            for curie, info in curies_info_dict.items():
+                if curie not in merged[biolink_entity]:
+                    merged[biolink_entity][curie] = info
+                    continue
+                new_info = set.union(*[set(merged[biolink_entity][curie]), set(info)])
+                merged[biolink_entity][curie] = [info for info in new_info if info]
+    return merged
+
+def run(label, fn):
+    start = time.perf_counter()
+    merged = fn()
+    n_curies = sum(len(curies) for curies in merged.values())
+    print('{:<8} {:>9} merged curies in {:.3f}s'.format(label, n_curies, time.perf_counter() - start))
+
+def main(n_curies=1000000, n_databases=4):
+    curies_dbs = [build_database(n_curies, i * n_curies // 2) for i in range(n_databases)]
+    run('legacy', lambda: legacy_merge(curies_dbs))
+    run('merge', lambda: CurieDatabase.merge(curies_dbs).curies)
+    run('to_dict', lambda: merge_curies_databases(curies_dbs))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
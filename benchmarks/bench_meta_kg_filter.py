@@ -0,0 +1,98 @@
+""" Benchmarks BaseQueryProcessor.filter_queries_inconsistent_with_meta_knowledge_graph over thousands of
+expanded one hop queries, against the previous linear scan and pairwise duplicate check.
+
+Usage: python bench_meta_kg_filter.py [n_queries]
+"""
+import os
+import sys
+import time
+import random
+from collections import defaultdict
+
+import trapi_model
+trapi_model.set_biolink_debug_mode(False)
+from trapi_model.query import Query
+from trapi_model.meta_knowledge_graph import MetaKnowledgeGraph
+
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+META_KNOWLEDGE_GRAPH_FILENAME = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        'unittests',
+        'test_meta_knowledge_graph.json',
+        )
+
+def build_queries(meta_knowledge_graph, n_queries):
+    meta_edges = list(meta_knowledge_graph.edges)
+    queries = []
+    for i in range(n_queries):
+        meta_edge = random.choice(meta_edges)
+        query = {
+                "message": {
+                    "query_graph": {
+                        "nodes": {
+                            "n0": {
+                                "ids": ["CURIE:{}".format(i % (n_queries // 2 or 1))],
+                                "categories": [meta_edge.subject.get_curie()],
+                                },
+                            "n1": {"categories": [meta_edge.object.get_curie()]},
+                            },
+                        "edges": {
+                            "e0": {"subject": "n0", "object": "n1", "predicates": [meta_edge.predicate.get_curie()]},
+                            },
+                        },
+                    },
+                }
+        queries.append(Query.load('1.1', None, query=query))
+    return queries
+
+def legacy_filter(queries, meta_knowledge_graph):
+    # The previous implementation, without logging.
+    predicate_map = defaultdict(list)
+    for edge in meta_knowledge_graph.edges:
+        predicate_map[edge.predicate].append(edge)
+    consistent_graphs = []
+    consistent_queries = []
+    for query in queries:
+        query_graph = query.message.query_graph
+        consistent_edges = []
+        for edge in query_graph.edges.values():
+            subject_node = query_graph.nodes[edge.subject]
+            object_node = query_graph.nodes[edge.object]
+            predicate = edge.predicates[0]
+            for meta_edge in predicate_map[predicate]:
+                if subject_node.categories[0] == meta_edge.subject and object_node.categories[0] == meta_edge.object:
+                    consistent_edges.append((
+                        subject_node.categories[0].get_curie(),
+                        subject_node.ids[0],
+                        predicate.get_curie(),
+                        object_node.categories[0].get_curie(),
+                        '?',
+                        ))
+                    break
+        is_unique = True
+        for consistent_graph in consistent_graphs:
+            if all(edge in consistent_graph for edge in consistent_edges):
+                is_unique = False
+                break
+        if is_unique:
+            consistent_graphs.append(consistent_edges)
+            consistent_queries.append(query)
+    return consistent_queries
+
+def run(label, fn):
+    start = time.perf_counter()
+    consistent_queries = fn()
+    print('{:<8} {:>6} consistent queries in {:.3f}s'.format(label, len(consistent_queries), time.perf_counter() - start))
+
+def main(n_queries=5000):
+    random.seed(0)
+    meta_knowledge_graph = MetaKnowledgeGraph.load('1.1', None, filename=META_KNOWLEDGE_GRAPH_FILENAME)
+    queries = build_queries(meta_knowledge_graph, n_queries)
+    processor = BaseQueryProcessor()
+    run('legacy', lambda: legacy_filter(queries, meta_knowledge_graph))
+    run('indexed', lambda: processor.filter_queries_inconsistent_with_meta_knowledge_graph(queries, meta_knowledge_graph))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -4,9 +4,9 @@
 from copy import copy
 import types
 
-from .client import BaseClient
-from .mixins.client.sri_node_normalizer import SriNodeNormalizerMixin
-from .mixins.client.sri_ontology_kp import SriOntologyKpMixin
+from .client import BaseClient, AsyncBaseClient
+from .mixins.client.sri_node_normalizer import SriNodeNormalizerMixin, AsyncSriNodeNormalizerMixin
+from .mixins.client.sri_ontology_kp import SriOntologyKpMixin, AsyncSriOntologyKpMixin
 from chp_utils._version import __version__
 
 # Aliases
@@ -34,6 +34,9 @@ COMMON_KWARGS = {}
 SRI_NODE_NORMALIZER_API_KWARGS = copy(COMMON_KWARGS)
 SRI_NODE_NORMALIZER_API_KWARGS.update({
     "_default_url": 'https://nodenormalization-sri.renci.org/',
+    "_default_chunk_size": 1000,
+    "_default_max_workers": 4,
+    "_default_chunk_retries": 2,
 })
 
 # API specific kwargs
@@ -58,6 +61,20 @@ CLIENT_SETTINGS = {
         "base_class": BaseClient,
         "mixins": [SriOntologyKpMixin]
     },
+    "async_sri_node_normalizer": {
+        "class_name": 'AsyncSriNodeNormalizerApiClient',
+        "class_kwargs": SRI_NODE_NORMALIZER_API_KWARGS,
+        "attr_aliases": SRI_NODE_NORMALIZER_API_ALIASES,
+        "base_class": AsyncBaseClient,
+        "mixins": [AsyncSriNodeNormalizerMixin]
+    },
+    "async_sri_ontology_kp": {
+        "class_name": 'AsyncSriOntologyKpApiClient',
+        "class_kwargs": SRI_ONTOLOGY_KP_API_KWARGS,
+        "attr_aliases": SRI_ONTOLOGY_KP_API_ALIASES,
+        "base_class": AsyncBaseClient,
+        "mixins": [AsyncSriOntologyKpMixin]
+    },
 }
 
 def copy_func(f, name=None):
@@ -98,3 +115,9 @@ class SriNodeNormalizerApiClient(get_client('sri_node_normalizer', instance=Fals
 
 class SriOntologyKpApiClient(get_client('sri_ontology_kp', instance=False)):
     pass
+
+class AsyncSriNodeNormalizerApiClient(get_client('async_sri_node_normalizer', instance=False)):
+    pass
+
+class AsyncSriOntologyKpApiClient(get_client('async_sri_ontology_kp', instance=False)):
+    pass
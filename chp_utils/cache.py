@@ -0,0 +1,100 @@
+""" Bounded, thread safe in-process caches used by the CHP API clients.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """ A thread safe least recently used cache with an optional time to live.
+
+    :param maxsize: Maximum number of entries held before the least recently used entry is evicted.
+    :type maxsize: int
+    :param ttl: Number of seconds an entry stays valid, or None for no expiry.
+    :type ttl: float
+    """
+    def __init__(self, maxsize=100000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _get(self, key, now):
+        try:
+            value, expires = self._data[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        if expires is not None and expires <= now:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            raise KeyError(key)
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _set(self, key, value, now):
+        expires = now + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                return self._get(key, time.monotonic())
+            except KeyError:
+                return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._set(key, value, time.monotonic())
+
+    def get_many(self, keys):
+        """ Looks up many keys under a single lock.
+
+        :returns: A dictionary of the cached entries and a list of the keys that were not cached.
+        :rtype: tuple
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                try:
+                    found[key] = self._get(key, now)
+                except KeyError:
+                    missing.append(key)
+        return found, missing
+
+    def set_many(self, items):
+        with self._lock:
+            now = time.monotonic()
+            for key, value in items.items():
+                self._set(key, value, now)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                }
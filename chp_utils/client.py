@@ -2,8 +2,13 @@
 Python client for generic API services.
 """
 
+import os
+import asyncio
 import logging
+import threading
+import functools
 import requests
+from requests.adapters import HTTPAdapter
 from collections import defaultdict
 
 try:
@@ -18,27 +23,160 @@ __version__ = '0.0.1'
 
 logger = logging.getLogger(__name__)
 
+# Default connection pool settings
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_POOL_BLOCK = False
+DEFAULT_MAX_RETRIES = 0
+
+# Process wide pooled sessions keyed by their pool settings
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+def _build_session(pool_connections, pool_maxsize, pool_block, max_retries, keep_alive):
+    session = requests.Session()
+    adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+            )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+def get_session(
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        pool_block=DEFAULT_POOL_BLOCK,
+        max_retries=DEFAULT_MAX_RETRIES,
+        keep_alive=True,
+        ):
+    """ Returns the process wide pooled session for the given pool settings. Clients built
+    with the same settings share one session, and therefore one set of open connections.
+
+    :param pool_connections: Number of per host connection pools to keep.
+    :type pool_connections: int
+    :param pool_maxsize: Maximum number of connections kept open per host.
+    :type pool_maxsize: int
+    :param pool_block: Whether to block when a host pool has no free connection instead of opening a new one.
+    :type pool_block: bool
+    :param max_retries: Number of connection level retries.
+    :type max_retries: int
+    :param keep_alive: Whether to keep connections alive between requests.
+    :type keep_alive: bool
+
+    :returns: A pooled session.
+    :rtype: requests.Session
+    """
+    key = (pool_connections, pool_maxsize, pool_block, max_retries, keep_alive)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = _build_session(*key)
+            _SESSIONS[key] = session
+    return session
+
+# Process wide count of HTTP requests sent by the clients, read by chp_utils.profiling
+_REQUEST_COUNTS = {"requests": 0, "from_cache": 0}
+_REQUEST_COUNTS_LOCK = threading.Lock()
+
+def get_request_counts():
+    """ Returns the number of HTTP requests sent by all clients of this process so far, and how many of them
+    were answered from the requests cache.
+
+    :rtype: dict
+    """
+    with _REQUEST_COUNTS_LOCK:
+        return dict(_REQUEST_COUNTS)
+
+def _count_request(res):
+    from_cache = getattr(res, 'from_cache', False)
+    # Requests are sent from executor threads, e.g. chunked node normalization
+    with _REQUEST_COUNTS_LOCK:
+        _REQUEST_COUNTS["requests"] += 1
+        if from_cache:
+            _REQUEST_COUNTS["from_cache"] += 1
+
+def send_request(method, url, session=None, **kwargs):
+    """ Sends an HTTP request and counts it in the process wide request counts. Every request of the clients
+    goes through here, whether its query is passed as params, json or data.
+
+    :param method: The HTTP method, e.g. 'get' or 'post'.
+    :type method: str
+    :param url: The url to request.
+    :type url: str
+    :param session: The session to send the request with, defaults to the default pooled session.
+    :type session: requests.Session
+
+    :returns: The response.
+    :rtype: requests.Response
+    """
+    if session is None:
+        session = get_session()
+    res = getattr(session, method.lower())(url, **kwargs)
+    _count_request(res)
+    return res
+
+def close_sessions():
+    """ Closes all process wide pooled sessions. New sessions are created on next use.
+    """
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+
 class BaseClient:
     """
     The base client for the an API web service.
+
+    :param url: The base url of the API, defaults to the client's default url.
+    :type url: str
+    :param session: An explicit session to use instead of the shared pooled session.
+    :type session: requests.Session
     """
 
-    def __init__(self, url=None):
+    def __init__(
+            self,
+            url=None,
+            session=None,
+            pool_connections=DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize=DEFAULT_POOL_MAXSIZE,
+            pool_block=DEFAULT_POOL_BLOCK,
+            max_retries=DEFAULT_MAX_RETRIES,
+            keep_alive=True,
+            ):
         if url is None:
             url = self._default_url
         self.url = url
         self._cached = False
+        self._session = session
+        self._session_kwargs = {
+                "pool_connections": pool_connections,
+                "pool_maxsize": pool_maxsize,
+                "pool_block": pool_block,
+                "max_retries": max_retries,
+                "keep_alive": keep_alive,
+                }
+
+    @property
+    def session(self):
+        if self._session is not None:
+            return self._session
+        return get_session(**self._session_kwargs)
 
     def _get(self, url, params=None, verbose=True):
         params = params or {}
-        res = requests.get(url, params=params)
+        res = send_request('get', url, session=self.session, params=params)
         if res.status_code != 200:
             raise GeneralApiErrorException(res)
         from_cache = getattr(res, 'from_cache', False)
         return from_cache, res
 
     def _post(self, url, params, verbose=True):
-        res = requests.post(url, json=params)
+        res = send_request('post', url, session=self.session, json=params)
         if res.status_code != 200:
             raise GeneralApiErrorException(res)
         from_cache = getattr(res, 'from_cache', False)
@@ -53,6 +191,8 @@ class BaseClient:
             requests_cache.install_cache(
                 cache_name=cache_db, allowable_methods=(
                     'GET', 'POST'), **kwargs)
+            # Pooled sessions created before the cache was installed are not cached.
+            close_sessions()
             self._cached = True
             if verbose:
                 print(
@@ -68,6 +208,7 @@ class BaseClient:
         '''Stop caching.'''
         if self._cached and caching_avail:
             requests_cache.uninstall_cache()
+            close_sessions()
             self._cached = False
         return
 
@@ -78,3 +219,25 @@ class BaseClient:
         except AttributeError:
             # requests_cache is not enabled
             print("requests_cache is not enabled. Nothing to clear.")
+
+
+class AsyncBaseClient(BaseClient):
+    """
+    The base asyncio client for an API web service. Requests are sent through the same pooled
+    session as BaseClient and run in the event loop's default executor, so many requests can be
+    awaited concurrently.
+    """
+
+    async def _get(self, url, params=None, verbose=True):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+                None,
+                functools.partial(BaseClient._get, self, url, params=params, verbose=verbose),
+                )
+
+    async def _post(self, url, params, verbose=True):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+                None,
+                functools.partial(BaseClient._post, self, url, params, verbose=verbose),
+                )
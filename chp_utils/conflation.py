@@ -28,11 +28,56 @@ class ConflationMap:
             return self.map[biolink_entity]
         return None
 
+    def _resolve_conflation(self, biolink_entity, conflated):
+        """ Follows conflations of an entity until one is not conflated any further, recording each step.
+        Returns None if the entity is not conflated.
+        """
+        resolved = None
+        seen = {biolink_entity}
+        conflated_entity = self.find_conflation(biolink_entity)
+        while conflated_entity is not None and conflated_entity not in seen:
+            conflated[biolink_entity] = conflated_entity
+            seen.add(conflated_entity)
+            resolved = biolink_entity = conflated_entity
+            conflated_entity = self.find_conflation(biolink_entity)
+        return resolved
+
+    def _conflate_entities(self, entities, conflated):
+        # Returns None when no entity is conflated, so untouched nodes and edges are left alone.
+        new_entities = None
+        for i, entity in enumerate(entities):
+            conflated_entity = self._resolve_conflation(entity, conflated)
+            if conflated_entity is None:
+                continue
+            if new_entities is None:
+                new_entities = list(entities)
+            new_entities[i] = conflated_entity
+        return new_entities
+
     def conflate(self, trapi_query):
+        """ Replaces every conflated category and predicate in the query graph of a query, scanning its nodes
+        and edges once. Conflations chain, e.g. with A conflated with B and B with C, A is replaced by C.
+
+        :param trapi_query: The query to conflate. It is modified in place.
+        :type trapi_query: trapi_model.query.Query
+
+        :rtype: trapi_model.query.Query
+        """
+        conflated = {}
+        query_graph = trapi_query.message.query_graph
+        for node in query_graph.nodes.values():
+            if node.categories:
+                categories = self._conflate_entities(node.categories, conflated)
+                if categories is not None:
+                    node.categories = categories
+        for edge in query_graph.edges.values():
+            if edge.predicates:
+                predicates = self._conflate_entities(edge.predicates, conflated)
+                if predicates is not None:
+                    edge.predicates = predicates
+        # Warn in the order of the conflation map, once per conflated entity.
         for entity, conflated_entity in self.map.items():
-            conflated_message = trapi_query.message.find_and_replace(entity.get_curie(), conflated_entity.get_curie())
-            if conflated_message.to_dict() != trapi_query.message.to_dict():
-                trapi_query.message = conflated_message
+            if entity in conflated:
                 trapi_query.warning(
                         'Conflated {} with {}'.format(
                             entity.get_curie(),
@@ -1,33 +1,124 @@
 """ A helper class to handle CHP supported curies.
 """
+import sys
 import json
+import struct
+from collections.abc import Mapping
 
 from trapi_model.biolink.constants import *
 
+from chp_utils.mapped_table import MappedTable, write_mapped_table, open_mapped_file
+
+CURIE_DATABASE_MAGIC = b'CHPCURI1'
+_OFFSET = struct.Struct('<Q')
+# Characters read at a time by the streaming JSON loader
+DEFAULT_JSON_CHUNK_SIZE = 1 << 20
+_JSON_WHITESPACE = ' \t\n\r'
+
+class _JSONStreamReader:
+    """ Reads the entries of a curies JSON file incrementally, decoding one value at a time with
+    JSONDecoder.raw_decode so the whole document is never held in memory.
+    """
+    def __init__(self, f_, chunk_size=DEFAULT_JSON_CHUNK_SIZE):
+        self._f = f_
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected {!r} at character {} of a curies file.'.format(char, self._pos))
+        self._pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_object(self):
+        """ Yields the key value pairs of the object at the current position, leaving values unread until
+        the next iteration.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self.expect('}')
+            return
+
+class _MappedCuries(Mapping):
+    """ Read only map from curie to info tuple over a mapped table.
+    """
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, curie):
+        info = self._table[curie]
+        return tuple(json.loads(info)) if info else ()
+
+    def __contains__(self, curie):
+        return curie in self._table
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        return iter(self._table)
+
 def merge_curies_databases(list_of_curies_dbs):
     if len(list_of_curies_dbs) == 1:
         return list_of_curies_dbs[0].to_dict()
-    merged = list_of_curies_dbs[0].to_dict()
-    for curies_db in list_of_curies_dbs[1:]:
-        for biolink_entity, curies_info_dict in curies_db.to_dict().items():
-            if biolink_entity not in merged:
-                merged[biolink_entity] = curies_info_dict
-                continue
-            for curie, info in curies_info_dict.items():
-                if curie not in merged[biolink_entity]:
-                    merged[biolink_entity][curie] = info
-                    continue
-                new_info = set.union(
-                        *[
-                            set(merged[biolink_entity][curie]),
-                            set(info),
-                            ]
-                        )
-                merged[biolink_entity][curie] = [info for info in new_info if info]
-    return merged
+    return CurieDatabase.merge(list_of_curies_dbs).to_dict()
 
 
 class CurieDatabase:
+    """ Holds the curies supported by CHP for each Biolink entity. Curies are kept in a hash map per entity,
+    with interned strings and tuples of info, so membership checks are O(1) and repeated strings are shared.
+
+    :param curies: A map from Biolink entity curie to a map from curie to a list of info, e.g. names.
+    :type curies: dict
+    :param curies_filename: A JSON file holding the curies map.
+    :type curies_filename: str
+    """
     def __init__(self, curies=None, curies_filename=None):
         if curies is None and curies_filename is None:
             raise ValueError('Must pass in either conflation map or filename.')
@@ -35,20 +126,158 @@ class CurieDatabase:
             raise ValueError('Must pass in either conflation map or filename, not both.')
         self.curies = self.load_curies(curies, curies_filename)
 
+    @staticmethod
+    def _compact_info(info):
+        if not info:
+            return ()
+        if isinstance(info, str):
+            return (sys.intern(info),)
+        return tuple(sys.intern(i) if isinstance(i, str) else i for i in info)
+
+    @staticmethod
+    def _load_binary_curies(curies_filename):
+        buffer = open_mapped_file(curies_filename)
+        if buffer[:len(CURIE_DATABASE_MAGIC)] != CURIE_DATABASE_MAGIC:
+            buffer.close()
+            return None
+        index_offset = _OFFSET.unpack_from(buffer, len(CURIE_DATABASE_MAGIC))[0]
+        index = MappedTable(buffer, index_offset)
+        return {
+                get_biolink_entity(biolink_entity): _MappedCuries(MappedTable(buffer, _OFFSET.unpack(offset)[0]))
+                for biolink_entity, offset in index.items()
+                }
+
     @staticmethod
     def load_curies(curies, curies_filename):
+        """ Loads curies from a map or a file. Binary files written by write_binary are memory mapped and
+        shared between processes, JSON files are streamed.
+        """
         _curies = {}
         if curies_filename is not None:
+            with open(curies_filename, 'rb') as f_:
+                is_binary = f_.read(len(CURIE_DATABASE_MAGIC)) == CURIE_DATABASE_MAGIC
+            if is_binary:
+                return CurieDatabase._load_binary_curies(curies_filename)
             with open(curies_filename) as f_:
-                curies = json.load(f_)
-        for biolink_entity, curies_list in curies.items():
-            _curies[get_biolink_entity(biolink_entity)] = curies_list
+                reader = _JSONStreamReader(f_)
+                for biolink_entity in reader.iter_object():
+                    curies_dict = _curies[get_biolink_entity(biolink_entity)] = {}
+                    for curie in reader.iter_object():
+                        curies_dict[sys.intern(curie)] = CurieDatabase._compact_info(reader.decode())
+            return _curies
+        for biolink_entity, curies_dict in curies.items():
+            _curies[get_biolink_entity(biolink_entity)] = {
+                    sys.intern(curie): CurieDatabase._compact_info(info)
+                    for curie, info in curies_dict.items()
+                    }
         return _curies
 
+    def write_binary(self, filename):
+        """ Writes the database in a binary format that loads by memory mapping the file, with one sorted
+        table of curies per Biolink entity.
+
+        Layout: magic | index offset | curie table per entity | index from entity curie to table offset
+
+        :param filename: Path of the file to write.
+        :type filename: str
+        """
+        offsets = []
+        with open(filename, 'wb') as f_:
+            f_.write(CURIE_DATABASE_MAGIC)
+            f_.write(_OFFSET.pack(0))
+            offset = len(CURIE_DATABASE_MAGIC) + _OFFSET.size
+            for biolink_entity, curies in self.curies.items():
+                offsets.append((biolink_entity.get_curie(), _OFFSET.pack(offset)))
+                offset += write_mapped_table(
+                        f_,
+                        (
+                            (curie, json.dumps(list(info), separators=(',', ':')).encode('utf-8') if info else b'')
+                            for curie, info in curies.items()
+                            ),
+                        )
+            write_mapped_table(f_, offsets)
+            f_.seek(len(CURIE_DATABASE_MAGIC))
+            f_.write(_OFFSET.pack(offset))
+
+    @classmethod
+    def merge(cls, curies_dbs):
+        """ Merges curie databases into a new database, reading each database once. The info of a curie
+        held by several databases is the union of their info, in the order it is first seen, without
+        empty entries.
+
+        :param curies_dbs: The curie databases to merge.
+        :type curies_dbs: list
+
+        :rtype: CurieDatabase
+        """
+        merged = {}
+        for curies_db in curies_dbs:
+            for biolink_entity, curies_dict in curies_db.curies.items():
+                merged_curies = merged.get(biolink_entity)
+                if merged_curies is None:
+                    merged[biolink_entity] = dict(curies_dict)
+                    continue
+                for curie, info in curies_dict.items():
+                    merged_info = merged_curies.get(curie)
+                    if merged_info is None:
+                        merged_curies[curie] = info
+                    elif merged_info != info:
+                        merged_curies[curie] = tuple(i for i in dict.fromkeys(merged_info + info) if i)
+        merged_db = cls.__new__(cls)
+        merged_db.curies = merged
+        return merged_db
+
+    @staticmethod
+    def _get_entity(biolink_entity):
+        if isinstance(biolink_entity, str):
+            return get_biolink_entity(biolink_entity)
+        return biolink_entity
+
+    def __len__(self):
+        return sum(len(curies_dict) for curies_dict in self.curies.values())
+
+    def contains(self, biolink_entity, curie):
+        """ Checks whether a curie is supported for a Biolink entity.
+
+        :param biolink_entity: A Biolink entity or its curie.
+        :type biolink_entity: trapi_model.biolink.BiolinkEntity
+        :param curie: The curie to check.
+        :type curie: str
+
+        :rtype: bool
+        """
+        curies_dict = self.curies.get(self._get_entity(biolink_entity))
+        return curies_dict is not None and curie in curies_dict
+
+    def get_info(self, biolink_entity, curie):
+        """ Returns the info of a supported curie, or None if the curie is not supported.
+
+        :rtype: tuple
+        """
+        curies_dict = self.curies.get(self._get_entity(biolink_entity))
+        if curies_dict is None:
+            return None
+        return curies_dict.get(curie)
+
+    def filter_supported(self, biolink_entity, curies):
+        """ Returns the unique curies that are supported for a Biolink entity, in the order they were passed.
+
+        :param biolink_entity: A Biolink entity or its curie.
+        :type biolink_entity: trapi_model.biolink.BiolinkEntity
+        :param curies: The curies to filter.
+        :type curies: iterable
+
+        :rtype: list
+        """
+        curies_dict = self.curies.get(self._get_entity(biolink_entity))
+        if curies_dict is None:
+            return []
+        return [curie for curie in dict.fromkeys(curies) if curie in curies_dict]
+
     def to_dict(self):
         curies_dict = {}
-        for biolink_entity, curies_list in self.curies.items():
-            curies_dict[biolink_entity.get_curie()] = curies_list
+        for biolink_entity, curies in self.curies.items():
+            curies_dict[biolink_entity.get_curie()] = {curie: list(info) for curie, info in curies.items()}
         return curies_dict
 
 
@@ -1,5 +1,6 @@
 """ Generic utilities useful to the CHP Project.
 """
+import re
 
 def dict_replace_value(d, old, new):
     x = {}
@@ -30,3 +31,115 @@ def list_replace_value(l, old, new):
             e = e.replace(old, new)
         x.append(e)
     return x
+
+
+class MultiReplacer:
+    """ Compiles a mapping of old to new strings once, so that every replacement in the mapping is applied
+    to a string in a single scan. Replacements do not chain: text produced by one replacement is not
+    replaced again. When several keys match at the same position the longest one wins.
+
+    :param mapping: A map from old to new strings.
+    :type mapping: dict
+    :param exact: Only replace strings that are exactly equal to a key, instead of substrings.
+    :type exact: bool
+    """
+    def __init__(self, mapping, exact=False):
+        self.mapping = {old: new for old, new in mapping.items() if old}
+        self.exact = exact
+        self._pattern = None
+        if not exact and len(self.mapping) > 0:
+            self._pattern = re.compile(
+                    '|'.join(re.escape(old) for old in sorted(self.mapping, key=len, reverse=True))
+                    )
+
+    def replace(self, s):
+        if self.exact:
+            return self.mapping.get(s, s)
+        if self._pattern is None:
+            return s
+        return self._pattern.sub(lambda match: self.mapping[match.group(0)], s)
+
+
+def _get_replacer(mapping, exact):
+    if isinstance(mapping, MultiReplacer):
+        return mapping
+    return MultiReplacer(mapping, exact=exact)
+
+
+def _replace_value(v, replacer, in_place):
+    if isinstance(v, dict):
+        return _dict_replace_values(v, replacer, in_place)
+    elif isinstance(v, list):
+        return _list_replace_values(v, replacer, in_place)
+    elif isinstance(v, str):
+        return replacer.replace(v)
+    return v
+
+
+def _collect_items(items):
+    # Renamed keys must not overwrite each other or the keys that were kept
+    x = {}
+    for k, v in items:
+        if k in x:
+            raise ValueError('Replacement maps more than one key to {}.'.format(k))
+        x[k] = v
+    return x
+
+
+def _dict_replace_values(d, replacer, in_place):
+    if not in_place:
+        return _collect_items(
+                (replacer.replace(k) if isinstance(k, str) else k, _replace_value(v, replacer, in_place))
+                for k, v in d.items()
+                )
+    keys_changed = False
+    for k, v in d.items():
+        new_v = _replace_value(v, replacer, in_place)
+        if new_v is not v:
+            d[k] = new_v
+        if isinstance(k, str) and replacer.replace(k) != k:
+            keys_changed = True
+    if keys_changed:
+        # Rebuild the keys in their original order
+        x = _collect_items((replacer.replace(k) if isinstance(k, str) else k, v) for k, v in d.items())
+        d.clear()
+        d.update(x)
+    return d
+
+
+def _list_replace_values(l, replacer, in_place):
+    if not in_place:
+        return [_replace_value(e, replacer, in_place) for e in l]
+    for i, e in enumerate(l):
+        new_e = _replace_value(e, replacer, in_place)
+        if new_e is not e:
+            l[i] = new_e
+    return l
+
+
+def dict_replace_values(d, mapping, exact=False, in_place=False):
+    """ Replaces every key of a mapping in the keys and string values of a nested dictionary, in a single
+    traversal.
+
+    :param d: The dictionary to rewrite.
+    :type d: dict
+    :param mapping: A map from old to new strings, or a compiled MultiReplacer.
+    :type mapping: dict
+    :param exact: Only replace strings that are exactly equal to a key, instead of substrings.
+    :type exact: bool
+    :param in_place: Modify d and its nested containers instead of building a new structure.
+    :type in_place: bool
+
+    :rtype: dict
+    :raises ValueError: If replacing the keys of a dictionary maps two of them to the same key.
+    """
+    return _dict_replace_values(d, _get_replacer(mapping, exact), in_place)
+
+
+def list_replace_values(l, mapping, exact=False, in_place=False):
+    """ Replaces every key of a mapping in the string values of a nested list, in a single traversal.
+    See dict_replace_values.
+
+    :rtype: list
+    """
+    return _list_replace_values(l, _get_replacer(mapping, exact), in_place)
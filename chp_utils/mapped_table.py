@@ -0,0 +1,113 @@
+""" A sorted, read only string to bytes table that is queried in place from a memory mapped file, so many
+worker processes share a single copy of its pages.
+
+Layout, all integers little endian uint64:
+    magic | n | keys_size | values_size | key_offsets[n + 1] | value_offsets[n + 1] | keys | values
+"""
+import sys
+import mmap
+import struct
+from array import array
+from collections.abc import Mapping
+
+MAPPED_TABLE_MAGIC = b'CHPTBL01'
+_HEADER = struct.Struct('<8sQQQ')
+_OFFSET = struct.Struct('<Q')
+
+def write_mapped_table(f_, items):
+    """ Writes a table to an open binary file. Keys are sorted and, if duplicated, the first value is kept.
+
+    :param f_: An open binary file.
+    :param items: An iterable of (str, bytes) key value pairs.
+    :type items: iterable
+
+    :returns: Number of bytes written.
+    :rtype: int
+    """
+    table = {}
+    for key, value in items:
+        table.setdefault(key.encode('utf-8'), value)
+    keys = sorted(table)
+    key_offsets = array('Q', [0])
+    value_offsets = array('Q', [0])
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        value_offsets.append(value_offsets[-1] + len(table[key]))
+    n = len(keys)
+    f_.write(_HEADER.pack(MAPPED_TABLE_MAGIC, n, key_offsets[-1], value_offsets[-1]))
+    if sys.byteorder != 'little':
+        key_offsets.byteswap()
+        value_offsets.byteswap()
+    f_.write(key_offsets.tobytes())
+    f_.write(value_offsets.tobytes())
+    for key in keys:
+        f_.write(key)
+    for key in keys:
+        f_.write(table[key])
+    return _HEADER.size + 2 * (n + 1) * _OFFSET.size + sum(len(key) for key in keys) + sum(len(value) for value in table.values())
+
+class MappedTable(Mapping):
+    """ Read only mapping over a table written by write_mapped_table. Lookups binary search the sorted keys
+    directly in the buffer.
+
+    :param buffer: A buffer holding the table, usually an mmap.
+    :param offset: Byte offset of the table in the buffer.
+    :type offset: int
+    """
+    def __init__(self, buffer, offset=0):
+        magic, n, keys_size, values_size = _HEADER.unpack_from(buffer, offset)
+        if magic != MAPPED_TABLE_MAGIC:
+            raise ValueError('Buffer does not hold a mapped table at offset {}.'.format(offset))
+        self._buffer = buffer
+        self._n = n
+        self._key_offsets = offset + _HEADER.size
+        self._value_offsets = self._key_offsets + (n + 1) * _OFFSET.size
+        self._keys = self._value_offsets + (n + 1) * _OFFSET.size
+        self._values = self._keys + keys_size
+        self.nbytes = self._values + values_size - offset
+
+    def _offset(self, base, i):
+        return _OFFSET.unpack_from(self._buffer, base + i * _OFFSET.size)[0]
+
+    def _key(self, i):
+        return self._buffer[self._keys + self._offset(self._key_offsets, i):self._keys + self._offset(self._key_offsets, i + 1)]
+
+    def _value(self, i):
+        return self._buffer[self._values + self._offset(self._value_offsets, i):self._values + self._offset(self._value_offsets, i + 1)]
+
+    def _find(self, key):
+        key = key.encode('utf-8')
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self._key(lo) == key:
+            return lo
+        return None
+
+    def __getitem__(self, key):
+        i = self._find(key) if isinstance(key, str) else None
+        if i is None:
+            raise KeyError(key)
+        return bytes(self._value(i))
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield bytes(self._key(i)).decode('utf-8')
+
+def open_mapped_file(filename):
+    """ Memory maps a file read only.
+
+    :rtype: mmap.mmap
+    """
+    with open(filename, 'rb') as f_:
+        return mmap.mmap(f_.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,112 @@
+""" Hash indexes over a trapi_model MetaKnowledgeGraph, built once per meta knowledge graph and reused by
+every query processed against it.
+"""
+from chp_utils.cache import LRUCache
+
+# Indexes of the most recently used meta knowledge graphs
+_META_KNOWLEDGE_GRAPH_INDEXES = LRUCache(maxsize=16)
+# Number of Biolink ancestors of every entity seen so far, per Biolink version
+_ANCESTOR_DEPTHS = {}
+
+def get_ancestor_depth(biolink_entity):
+    """ Returns the number of Biolink ancestors of an entity, computing it once per entity and Biolink version.
+
+    :rtype: int
+    """
+    key = (biolink_entity, getattr(biolink_entity, 'biolink_version', None))
+    depth = _ANCESTOR_DEPTHS.get(key)
+    if depth is None:
+        depth = _ANCESTOR_DEPTHS[key] = len(biolink_entity.get_ancestors())
+    return depth
+
+def _get_signature(meta_knowledge_graph):
+    # Changes when the nodes or edges of a meta knowledge graph are replaced, added or removed.
+    nodes = meta_knowledge_graph.nodes
+    edges = meta_knowledge_graph.edges
+    return (id(nodes), len(nodes), id(edges), len(edges))
+
+class MetaKnowledgeGraphIndex:
+    """ Indexes the edges of a meta knowledge graph for constant time consistency checks, and its nodes for
+    preferred curie resolution.
+
+    :param meta_knowledge_graph: The meta knowledge graph to index.
+    :type meta_knowledge_graph: trapi_model.meta_knowledge_graph.MetaKnowledgeGraph
+    """
+    def __init__(self, meta_knowledge_graph):
+        self.predicates = frozenset(edge.predicate for edge in meta_knowledge_graph.edges)
+        self.triples = frozenset(
+                (edge.subject, edge.predicate, edge.object) for edge in meta_knowledge_graph.edges
+                )
+        # The first id prefix of each category is its preferred prefix, None if it has no prefixes.
+        self.preferred_prefixes = {
+                category: node.id_prefixes[0] if node.id_prefixes else None
+                for category, node in meta_knowledge_graph.nodes.items()
+                }
+        self.node_categories = frozenset(meta_knowledge_graph.nodes)
+        self._node_category_curies = frozenset(category.get_curie() for category in self.node_categories)
+        self._supported_category_descendants = {}
+        self._supported_predicate_descendants = {}
+        for category in self.node_categories:
+            get_ancestor_depth(category)
+
+    def supports_predicate(self, predicate):
+        return predicate in self.predicates
+
+    def supports_edge(self, subject_category, predicate, object_category):
+        return (subject_category, predicate, object_category) in self.triples
+
+    def get_ancestor_depth(self, biolink_entity):
+        return get_ancestor_depth(biolink_entity)
+
+    def get_supported_category_descendants(self, category):
+        """ Returns the Biolink descendants of a category that are meta knowledge graph categories, together
+        with the category itself if it is one, sorted. Computed once per category.
+
+        :rtype: tuple
+        """
+        supported_descendants = self._supported_category_descendants.get(category)
+        if supported_descendants is None:
+            supported_descendants = list(self.node_categories.intersection(category.get_descendants()))
+            if category.get_curie() in self._node_category_curies:
+                supported_descendants.append(category)
+            supported_descendants = self._supported_category_descendants[category] = tuple(sorted(supported_descendants))
+        return supported_descendants
+
+    def get_supported_predicate_descendants(self, predicate):
+        """ Returns the Biolink descendants of a predicate that are meta knowledge graph predicates, together
+        with the predicate itself if it is one, sorted. Computed once per predicate.
+
+        :rtype: tuple
+        """
+        supported_descendants = self._supported_predicate_descendants.get(predicate)
+        if supported_descendants is None:
+            supported_descendants = list(self.predicates.intersection(predicate.get_descendants()))
+            if predicate in self.predicates:
+                supported_descendants.append(predicate)
+            supported_descendants = self._supported_predicate_descendants[predicate] = tuple(sorted(supported_descendants))
+        return supported_descendants
+
+def get_meta_knowledge_graph_index(meta_knowledge_graph):
+    """ Returns the index of a meta knowledge graph, building it on first use and again whenever nodes or
+    edges were added, removed or replaced. Call clear_meta_knowledge_graph_indexes after modifying a node
+    or edge in place.
+
+    :param meta_knowledge_graph: The meta knowledge graph to index.
+    :type meta_knowledge_graph: trapi_model.meta_knowledge_graph.MetaKnowledgeGraph
+
+    :rtype: MetaKnowledgeGraphIndex
+    """
+    signature = _get_signature(meta_knowledge_graph)
+    entry = _META_KNOWLEDGE_GRAPH_INDEXES.get(id(meta_knowledge_graph))
+    # Keep a reference to the meta knowledge graph so its id can not be reused while cached.
+    if entry is None or entry[0] is not meta_knowledge_graph or entry[1] != signature:
+        entry = (meta_knowledge_graph, signature, MetaKnowledgeGraphIndex(meta_knowledge_graph))
+        _META_KNOWLEDGE_GRAPH_INDEXES.set(id(meta_knowledge_graph), entry)
+    return entry[2]
+
+def clear_meta_knowledge_graph_indexes():
+    """ Forgets every meta knowledge graph index and ancestor depth, e.g. after a meta knowledge graph was
+    modified in place or the Biolink model changed.
+    """
+    _META_KNOWLEDGE_GRAPH_INDEXES.clear()
+    _ANCESTOR_DEPTHS.clear()
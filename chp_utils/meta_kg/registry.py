@@ -0,0 +1,123 @@
+""" A process wide registry that parses each meta KG schema once and shares immutable views of it.
+"""
+import os
+import json
+import threading
+from types import MappingProxyType
+
+DEFAULT_META_KG_FILENAME = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'schemas',
+        'meta-kg.json',
+        )
+
+_META_KG_VIEWS = {}
+_META_KG_VIEWS_LOCK = threading.Lock()
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(value) for value in obj)
+    return obj
+
+def _thaw(obj):
+    if isinstance(obj, MappingProxyType):
+        return {key: _thaw(value) for key, value in obj.items()}
+    if isinstance(obj, tuple):
+        return [_thaw(value) for value in obj]
+    return obj
+
+class MetaKGView:
+    """ Read only view of a parsed meta KG schema together with every index derived from it. Mappings are
+    MappingProxyTypes, sequences tuples and sets frozensets, so the view can be shared safely. Use to_dict
+    for a plain, JSON serializable copy of the schema.
+
+    :param meta_kg: The meta KG schema as loaded from JSON.
+    :type meta_kg: dict
+    :param filename: The file the schema was loaded from.
+    :type filename: str
+    """
+    def __init__(self, meta_kg, filename=None):
+        self.filename = filename
+        self.frozen_meta_kg = _freeze(meta_kg)
+        nodes = meta_kg["nodes"]
+        edges = meta_kg["edges"]
+
+        # Node indexes
+        self.node_categories = tuple(nodes.keys())
+        self.id_prefixes = frozenset(
+                id_prefix for node_category in nodes for id_prefix in nodes[node_category]["id_prefixes"]
+                )
+        self.prefix_category_pairs = MappingProxyType({
+            node_category: tuple(nodes[node_category]["id_prefixes"]) for node_category in nodes
+            })
+        node_definitions = {}
+        for node_category in nodes:
+            for prefix in nodes[node_category]["id_prefixes"]:
+                node_definitions[prefix] = node_category
+        self.node_definitions = MappingProxyType(node_definitions)
+
+        # Edge indexes
+        edge_categories = set()
+        predicates = set()
+        relationships = set()
+        edge_definitions = {}
+        subject_wildcard_definitions = {}
+        object_wildcard_definitions = {}
+        terms = list(self.node_categories)
+        for edge in edges:
+            subject, predicate, object = edge["subject"], edge["predicate"], edge["object"]
+            edge_categories.update((subject, object))
+            predicates.add(predicate)
+            relationships.add((subject, predicate, object))
+            edge_definitions.setdefault(subject, {})[object] = predicate
+            subject_wildcard_definitions.setdefault(object, []).append(MappingProxyType({predicate: subject}))
+            object_wildcard_definitions.setdefault(subject, []).append(MappingProxyType({predicate: object}))
+            for term in (subject, predicate, object):
+                if term not in terms:
+                    terms.append(term)
+        self.edge_categories = frozenset(edge_categories)
+        self.predicates = frozenset(predicates)
+        self.relationships = frozenset(relationships)
+        self.edge_definitions = MappingProxyType({
+            subject: MappingProxyType(object_predicates) for subject, object_predicates in edge_definitions.items()
+            })
+        self.subject_wildcard_definitions = MappingProxyType({
+            object: tuple(definitions) for object, definitions in subject_wildcard_definitions.items()
+            })
+        self.object_wildcard_definitions = MappingProxyType({
+            subject: tuple(definitions) for subject, definitions in object_wildcard_definitions.items()
+            })
+        # Every category and predicate mentioned in the meta KG
+        self.terms = tuple(terms)
+
+    def to_dict(self):
+        """ Returns a new plain dict of the meta KG schema, as loaded from JSON.
+
+        :rtype: dict
+        """
+        return _thaw(self.frozen_meta_kg)
+
+def get_meta_kg_view(filename=None):
+    """ Returns the shared view of a meta KG schema, parsing the file on first use only.
+
+    :param filename: Path to a meta KG schema, defaults to the packaged schemas/meta-kg.json.
+    :type filename: str
+
+    :rtype: MetaKGView
+    """
+    filename = os.path.abspath(filename or DEFAULT_META_KG_FILENAME)
+    with _META_KG_VIEWS_LOCK:
+        view = _META_KG_VIEWS.get(filename)
+        if view is None:
+            with open(filename) as f_:
+                view = MetaKGView(json.load(f_), filename=filename)
+            _META_KG_VIEWS[filename] = view
+    return view
+
+def clear_meta_kg_registry():
+    """ Forgets all parsed meta KGs, e.g. after a schema file changed on disk.
+    """
+    with _META_KG_VIEWS_LOCK:
+        _META_KG_VIEWS.clear()
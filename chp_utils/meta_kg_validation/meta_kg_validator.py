@@ -1,6 +1,5 @@
 from chp_utils.meta_kg_validation.metakg_validation_exceptions import *
-import os
-import json
+from chp_utils.meta_kg.registry import get_meta_kg_view
 import logging
 # Setup logging
 logging.addLevelName(25, "NOTE")
@@ -10,10 +9,50 @@ def note(self, message, *args, **kwargs):
 logging.Logger.note = note
 logger = logging.getLogger(__name__)
 
+META_KG_VALIDATION_EXCEPTIONS = (
+        UnsupportedNodeEdgeRelationship,
+        UnsupportedPredicate,
+        UnsupportedCategory,
+        UnsupportedPrefix,
+        UnsupportedPrefixCategoryPair,
+        InvalidCurie,
+        )
+
+class MetaKGValidationResult:
+    """ Outcome of validating a single query graph against the meta KG.
+
+    :param query_graph: The validated query graph.
+    :type query_graph: trapi_model.query_graph.QueryGraph
+    :param errors: The validation exceptions that were found.
+    :type errors: list
+    """
+    def __init__(self, query_graph, errors=None) -> None:
+        self.query_graph = query_graph
+        self.errors = errors if errors is not None else []
+
+    @property
+    def valid(self) -> bool:
+        return len(self.errors) == 0
+
+    def to_dict(self) -> dict:
+        return {
+                "valid": self.valid,
+                "errors": [
+                    {"type": type(error).__name__, "message": str(error)} for error in self.errors
+                    ],
+                }
+
 class MetaKGValidator:
-    def __init__(self, query_graph) -> None:
+    """ Validates query graphs against the meta KG. Build it once and reuse it for any number of query graphs.
+
+    :param query_graph: Optional query graph checked by validate_graph when it is called without one.
+    :type query_graph: trapi_model.query_graph.QueryGraph
+    :param meta_kg_filename: Path to a meta KG schema, defaults to the packaged schema.
+    :type meta_kg_filename: str
+    """
+    def __init__(self, query_graph=None, meta_kg_filename=None) -> None:
         self.meta_knowledge_graph_location = "http://chp.thayer.dartmouth.edu/meta_knowledge_graph/"
-        self._get_meta_knowledge_graph()
+        self._get_meta_knowledge_graph(meta_kg_filename)
         self._get_supported_categories()
         self._get_supported_predicates()
         self._get_supported_id_prefixes()
@@ -21,65 +60,45 @@ class MetaKGValidator:
         self._get_suppported_prefix_category_pairs()
         self.query_graph = query_graph
 
-    def _get_meta_knowledge_graph(self)->None:
-        curfilePath = os.path.abspath(__file__)
+    def _get_meta_knowledge_graph(self, meta_kg_filename=None)->None:
+        self._meta_kg_view = get_meta_kg_view(meta_kg_filename)
+        self._meta_knowledge_graph = None
 
-        # this will return current directory in which python file resides.
-        curDir = os.path.abspath(os.path.join(curfilePath, os.pardir))
+    @property
+    def meta_knowledge_graph(self) -> dict:
+        # Copied from the shared view on first use only
+        if self._meta_knowledge_graph is None:
+            self._meta_knowledge_graph = self._meta_kg_view.to_dict()
+        return self._meta_knowledge_graph
+
+    @meta_knowledge_graph.setter
+    def meta_knowledge_graph(self, meta_knowledge_graph) -> None:
+        self._meta_knowledge_graph = meta_knowledge_graph
 
-        # this will return parent directory.
-        parentDir = os.path.abspath(os.path.join(curDir, os.pardir))
-        
-        #resource_package = __name__
-        resource_path = parentDir+'/'.join(('/schemas', 'meta-kg.json'))
-        #file_str = pkg_resources.resource_string(parentDir, resource_path)
-        meta_kg_file = open(resource_path, 'r')
-        self.meta_knowledge_graph = json.load(meta_kg_file)
     def _get_supported_categories(self) -> None:
-        self.supported_categories = set()
-        for edge in self.meta_knowledge_graph['edges']:
-            supported_subject = edge['subject']
-            supported_object = edge['object']
-            self.supported_categories.add(supported_subject)
-            self.supported_categories.add(supported_object)
+        self.supported_categories = set(self._meta_kg_view.edge_categories)
 
     def _get_supported_predicates(self) -> None:
-        self.supported_predicates = set()
-        for edge in self.meta_knowledge_graph['edges']:
-            supported_predicate = edge['predicate']
-            self.supported_predicates.add(supported_predicate)
-        self.supported_predicates = list(self.supported_predicates)
+        self.supported_predicates = list(self._meta_kg_view.predicates)
 
     def _get_supported_id_prefixes(self) -> None:
-        self.supported_id_prefixes = set()
-        nodes = self.meta_knowledge_graph['nodes']
-        for node_category in nodes:
-            for id_prefix in nodes[node_category]['id_prefixes']:
-                self.supported_id_prefixes.add(id_prefix)
-        
+        self.supported_id_prefixes = set(self._meta_kg_view.id_prefixes)
     
     def _get_suppported_prefix_category_pairs(self) -> None:
-        self.supported_prefix_category_pairs = dict()
-        nodeCategories = self.meta_knowledge_graph['nodes'].keys()
-        for node_category in nodeCategories:
-            id_prefixes = self.meta_knowledge_graph['nodes'][node_category]['id_prefixes']
-            self.supported_prefix_category_pairs.update({node_category:id_prefixes})          
+        self.supported_prefix_category_pairs = {
+                node_category: list(id_prefixes)
+                for node_category, id_prefixes in self._meta_kg_view.prefix_category_pairs.items()
+                }
 
     def _get_supported_relationships(self) -> None:
-        self.supported_relationships = set()
-        for edge_relationship in self.meta_knowledge_graph['edges']:
-            
-            subject = edge_relationship['subject']
-            predicate = edge_relationship['predicate']
-            object = edge_relationship['object']
-
-            relationship = (subject, predicate, object)
-            self.supported_relationships.add(relationship)
+        self.supported_relationships = set(self._meta_kg_view.relationships)
 
     def _validate_prefixes(self, ids:list) -> bool:
         validated = True
         if ids is not None:
             for id in ids:
+                if ':' not in id:
+                    raise InvalidCurie(id)
                 prefix = id[:id.index(':')]
                 if prefix not in self.supported_id_prefixes:
                     validated = False
@@ -95,10 +114,13 @@ class MetaKGValidator:
             prefix = ""
             passed_name = ""
             for id in ids:
+                # Malformed curies are reported by _validate_prefixes
+                if ':' not in id:
+                    continue
                 prefix = id[:id.index(':')]
                 passed_names = [category.passed_name for category in categories]
                 for passed_name in passed_names:
-                    if prefix not in self.supported_prefix_category_pairs.get(passed_name):
+                    if prefix not in self.supported_prefix_category_pairs.get(passed_name, ()):
                         validated = False
         if validated:
             return True
@@ -144,35 +166,85 @@ class MetaKGValidator:
         else:
             raise UnsupportedNodeEdgeRelationship(subject.passed_name, predicate.passed_name, object.passed_name)
 
-    def _validate_nodes(self, nodes:list):
+    def _check(self, errors, validation, *args) -> None:
+        # Raise straight away unless errors are being collected
+        if errors is None:
+            validation(*args)
+            return
+        try:
+            validation(*args)
+        except META_KG_VALIDATION_EXCEPTIONS as ex:
+            errors.append(ex)
+
+    def _validate_nodes(self, nodes:list, errors:list=None):
         for node in nodes:
             ids = nodes[node].ids
-            self._validate_prefixes(ids)
+            self._check(errors, self._validate_prefixes, ids)
 
             categories = nodes[node].categories
-            self._validate_categories(categories)
-            self._validate_prefix_category_pairs(ids,categories)
+            if categories is None:
+                continue
+            self._check(errors, self._validate_categories, categories)
+            self._check(errors, self._validate_prefix_category_pairs, ids, categories)
+
+    def _validate_edges(self, edges:list, nodes:list, errors:list=None):
+        for edge in edges:
+            predicates = edges[edge].predicates
+            if predicates is None:
+                continue
+            self._check(errors, self._validate_predicates, predicates)
 
-    def _validate_edges(self, edges:list, nodes:list):
+    def _validate_relationships(self, edges:list, nodes:list, errors:list=None):
         for edge in edges:
+            subjects = nodes.get(edges[edge].subject).categories
+            objects = nodes.get(edges[edge].object).categories
             predicates = edges[edge].predicates
-            self._validate_predicates(predicates)
-            
+            if subjects is None or objects is None or predicates is None:
+                continue
+            self._check(errors, self._validate_relationship, subjects, predicates, objects)
+            logger.note('validated relationships')
 
-    def validate_graph(self) -> None:
+    def _validate_query_graph(self, query_graph, errors:list=None) -> None:
         logger.note('validating nodes')
         #get nodes
-        nodes = self.query_graph.nodes
-        self._validate_nodes(nodes)
+        nodes = query_graph.nodes
+        self._validate_nodes(nodes, errors)
         logger.note('nodes validated')
         #get edges
         logger.note('validating edges')
-        edges = self.query_graph.edges
-        self._validate_edges(edges,nodes)
+        edges = query_graph.edges
+        self._validate_edges(edges, nodes, errors)
         logger.note('validated edges')
         logger.note('validating relationships')
-        for edge in edges:
-            subjects = nodes.get(edges[edge].subject).categories
-            objects = nodes.get(edges[edge].object).categories
-            self._validate_relationship(subjects,edges[edge].predicates,objects)
-            logger.note('validated relationships')
+        self._validate_relationships(edges, nodes, errors)
+
+    def validate_graph(self, query_graph=None) -> None:
+        """ Validates a query graph, raising on the first unsupported entity.
+
+        :param query_graph: The query graph to validate, defaults to the one passed at construction.
+        :type query_graph: trapi_model.query_graph.QueryGraph
+        """
+        if query_graph is None:
+            query_graph = self.query_graph
+        self._validate_query_graph(query_graph)
+
+    def validate(self, query_graph) -> MetaKGValidationResult:
+        """ Validates a query graph and collects every failure instead of raising.
+
+        :param query_graph: The query graph to validate.
+        :type query_graph: trapi_model.query_graph.QueryGraph
+        """
+        errors = []
+        self._validate_query_graph(query_graph, errors)
+        return MetaKGValidationResult(query_graph, errors)
+
+    def validate_many(self, query_graphs) -> list:
+        """ Validates a batch of query graphs in one pass.
+
+        :param query_graphs: The query graphs to validate.
+        :type query_graphs: list
+
+        :returns: One MetaKGValidationResult per query graph, in order.
+        :rtype: list
+        """
+        return [self.validate(query_graph) for query_graph in query_graphs]
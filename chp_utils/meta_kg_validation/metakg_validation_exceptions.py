@@ -30,7 +30,7 @@ class UnsupportedCategory(Exception):
         super().__init__(self.message)
 
     def __str__(self) -> str:
-        return '{}: {}'.format(self.message)
+        return '{}: {}'.format(self.message, self.entity)
 
 class UnsupportedPrefix(Exception):
     def __init__(self, prefix:str, message:str='Unsupported Prefix') -> None:
@@ -49,4 +49,13 @@ class UnsupportedPrefixCategoryPair(Exception):
         super().__init__(self.message)
     
     def __str__(self) -> str:
-        return '{}: {} -> {}'.format(self.message, self.prefix, self.entity)
\ No newline at end of file
+        return '{}: {} -> {}'.format(self.message, self.prefix, self.entity)
+
+class InvalidCurie(Exception):
+    def __init__(self, curie:str, message:str='Invalid Curie') -> None:
+        self.message = message
+        self.curie = curie
+        super().__init__(self.message)
+
+    def __str__(self) -> str:
+        return '{}: {}'.format(self.message, self.curie)
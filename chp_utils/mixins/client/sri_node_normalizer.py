@@ -1,24 +1,69 @@
+import asyncio
+import requests
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from trapi_model.biolink.constants import *
 
 from chp_utils.exceptions import *
+from chp_utils.cache import LRUCache
+
+# Default bounds of the shared per curie normalization cache
+DEFAULT_NORMALIZATION_CACHE_SIZE = 100000
+DEFAULT_NORMALIZATION_CACHE_TTL = 24 * 60 * 60
 
 class SriNodeNormalizerMixin:
-    def _get_normalized_nodes(self, curies, **kwargs):
-        """ Returns normalizations for all curies passed.
+    # Shared by every node normalizer client and keyed by (url, curie), set to None on an instance to disable.
+    normalization_cache = LRUCache(
+            maxsize=DEFAULT_NORMALIZATION_CACHE_SIZE,
+            ttl=DEFAULT_NORMALIZATION_CACHE_TTL,
+            )
 
-        :param curies: A list of curies to be normalized.
-        :type curies: list
+    @staticmethod
+    def _copy_normalization(normalization_dict):
+        # Cached records are shared, callers get their own copies to modify.
+        if normalization_dict is None:
+            return None
+        return {
+                "equivalent_identifier": [dict(e) for e in normalization_dict["equivalent_identifier"]],
+                "types": list(normalization_dict["types"]),
+                }
 
-        :returns: Normalized nodes.
-        :rtype: dict
-        """
+    def _get_cached_normalized_nodes(self, curies):
+        curies = list(dict.fromkeys(curies))
+        if self.normalization_cache is None:
+            return {}, curies
+        # Keyed by url, so clients of different node normalizers do not share answers
+        found, missing = self.normalization_cache.get_many([(self.url, curie) for curie in curies])
+        return {curie: normalization_dict for (_, curie), normalization_dict in found.items()}, [curie for _, curie in missing]
+
+    def _merge_cached_normalized_nodes(self, curies, cached, fetched):
+        if self.normalization_cache is not None:
+            # Curies the normalizer could not normalize are cached as None
+            self.normalization_cache.set_many({
+                (self.url, curie): self._copy_normalization(fetched.get(curie))
+                for curie in curies if curie not in cached
+                })
+        parse = {}
+        for curie in dict.fromkeys(curies):
+            if curie in cached:
+                normalization_dict = self._copy_normalization(cached[curie])
+            else:
+                normalization_dict = fetched.get(curie)
+            if normalization_dict is not None:
+                parse[curie] = normalization_dict
+        return parse
+
+    def _chunk_curies(self, curies, chunk_size):
+        # Drop duplicate curies while preserving order
+        curies = list(dict.fromkeys(curies))
+        return [curies[i:i + chunk_size] for i in range(0, len(curies), chunk_size)]
+
+    def _get_normalized_nodes_chunk(self, curies, verbose=True):
         _url = self.url + 'get_normalized_nodes'
         #Build json params
         params = {"curies": curies}
 
-        verbose = kwargs.pop('verbose', True)
         try: 
             from_cache, out = self._post(_url, params=params, verbose=verbose)
         except GeneralApiErrorException as ex:
@@ -27,6 +72,70 @@ class SriNodeNormalizerMixin:
         if verbose and from_cache:
             print('Result from cache.')
         return self._parse_normalized_nodes_response(out.json())
+
+    def _get_normalized_nodes(self, curies, **kwargs):
+        """ Returns normalizations for all curies passed. Only curies missing from the
+        normalization cache are sent to the node normalizer.
+
+        :param curies: A list of curies to be normalized.
+        :type curies: list
+
+        :returns: Normalized nodes.
+        :rtype: dict
+        """
+        cached, missing = self._get_cached_normalized_nodes(curies)
+        fetched = self._request_normalized_nodes(missing, **kwargs) if len(missing) > 0 else {}
+        return self._merge_cached_normalized_nodes(curies, cached, fetched)
+
+    def _request_normalized_nodes(self, curies, chunk_size=None, max_workers=None, chunk_retries=None, **kwargs):
+        """ Requests normalizations for all curies passed. Curies are split into chunks that are
+        requested concurrently, and only chunks that fail are retried.
+
+        :param curies: A list of curies to be normalized.
+        :type curies: list
+        :param chunk_size: Maximum number of curies sent in a single request.
+        :type chunk_size: int
+        :param max_workers: Maximum number of chunks requested concurrently.
+        :type max_workers: int
+        :param chunk_retries: Number of times a failed chunk is retried.
+        :type chunk_retries: int
+
+        :returns: Normalized nodes.
+        :rtype: dict
+        """
+        chunk_size = chunk_size or self._default_chunk_size
+        max_workers = max_workers or self._default_max_workers
+        if chunk_retries is None:
+            chunk_retries = self._default_chunk_retries
+        verbose = kwargs.pop('verbose', True)
+
+        parse = {}
+        pending_chunks = self._chunk_curies(curies, chunk_size)
+        for _ in range(chunk_retries + 1):
+            failed_chunks = []
+            if len(pending_chunks) == 1:
+                try:
+                    parse.update(self._get_normalized_nodes_chunk(pending_chunks[0], verbose=verbose))
+                except (SriNodeNormalizerException, requests.RequestException) as ex:
+                    failed_chunks.append(pending_chunks[0])
+                    last_exception = ex
+            else:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(pending_chunks))) as executor:
+                    futures = [
+                            (chunk, executor.submit(self._get_normalized_nodes_chunk, chunk, verbose=verbose))
+                            for chunk in pending_chunks
+                            ]
+                    # Merge in chunk order so results are deterministic
+                    for chunk, future in futures:
+                        try:
+                            parse.update(future.result())
+                        except (SriNodeNormalizerException, requests.RequestException) as ex:
+                            failed_chunks.append(chunk)
+                            last_exception = ex
+            if len(failed_chunks) == 0:
+                return parse
+            pending_chunks = failed_chunks
+        raise last_exception
     
     def _get_curie_prefixes(self, semantic_types, **kwargs):
         """ Returns the prefixes supported for a given list of Biolink semantic_types.
@@ -91,3 +200,121 @@ class SriNodeNormalizerMixin:
 
     def _parse_semantic_types_response(self, resp):
         return resp["semantic_types"]["types"]
+
+
+class AsyncSriNodeNormalizerMixin(SriNodeNormalizerMixin):
+    async def _get_normalized_nodes_chunk(self, curies, verbose=True):
+        _url = self.url + 'get_normalized_nodes'
+        #Build json params
+        params = {"curies": curies}
+
+        try:
+            from_cache, out = await self._post(_url, params=params, verbose=verbose)
+        except GeneralApiErrorException as ex:
+            raise SriNodeNormalizerException(ex.resp, _url)
+
+        if verbose and from_cache:
+            print('Result from cache.')
+        return self._parse_normalized_nodes_response(out.json())
+
+    async def _get_normalized_nodes(self, curies, **kwargs):
+        """ Asynchronously returns normalizations for all curies passed. Only curies missing from the
+        normalization cache are sent to the node normalizer.
+
+        :param curies: A list of curies to be normalized.
+        :type curies: list
+
+        :returns: Normalized nodes.
+        :rtype: dict
+        """
+        cached, missing = self._get_cached_normalized_nodes(curies)
+        fetched = await self._request_normalized_nodes(missing, **kwargs) if len(missing) > 0 else {}
+        return self._merge_cached_normalized_nodes(curies, cached, fetched)
+
+    async def _request_normalized_nodes(self, curies, chunk_size=None, max_workers=None, chunk_retries=None, **kwargs):
+        """ Asynchronously requests normalizations for all curies passed. Curies are split into chunks that are
+        requested concurrently, and only chunks that fail are retried.
+
+        :param curies: A list of curies to be normalized.
+        :type curies: list
+        :param chunk_size: Maximum number of curies sent in a single request.
+        :type chunk_size: int
+        :param max_workers: Maximum number of chunks requested concurrently.
+        :type max_workers: int
+        :param chunk_retries: Number of times a failed chunk is retried.
+        :type chunk_retries: int
+
+        :returns: Normalized nodes.
+        :rtype: dict
+        """
+        chunk_size = chunk_size or self._default_chunk_size
+        max_workers = max_workers or self._default_max_workers
+        if chunk_retries is None:
+            chunk_retries = self._default_chunk_retries
+        verbose = kwargs.pop('verbose', True)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def get_chunk(chunk):
+            async with semaphore:
+                return await self._get_normalized_nodes_chunk(chunk, verbose=verbose)
+
+        parse = {}
+        pending_chunks = self._chunk_curies(curies, chunk_size)
+        for _ in range(chunk_retries + 1):
+            failed_chunks = []
+            results = await asyncio.gather(
+                    *[get_chunk(chunk) for chunk in pending_chunks],
+                    return_exceptions=True,
+                    )
+            for chunk, result in zip(pending_chunks, results):
+                if isinstance(result, (SriNodeNormalizerException, requests.RequestException)):
+                    failed_chunks.append(chunk)
+                    last_exception = result
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    parse.update(result)
+            if len(failed_chunks) == 0:
+                return parse
+            pending_chunks = failed_chunks
+        raise last_exception
+
+    async def _get_curie_prefixes(self, semantic_types, **kwargs):
+        """ Asynchronously returns the prefixes supported for a given list of Biolink semantic_types.
+
+        :param semantic_types: A list of Biolink semantic_types.
+        :type semantic_types: list
+
+        :returns: Associated Biolink curie prefixes.
+        :rtype: dict
+        """
+        _url = self.url + 'get_curie_prefixes/'
+        params = {"semantic_type": semantic_types}
+
+        verbose = kwargs.pop('verbose', True)
+        try:
+            from_cache, out = await self._get(_url, params=params, verbose=verbose)
+        except GeneralApiErrorException as ex:
+            raise SriNodeNormalizerException(ex.resp, _url)
+
+        if verbose and from_cache:
+            print('Result from cache.')
+        return self._parse_curie_prefixes_response(out.json())
+
+    async def _get_semantic_types(self, **kwargs):
+        """ Asynchronously gets the Biolink semantic types that can be normalized.
+
+        :returns: Biolink semantic types that are supported by the node normalizer.
+        :rtype: dict
+        """
+        _url = self.url + 'get_semantic_types'
+        params = None
+
+        verbose = kwargs.pop('verbose', True)
+        try:
+            from_cache, out = await self._get(_url, params=params, verbose=verbose)
+        except GeneralApiErrorException as ex:
+            raise SriNodeNormalizerException(ex.resp, _url)
+        if verbose and from_cache:
+            print('Result from cache.')
+        return self._parse_semantic_types_response(out.json())
@@ -3,8 +3,31 @@ from collections import defaultdict
 from trapi_model.biolink.constants import *
 
 from chp_utils.exceptions import *
+from chp_utils.cache import LRUCache
+
+# Curies that are never sent to the Ontology KP
+BANNED_ONTOLOGY_CURIES = frozenset({
+    'UBERON:0000062',
+    'UBERON:0002530',
+    'UBERON:0000058',
+    'UBERON:0009912',
+    'UBERON:0000483',
+    'UBERON:0003129',
+    'UBERON:0002103',
+    'UBERON:0000970',
+    'UBERON:0001015',
+    })
+
+# Default bounds of the shared (url, biolink entity, curie) descendant cache
+DEFAULT_DESCENDANT_CACHE_SIZE = 100000
+DEFAULT_DESCENDANT_CACHE_TTL = 24 * 60 * 60
 
 class SriOntologyKpMixin:
+    # Shared by every ontology KP client and keyed by url, set to None on an instance to disable.
+    descendant_cache = LRUCache(
+            maxsize=DEFAULT_DESCENDANT_CACHE_SIZE,
+            ttl=DEFAULT_DESCENDANT_CACHE_TTL,
+            )
 
     def _query(self, ontology_query, **kwargs):
         """ Returns all ontological descendants that are present in a given ONTOLOGY query. The KP
@@ -36,10 +59,9 @@ class SriOntologyKpMixin:
         :returns: A dictionary of the Ontology KP result.
         :rtype: dict
         """
-        banned_curies = {'UBERON:0000062', 'UBERON:0002530', 'UBERON:0000058', 'UBERON:0009912', 'UBERON:0000483', 'UBERON:0003129', 'UBERON:0000483', 'UBERON:0002103', 'UBERON:0000970', 'UBERON:0001015'}
         cleaned_curies = []
         for curie in curies:
-            if curie not in banned_curies:
+            if curie not in BANNED_ONTOLOGY_CURIES:
                 cleaned_curies.append(curie)
 
         # Build weird Ontology KP Query graph.
@@ -69,9 +91,31 @@ class SriOntologyKpMixin:
 
         return query
 
+    def _get_cached_ontology_descendants(self, curies, biolink_entity):
+        keys = [(self.url, biolink_entity.get_curie(), curie) for curie in dict.fromkeys(curies)]
+        if self.descendant_cache is None:
+            return {}, [curie for _, _, curie in keys]
+        cached, missing = self.descendant_cache.get_many(keys)
+        return {curie: descendants for (_, _, curie), descendants in cached.items()}, [curie for _, _, curie in missing]
+
+    def _merge_cached_ontology_descendants(self, curies, biolink_entity, cached, fetched):
+        if self.descendant_cache is not None:
+            # Curies without descendants are cached as an empty tuple
+            self.descendant_cache.set_many({
+                (self.url, biolink_entity.get_curie(), curie): tuple(fetched.get(curie, ()))
+                for curie in curies if curie not in cached
+                })
+        parse = {}
+        for curie in dict.fromkeys(curies):
+            descendants = cached[curie] if curie in cached else fetched.get(curie, ())
+            if len(descendants) > 0:
+                parse[curie] = list(descendants)
+        return parse
+
     def _get_ontology_descendants(self, curies, biolink_entity, **kwargs):
         """ Wrapper function that builds an ontology KP query from a list of curies and associated
-        biolink entity and wraps the Ontology KP query endpoint.
+        biolink entity and wraps the Ontology KP query endpoint. Only curies missing from the
+        descendant cache are sent to the Ontology KP.
 
         :param curies: A list of containing all the curies you want ontological descendants.
         :type curies: list
@@ -81,11 +125,14 @@ class SriOntologyKpMixin:
         :returns: A dictionary of the Ontology KP result.
         :rtype: dict
         """
-
-        ontology_query = self._build_ontology_query(curies, biolink_entity)
-        # Pass to query endpoint
-        resp = self._query(ontology_query, **kwargs)
-        return self._parse_ontology_descendants_response(resp)
+        cached, missing = self._get_cached_ontology_descendants(curies, biolink_entity)
+        fetched = {}
+        if len(missing) > 0:
+            ontology_query = self._build_ontology_query(missing, biolink_entity)
+            # Pass to query endpoint
+            resp = self._query(ontology_query, **kwargs)
+            fetched = self._parse_ontology_descendants_response(resp)
+        return self._merge_cached_ontology_descendants(curies, biolink_entity, cached, fetched)
 
     def _parse_ontology_descendants_response(self, resp):
         parse = defaultdict(list)
@@ -94,3 +141,44 @@ class SriOntologyKpMixin:
             descendant = res["node_bindings"]["n1"][0]["id"]
             parse[curie].append(descendant)
         return dict(parse)
+
+
+class AsyncSriOntologyKpMixin(SriOntologyKpMixin):
+
+    async def _query(self, ontology_query, **kwargs):
+        """ Asynchronously returns all ontological descendants that are present in a given ONTOLOGY query.
+
+        :param ontology_query: The specific ontology query that is created via the _build_ontology_query method.
+        :type ontology_query: dict
+        """
+        _url = self.url + 'query'
+        verbose = kwargs.pop('verbose', True)
+        try:
+            from_cache, out = await self._post(_url, params=ontology_query, verbose=verbose)
+        except GeneralApiErrorException as ex:
+            raise SriOntologyKpException(ex.resp, _url, ontology_query)
+        if verbose and from_cache:
+            print('Result from cache.')
+        return out.json()
+
+    async def _get_ontology_descendants(self, curies, biolink_entity, **kwargs):
+        """ Asynchronous wrapper function that builds an ontology KP query from a list of curies and associated
+        biolink entity and wraps the Ontology KP query endpoint. Only curies missing from the
+        descendant cache are sent to the Ontology KP.
+
+        :param curies: A list of containing all the curies you want ontological descendants.
+        :type curies: list
+        :param biolink_entity: The Biolink Entitiy that pertains to the curies.
+        :type biolink_entity: trapi_model.biolink.BiolinkEntity
+
+        :returns: A dictionary of the Ontology KP result.
+        :rtype: dict
+        """
+        cached, missing = self._get_cached_ontology_descendants(curies, biolink_entity)
+        fetched = {}
+        if len(missing) > 0:
+            ontology_query = self._build_ontology_query(missing, biolink_entity)
+            # Pass to query endpoint
+            resp = await self._query(ontology_query, **kwargs)
+            fetched = self._parse_ontology_descendants_response(resp)
+        return self._merge_cached_ontology_descendants(curies, biolink_entity, cached, fetched)
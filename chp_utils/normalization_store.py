@@ -0,0 +1,127 @@
+""" An offline node normalization store built from node normalizer dumps and queried from a memory mapped file.
+"""
+import json
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.mapped_table import MappedTable, write_mapped_table, open_mapped_file
+from chp_utils.mixins.client.sri_node_normalizer import SriNodeNormalizerMixin
+
+NORMALIZATION_STORE_MAGIC = b'CHPNORM1'
+
+class NormalizationStore:
+    """ Answers node normalization lookups from a memory mapped file, so that many worker processes share one
+    copy of the store. Can be passed anywhere a SriNodeNormalizerApiClient is used to get normalized nodes.
+
+    The file holds two mapped tables: one from every equivalent identifier to its clique's preferred identifier,
+    and one from the preferred identifier to the clique serialized as a node normalizer response record.
+
+    :param filename: Path to a store written by NormalizationStore.build.
+    :type filename: str
+    """
+    _parse_normalized_nodes_response = SriNodeNormalizerMixin._parse_normalized_nodes_response
+
+    def __init__(self, filename):
+        self._buffer = open_mapped_file(filename)
+        if self._buffer[:len(NORMALIZATION_STORE_MAGIC)] != NORMALIZATION_STORE_MAGIC:
+            self._buffer.close()
+            raise ValueError('{} is not a normalization store.'.format(filename))
+        self._identifiers = MappedTable(self._buffer, len(NORMALIZATION_STORE_MAGIC))
+        self._cliques = MappedTable(self._buffer, len(NORMALIZATION_STORE_MAGIC) + self._identifiers.nbytes)
+
+    def __len__(self):
+        return len(self._identifiers)
+
+    def __contains__(self, curie):
+        return curie in self._identifiers
+
+    def close(self):
+        self._buffer.close()
+
+    def get_normalization(self, curie):
+        """ Returns the node normalizer response record of a curie, or None if the curie is unknown.
+
+        :rtype: dict
+        """
+        try:
+            preferred_id = self._identifiers[curie].decode('utf-8')
+        except KeyError:
+            return None
+        return json.loads(self._cliques[preferred_id])
+
+    def get_normalized_nodes(self, curies, **kwargs):
+        """ Drop in replacement for SriNodeNormalizerApiClient.get_normalized_nodes.
+
+        :param curies: A list of curies to be normalized.
+        :type curies: list
+
+        :returns: Normalized nodes.
+        :rtype: dict
+        """
+        resp = {curie: self.get_normalization(curie) for curie in dict.fromkeys(curies)}
+        return self._parse_normalized_nodes_response(resp)
+
+    @staticmethod
+    def _expand_types(biolink_type):
+        # Compendia only carry the most specific type, the node normalizer also returns its ancestors.
+        types = [biolink_type]
+        for ancestor in get_biolink_entity(biolink_type).get_ancestors():
+            if ancestor.get_curie() not in types:
+                types.append(ancestor.get_curie())
+        return types
+
+    @classmethod
+    def _read_dump(cls, filename):
+        """ Yields node normalizer response records from a dump. A dump is either a JSON object of node
+        normalizer responses keyed by curie, or a Babel compendium with one clique per line.
+        """
+        with open(filename) as f_:
+            first_char = f_.read(1)
+            f_.seek(0)
+            if first_char == '{' and not filename.endswith(('.txt', '.jsonl')):
+                for record in json.load(f_).values():
+                    if record is not None:
+                        yield record
+                return
+            for line in f_:
+                if not line.strip():
+                    continue
+                clique = json.loads(line)
+                equivalent_identifiers = []
+                for identifier in clique["identifiers"]:
+                    equivalent_identifier = {"identifier": identifier["i"]}
+                    if "l" in identifier:
+                        equivalent_identifier["label"] = identifier["l"]
+                    equivalent_identifiers.append(equivalent_identifier)
+                yield {
+                        "id": equivalent_identifiers[0],
+                        "equivalent_identifiers": equivalent_identifiers,
+                        "type": cls._expand_types(clique["type"]),
+                        }
+
+    @classmethod
+    def build(cls, filename, dump_filenames):
+        """ Builds a store file from node normalizer dumps. When an identifier appears in several cliques the
+        first one read is kept.
+
+        :param filename: Path of the store file to write.
+        :type filename: str
+        :param dump_filenames: Paths of the dumps to read.
+        :type dump_filenames: list
+
+        :returns: The opened store.
+        :rtype: NormalizationStore
+        """
+        identifiers = []
+        cliques = []
+        for dump_filename in dump_filenames:
+            for record in cls._read_dump(dump_filename):
+                preferred_id = record["id"]["identifier"]
+                cliques.append((preferred_id, json.dumps(record, separators=(',', ':')).encode('utf-8')))
+                for equivalent_identifier in record["equivalent_identifiers"]:
+                    identifiers.append((equivalent_identifier["identifier"], preferred_id.encode('utf-8')))
+        with open(filename, 'wb') as f_:
+            f_.write(NORMALIZATION_STORE_MAGIC)
+            write_mapped_table(f_, identifiers)
+            write_mapped_table(f_, cliques)
+        return cls(filename)
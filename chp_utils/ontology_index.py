@@ -0,0 +1,175 @@
+""" An offline index of ontological descendants built from a local snapshot of subclass_of/part_of edges.
+"""
+import csv
+import json
+import sys
+from array import array
+from collections import defaultdict
+
+from chp_utils.mixins.client.sri_ontology_kp import BANNED_ONTOLOGY_CURIES
+
+# Edge predicates that make the subject an ontological descendant of the object
+DEFAULT_ONTOLOGY_PREDICATES = frozenset({
+    'biolink:subclass_of',
+    'biolink:part_of',
+    'rdfs:subClassOf',
+    'BFO:0000050',
+    })
+
+class LocalOntologyIndex:
+    """ Stores the transitive closure of an ontology as compressed sparse row arrays and answers
+    descendant lookups without a round trip to the Ontology KP. Can be passed anywhere a
+    SriOntologyKpApiClient is used to get ontology descendants.
+
+    :param edges: An iterable of (subject, predicate, object) tuples, where the subject is a subclass or part of the object.
+    :type edges: iterable
+    :param categories: Optional map from curie to its Biolink category curies, used to filter descendants by category.
+    :type categories: dict
+    :param predicates: The edge predicates to follow.
+    :type predicates: set
+    """
+    def __init__(self, edges, categories=None, predicates=DEFAULT_ONTOLOGY_PREDICATES):
+        self._ids = []
+        self._index = {}
+        children = defaultdict(list)
+        for subject, predicate, object in edges:
+            if predicate not in predicates or subject == object:
+                continue
+            children[self._add_id(object)].append(self._add_id(subject))
+        self._offsets, self._targets = self._build_closure(children)
+        self._categories = None
+        if categories is not None:
+            self._categories = {
+                    self._index[curie]: frozenset(curie_categories)
+                    for curie, curie_categories in categories.items()
+                    if curie in self._index
+                    }
+
+    def _add_id(self, curie):
+        idx = self._index.get(curie)
+        if idx is None:
+            idx = len(self._ids)
+            curie = sys.intern(curie)
+            self._ids.append(curie)
+            self._index[curie] = idx
+        return idx
+
+    def _build_closure(self, children):
+        offsets = array('q', [0])
+        targets = array('i')
+        for idx in range(len(self._ids)):
+            # Breadth first walk of all descendants, robust to cycles.
+            seen = {idx}
+            frontier = [idx]
+            while frontier:
+                next_frontier = []
+                for node in frontier:
+                    for child in children.get(node, ()):
+                        if child not in seen:
+                            seen.add(child)
+                            next_frontier.append(child)
+                frontier = next_frontier
+            seen.discard(idx)
+            targets.extend(sorted(seen))
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, curie):
+        return curie in self._index
+
+    def descendants(self, curie, biolink_entity=None):
+        """ Returns the curie and all of its ontological descendants.
+
+        :param curie: The curie to look up.
+        :type curie: str
+        :param biolink_entity: If passed, only descendants with this category are returned.
+        :type biolink_entity: trapi_model.biolink.BiolinkEntity
+
+        :returns: Descendant curies, or an empty list if the curie is not in the index.
+        :rtype: list
+        """
+        idx = self._index.get(curie)
+        if idx is None:
+            return []
+        descendant_idxs = [idx]
+        descendant_idxs.extend(self._targets[self._offsets[idx]:self._offsets[idx + 1]])
+        if biolink_entity is not None and self._categories is not None:
+            category = biolink_entity.get_curie()
+            descendant_idxs = [
+                    descendant_idx for descendant_idx in descendant_idxs
+                    if descendant_idx not in self._categories or category in self._categories[descendant_idx]
+                    ]
+        return [self._ids[descendant_idx] for descendant_idx in descendant_idxs]
+
+    def get_ontology_descendants(self, curies, biolink_entity, **kwargs):
+        """ Drop in replacement for SriOntologyKpApiClient.get_ontology_descendants.
+
+        :param curies: A list of containing all the curies you want ontological descendants.
+        :type curies: list
+        :param biolink_entity: The Biolink Entitiy that pertains to the curies.
+        :type biolink_entity: trapi_model.biolink.BiolinkEntity
+
+        :returns: A dictionary of curie to descendant curies.
+        :rtype: dict
+        """
+        parse = {}
+        for curie in dict.fromkeys(curies):
+            if curie in BANNED_ONTOLOGY_CURIES:
+                continue
+            descendants = self.descendants(curie, biolink_entity)
+            if len(descendants) > 0:
+                parse[curie] = descendants
+        return parse
+
+    @staticmethod
+    def _read_tsv(filename):
+        with open(filename, newline='') as f_:
+            reader = csv.reader(f_, delimiter='\t')
+            rows = list(reader)
+        if len(rows) == 0:
+            return []
+        header = rows[0]
+        if 'subject' in header and 'object' in header:
+            if 'predicate' not in header:
+                raise ValueError('Ontology dump {} has subject and object columns but no predicate column.'.format(filename))
+            subject_col, predicate_col, object_col = header.index('subject'), header.index('predicate'), header.index('object')
+            rows = rows[1:]
+        else:
+            subject_col, predicate_col, object_col = 0, 1, 2
+        return [(row[subject_col], row[predicate_col], row[object_col]) for row in rows if len(row) > 2]
+
+    @staticmethod
+    def _read_json(filename):
+        with open(filename) as f_:
+            data = json.load(f_)
+        categories = None
+        if isinstance(data, dict):
+            if "nodes" in data:
+                categories = {}
+                for node in data["nodes"]:
+                    node_categories = node.get("category", node.get("categories", []))
+                    if isinstance(node_categories, str):
+                        node_categories = [node_categories]
+                    categories[node["id"]] = node_categories
+            data = data["edges"]
+        edges = [(edge["subject"], edge["predicate"], edge["object"]) for edge in data]
+        return edges, categories
+
+    @classmethod
+    def load(cls, filename, predicates=DEFAULT_ONTOLOGY_PREDICATES):
+        """ Builds an index from a dump of ontology edges. TSV dumps (.tsv) have subject, predicate and object
+        columns, with an optional header. JSON dumps are either a list of edge objects with subject, predicate
+        and object keys, or a KGX style object with edges and optional nodes, whose categories are used for
+        category filtering.
+
+        :param filename: Path to the ontology dump.
+        :type filename: str
+        """
+        if filename.endswith('.tsv'):
+            edges, categories = cls._read_tsv(filename), None
+        else:
+            edges, categories = cls._read_json(filename)
+        return cls(edges, categories=categories, predicates=predicates)
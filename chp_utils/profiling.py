@@ -0,0 +1,146 @@
+""" Opt-in per stage profiling of query processing.
+"""
+import time
+import asyncio
+import logging
+import functools
+
+from chp_utils.client import get_request_counts
+
+logger = logging.getLogger(__name__)
+
+def get_default_profiled_caches():
+    """ Returns the caches whose hits and misses are reported for every stage by default. Imported on first
+    use, so that profiling costs no imports when it is disabled.
+
+    :rtype: dict
+    """
+    from chp_utils.mixins.client.sri_node_normalizer import SriNodeNormalizerMixin
+    from chp_utils.mixins.client.sri_ontology_kp import SriOntologyKpMixin
+    from chp_utils.semantic_operations.semantic_processor import DESCENDANT_LOOKUP_CACHE
+    return {
+            "normalization": SriNodeNormalizerMixin.normalization_cache,
+            "ontology_descendants": SriOntologyKpMixin.descendant_cache,
+            "biolink_descendants": DESCENDANT_LOOKUP_CACHE,
+            }
+
+def _count_queries(queries):
+    if queries is None:
+        return None
+    if isinstance(queries, tuple):
+        # e.g. (queries, normalization_map)
+        queries = queries[0]
+    if isinstance(queries, (list, set)):
+        return len(queries)
+    return 1
+
+
+class StageProfiler:
+    """ Records the wall time, number of queries in and out, number of HTTP requests and cache hits of each
+    query processing stage. Pass it to a BaseQueryProcessor to profile its stages.
+
+    HTTP requests and cache hits are counted process wide, so stages running concurrently in other threads
+    are included in each other's counts.
+
+    :param callback: Called with the record of every stage as it ends, e.g. to export to StatsD or Prometheus.
+    :type callback: callable
+    :param caches: A map from name to chp_utils.cache.LRUCache of the caches to report, defaults to the
+        node normalization, ontology descendant and Biolink descendant caches.
+    :type caches: dict
+    """
+    def __init__(self, callback=None, caches=None):
+        self.callback = callback
+        self.caches = get_default_profiled_caches() if caches is None else caches
+        self.stages = []
+
+    def _snapshot(self):
+        return (
+                time.perf_counter(),
+                get_request_counts(),
+                {name: (cache.hits, cache.misses) for name, cache in self.caches.items()},
+                )
+
+    def start(self, name, queries=None):
+        """ Starts a stage and returns the token to pass to end.
+        """
+        return (name, _count_queries(queries), self._snapshot())
+
+    def end(self, token, queries=None):
+        """ Ends a stage, stores and returns its record.
+
+        :rtype: dict
+        """
+        name, queries_in, (start, start_requests, start_caches) = token
+        end, end_requests, end_caches = self._snapshot()
+        record = {
+                "stage": name,
+                "wall_time": end - start,
+                "queries_in": queries_in,
+                "queries_out": _count_queries(queries),
+                "http_requests": end_requests["requests"] - start_requests["requests"],
+                "http_requests_from_cache": end_requests["from_cache"] - start_requests["from_cache"],
+                "cache_hits": {
+                    name: end_caches[name][0] - start_caches[name][0] for name in end_caches
+                    },
+                "cache_misses": {
+                    name: end_caches[name][1] - start_caches[name][1] for name in end_caches
+                    },
+                }
+        self.stages.append(record)
+        if self.callback is not None:
+            try:
+                self.callback(record)
+            except Exception:
+                logger.exception('Profiling callback failed for stage %s.', name)
+        return record
+
+    def reset(self):
+        self.stages = []
+
+    def to_dict(self):
+        """ Returns every stage record and the total time spent per stage.
+
+        :rtype: dict
+        """
+        totals = {}
+        for record in self.stages:
+            totals[record["stage"]] = totals.get(record["stage"], 0) + record["wall_time"]
+        return {
+                "stages": list(self.stages),
+                "total_wall_time": totals,
+                }
+
+
+def profile_stage(name, queries_arg=0):
+    """ Decorates a BaseQueryProcessor method so that it is recorded as a stage by the processor's profiler.
+    Methods run undecorated when the processor has no profiler.
+
+    :param name: Name of the stage.
+    :type name: str
+    :param queries_arg: Position of the argument holding the stage's input queries, not counting self.
+    :type queries_arg: int
+    """
+    def decorator(method):
+        if asyncio.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                profiler = getattr(self, 'profiler', None)
+                if profiler is None:
+                    return await method(self, *args, **kwargs)
+                token = profiler.start(name, args[queries_arg] if len(args) > queries_arg else None)
+                result = await method(self, *args, **kwargs)
+                profiler.end(token, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            token = profiler.start(name, args[queries_arg] if len(args) > queries_arg else None)
+            result = method(self, *args, **kwargs)
+            profiler.end(token, result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+""" A copy on write representation of a query expansion.
+"""
+
+class QueryVariant:
+    """ A variant of a base query that stores only the node ids, node categories and edge predicates it
+    overrides, plus the log messages it adds. The base query is shared between variants and only copied
+    when the variant is materialized. Logs are replayed onto the materialized query in the order they
+    were added.
+
+    :param base_query: The query the variant is derived from.
+    :type base_query: trapi_model.query.Query
+    """
+    def __init__(self, base_query, node_ids=None, node_categories=None, edge_predicates=None):
+        self.base_query = base_query
+        self.node_ids = node_ids if node_ids is not None else {}
+        self.node_categories = node_categories if node_categories is not None else {}
+        self.edge_predicates = edge_predicates if edge_predicates is not None else {}
+        self.logs = []
+
+    @property
+    def query_graph(self):
+        """ The base query graph, without the overrides applied. """
+        return self.base_query.message.query_graph
+
+    def get_node_ids(self, node_id):
+        if node_id in self.node_ids:
+            return self.node_ids[node_id]
+        return self.query_graph.nodes[node_id].ids
+
+    def get_node_categories(self, node_id):
+        if node_id in self.node_categories:
+            return self.node_categories[node_id]
+        return self.query_graph.nodes[node_id].categories
+
+    def get_edge_predicates(self, edge_id):
+        if edge_id in self.edge_predicates:
+            return self.edge_predicates[edge_id]
+        return self.query_graph.edges[edge_id].predicates
+
+    def derive(self, node_ids=None, node_categories=None, edge_predicates=None):
+        """ Returns a variant of the same base query with these overrides applied on top of this variant's,
+        and a copy of its logs.
+
+        :rtype: QueryVariant
+        """
+        variant = QueryVariant(
+                self.base_query,
+                node_ids=dict(self.node_ids, **(node_ids or {})),
+                node_categories=dict(self.node_categories, **(node_categories or {})),
+                edge_predicates=dict(self.edge_predicates, **(edge_predicates or {})),
+                )
+        variant.logs = list(self.logs)
+        return variant
+
+    def add_logs(self, logs):
+        """ Adds logs, as returned by trapi_model.logger.Logger.to_dict, to merge into the materialized query.
+        """
+        self.logs.append(('add_logs', logs))
+
+    def info(self, message):
+        self.logs.append(('info', message))
+
+    def warning(self, message):
+        self.logs.append(('warning', message))
+
+    def error(self, message):
+        self.logs.append(('error', message))
+
+    def materialize(self):
+        """ Builds the full query the variant stands for.
+
+        :rtype: trapi_model.query.Query
+        """
+        query = self.base_query.get_copy()
+        query_graph = query.message.query_graph
+        for node_id, ids in self.node_ids.items():
+            query_graph.nodes[node_id].ids = list(ids)
+        for node_id, categories in self.node_categories.items():
+            query_graph.nodes[node_id].categories = list(categories)
+        for edge_id, predicates in self.edge_predicates.items():
+            query_graph.edges[edge_id].predicates = list(predicates)
+        for level, message in self.logs:
+            if level == 'add_logs':
+                query.logger.add_logs(message)
+            else:
+                getattr(query, level)(message)
+        return query
+
+
+def as_query_variant(query):
+    """ Returns the query if it is a QueryVariant, or a variant of it without overrides.
+
+    :rtype: QueryVariant
+    """
+    if isinstance(query, QueryVariant):
+        return query
+    return QueryVariant(query)
+
+
+def materialize(query):
+    """ Returns the full query of a QueryVariant, or the query itself if it is not a variant.
+
+    :rtype: trapi_model.query.Query
+    """
+    if isinstance(query, QueryVariant):
+        return query.materialize()
+    return query
@@ -0,0 +1,152 @@
+""" Incremental merging of TRAPI response queries.
+"""
+import threading
+from copy import deepcopy
+
+from chp_utils.substitution import iter_results
+
+def _iter_bindings(bindings):
+    for binding in bindings.values() if bindings else ():
+        if not isinstance(binding, list):
+            binding = [binding]
+        for b in binding:
+            yield b
+
+def _get_edge_triple(edge):
+    predicate = getattr(edge, 'predicate', None)
+    if predicate is not None and hasattr(predicate, 'get_curie'):
+        predicate = predicate.get_curie()
+    return (edge.subject, predicate, edge.object)
+
+def _copy_without(obj, *attrs):
+    # Deep copies an object except for the given attributes, which are left empty so they can be replaced.
+    memo = {id(getattr(obj, attr)): type(getattr(obj, attr))() for attr in attrs}
+    return deepcopy(obj, memo)
+
+def get_result_key(result):
+    """ Returns a canonical key of the node and edge bindings of a result, so that results binding the same
+    knowledge graph elements to the same query graph elements compare equal regardless of binding order.
+
+    :rtype: frozenset
+    """
+    key = []
+    for qnode_id, bindings in (result.node_bindings or {}).items():
+        if not isinstance(bindings, list):
+            bindings = [bindings]
+        key.append(('n', qnode_id, frozenset(binding.id for binding in bindings)))
+    for qedge_id, bindings in (getattr(result, 'edge_bindings', None) or {}).items():
+        if not isinstance(bindings, list):
+            bindings = [bindings]
+        key.append(('e', qedge_id, frozenset(binding.id for binding in bindings)))
+    return frozenset(key)
+
+
+class ResponseMerger:
+    """ Merges sub-response queries into a single response query. Knowledge graph nodes and edges are
+    accumulated in dictionaries keyed by id and results are deduplicated by their bindings, so every
+    sub-response is processed once and the response message is updated a single time in finalize.
+
+    Sub-responses may be added as they complete, from several threads. Their messages are consumed: edges
+    whose id clashes with a different edge are renamed together with their edge bindings.
+
+    :param target_query: The query the response is built from.
+    :type target_query: trapi_model.query.Query
+    """
+    def __init__(self, target_query):
+        self.response_query = target_query.get_copy()
+        self.nodes = {}
+        self.edges = {}
+        self.results = []
+        self._edge_triples = {}
+        self._result_keys = set()
+        self._knowledge_graph = None
+        self._results_container = None
+        self._num_responses = 0
+        self._lock = threading.Lock()
+        self.finalized = False
+
+    def __len__(self):
+        return self._num_responses
+
+    def _merge_knowledge_graph(self, knowledge_graph):
+        """ Merges the nodes and edges of a knowledge graph and returns the renamed edge ids.
+        """
+        edge_id_map = {}
+        for node_id, node in knowledge_graph.nodes.items():
+            if node_id not in self.nodes:
+                self.nodes[node_id] = node
+        for edge_id, edge in knowledge_graph.edges.items():
+            triple = _get_edge_triple(edge)
+            if edge_id in self.edges:
+                if self._edge_triples[edge_id] == triple:
+                    continue
+                new_edge_id = edge_id
+                i = 1
+                while new_edge_id in self.edges:
+                    new_edge_id = '{}_{}'.format(edge_id, i)
+                    i += 1
+                edge_id_map[edge_id] = new_edge_id
+                edge_id = new_edge_id
+            self.edges[edge_id] = edge
+            self._edge_triples[edge_id] = triple
+        return edge_id_map
+
+    def _merge_results(self, message, edge_id_map):
+        for result in iter_results(message):
+            if edge_id_map:
+                for binding in _iter_bindings(getattr(result, 'edge_bindings', None)):
+                    binding.id = edge_id_map.get(binding.id, binding.id)
+            result_key = get_result_key(result)
+            if result_key in self._result_keys:
+                continue
+            self._result_keys.add(result_key)
+            self.results.append(result)
+
+    def add(self, query):
+        """ Merges a sub-response query.
+
+        :param query: The sub-response query.
+        :type query: trapi_model.query.Query
+        """
+        message = query.message
+        with self._lock:
+            if self.finalized:
+                raise RuntimeError('Can not add responses to a finalized merger.')
+            knowledge_graph = getattr(message, 'knowledge_graph', None)
+            edge_id_map = {}
+            if knowledge_graph is not None:
+                if self._knowledge_graph is None:
+                    self._knowledge_graph = knowledge_graph
+                edge_id_map = self._merge_knowledge_graph(knowledge_graph)
+            if self._results_container is None and getattr(message, 'results', None) is not None:
+                self._results_container = message.results
+            self._merge_results(message, edge_id_map)
+            self.response_query.logger.add_logs(query.logger.to_dict())
+            self._num_responses += 1
+
+    def add_many(self, queries):
+        for query in queries:
+            self.add(query)
+        return self
+
+    def finalize(self):
+        """ Updates the response message with everything merged so far. No responses may be added afterwards.
+
+        :rtype: trapi_model.query.Query
+        """
+        with self._lock:
+            if self.finalized:
+                return self.response_query
+            self.finalized = True
+            if self._knowledge_graph is None:
+                return self.response_query
+            # Sub-responses are never modified through the response knowledge graph or results.
+            knowledge_graph = _copy_without(self._knowledge_graph, 'nodes', 'edges')
+            knowledge_graph.nodes = self.nodes
+            knowledge_graph.edges = self.edges
+            results = self.results
+            if self._results_container is not None and hasattr(self._results_container, 'results'):
+                results = _copy_without(self._results_container, 'results')
+                results.results = self.results
+            self.response_query.message.update(knowledge_graph, results)
+            return self.response_query
@@ -0,0 +1,73 @@
+""" A precomputed, versioned table of Biolink category and predicate descendants.
+"""
+import json
+from collections import defaultdict
+
+from trapi_model.biolink.constants import get_biolink_entity
+
+class BiolinkHierarchy:
+    """ Maps Biolink category and predicate curies to their descendant curies, so descendant lookups
+    need no call to the Biolink lookup service.
+
+    :param descendants: A map from a Biolink curie to a list of its descendant curies, excluding itself.
+    :type descendants: dict
+    :param biolink_version: The Biolink model version the table was built from.
+    :type biolink_version: str
+    """
+    def __init__(self, descendants, biolink_version=None):
+        self.biolink_version = biolink_version
+        self.descendants = {curie: list(curie_descendants) for curie, curie_descendants in descendants.items()}
+        self._descendant_sets = {curie: frozenset(curie_descendants) for curie, curie_descendants in descendants.items()}
+
+    def get_descendants(self, curie):
+        """ Returns the descendants of a Biolink curie, excluding the curie itself.
+
+        :rtype: frozenset
+        """
+        return self._descendant_sets.get(curie, frozenset())
+
+    @classmethod
+    def from_trapi_model(cls, curies, biolink_version=None):
+        """ Builds a table from trapi_model's local Biolink model. Only the passed curies are listed as
+        descendants, but every one of their ancestors is a key, which is all a descendant membership
+        check against these curies needs.
+
+        trapi_model always answers from the Biolink model version it ships with, so a table for another
+        version can not be built here. Save one built against that version and load it instead, or use the
+        Biolink lookup service.
+
+        :param curies: The Biolink curies that may appear as descendants, e.g. those of a meta KG.
+        :type curies: iterable
+        :param biolink_version: Must be None, i.e. trapi_model's own Biolink model.
+        :type biolink_version: str
+        """
+        if biolink_version is not None:
+            raise ValueError(
+                    'Can not build a Biolink hierarchy for version {} from trapi_model, which only holds its own '
+                    'Biolink model. Load a saved hierarchy or use the remote lookup instead.'.format(biolink_version)
+                    )
+        descendants = defaultdict(list)
+        for curie in curies:
+            for ancestor in get_biolink_entity(curie).get_ancestors():
+                ancestor_curie = ancestor.get_curie()
+                if ancestor_curie != curie and curie not in descendants[ancestor_curie]:
+                    descendants[ancestor_curie].append(curie)
+        return cls(descendants, biolink_version=biolink_version)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f_:
+            data = json.load(f_)
+        return cls(data["descendants"], biolink_version=data.get("biolink_version"))
+
+    def to_dict(self):
+        return {
+                "biolink_version": self.biolink_version,
+                "descendants": self.descendants,
+                }
+
+    def json(self, filename=None):
+        if filename is None:
+            return json.dumps(self.to_dict(), indent=2)
+        with open(filename, 'w') as f_:
+            json.dump(self.to_dict(), f_, indent=2)
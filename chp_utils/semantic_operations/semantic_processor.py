@@ -1,11 +1,15 @@
-import requests
 import json
 from trapi_model.query_graph import QueryGraph
 from trapi_model.biolink.constants import get_biolink_entity
 from chp_utils.semantic_operations.semantic_processor_exceptions import *
+from chp_utils.semantic_operations.biolink_hierarchy import BiolinkHierarchy
+from chp_utils.cache import LRUCache
+from chp_utils.client import send_request
+from chp_utils.meta_kg.registry import get_meta_kg_view
 import pkg_resources
 import os
 import logging
+import threading
 # Setup logging
 logging.addLevelName(25, "NOTE")
 # Add a special logging function
@@ -14,76 +18,133 @@ def note(self, message, *args, **kwargs):
 logging.Logger.note = note
 logger = logging.getLogger(__name__)
 
+# Memo of remote Biolink descendant lookups keyed by (biolink version, curie), shared by all semantic processors
+DESCENDANT_LOOKUP_CACHE = LRUCache(maxsize=10000, ttl=24 * 60 * 60)
+
+# Biolink descendant tables built from trapi_model, keyed by meta KG filename
+_BIOLINK_HIERARCHIES = {}
+_biolink_hierarchies_lock = threading.Lock()
+
+def invalidate_descendant_lookup_cache() -> None:
+    """ Drops all memoized remote Biolink descendant lookups.
+    """
+    DESCENDANT_LOOKUP_CACHE.clear()
+
+def get_descendant_lookup_stats() -> dict:
+    """ Returns hit (saved lookup), miss, eviction and size statistics of the descendant lookup memo.
+    """
+    return DESCENDANT_LOOKUP_CACHE.stats()
+
 class SemanticProcessor():
+    """ Resolves a query graph against the CHP meta knowledge graph using Biolink semantics.
+
+    :param biolink_hierarchy: A precomputed Biolink descendant table. If neither it nor a filename is passed,
+        one is built from trapi_model's local Biolink model for the categories and predicates in the meta KG.
+    :type biolink_hierarchy: chp_utils.semantic_operations.biolink_hierarchy.BiolinkHierarchy
+    :param biolink_hierarchy_filename: Path to a saved Biolink descendant table.
+    :type biolink_hierarchy_filename: str
+    :param biolink_version: The Biolink version of the lookup service. Tables built from trapi_model always use its
+        own Biolink model, so a version can only be passed with a saved table or with use_remote_lookup.
+    :type biolink_version: str
+    :param use_remote_lookup: Resolve descendants with the Biolink lookup service instead of the table.
+    :type use_remote_lookup: bool
+    """
     
-    def __init__(self) -> None:
-        self._get_meta_kg()
+    def __init__(
+            self,
+            biolink_hierarchy=None,
+            biolink_hierarchy_filename=None,
+            biolink_version=None,
+            use_remote_lookup=False,
+            meta_kg_filename=None,
+            ) -> None:
+        if biolink_hierarchy is not None and biolink_hierarchy_filename is not None:
+            raise ValueError('Must pass in either biolink hierarchy or filename, not both.')
+        self._get_meta_kg(meta_kg_filename)
         self._get_node_definitions()
         self._get_edge_definitions()
         self._get_wildcard_definitions()
+        self.biolink_version = biolink_version
+        self.use_remote_lookup = use_remote_lookup
+        if biolink_hierarchy_filename is not None:
+            biolink_hierarchy = BiolinkHierarchy.load(biolink_hierarchy_filename)
+        elif biolink_hierarchy is None and not use_remote_lookup:
+            biolink_hierarchy = self._get_biolink_hierarchy(biolink_version)
+        self.biolink_hierarchy = biolink_hierarchy
+
+    def _get_biolink_hierarchy(self, biolink_version) -> BiolinkHierarchy:
+        # Built once per meta KG, from trapi_model's own Biolink model
+        if biolink_version is not None:
+            raise ValueError(
+                    'Biolink version {} needs a saved biolink hierarchy or use_remote_lookup, trapi_model only '
+                    'holds its own Biolink model.'.format(biolink_version)
+                    )
+        key = self._meta_kg_view.filename
+        with _biolink_hierarchies_lock:
+            biolink_hierarchy = _BIOLINK_HIERARCHIES.get(key)
+            if biolink_hierarchy is None:
+                biolink_hierarchy = BiolinkHierarchy.from_trapi_model(self._meta_kg_view.terms)
+                _BIOLINK_HIERARCHIES[key] = biolink_hierarchy
+        return biolink_hierarchy
 
-    def _biolink_category_descendent_lookup(self, biolinkCategory) -> json:
-            url = "https://bl-lookup-sri.renci.org/bl/"+biolinkCategory+"/descendants?version=latest"
-            response = requests.get(url)
+    def _remote_biolink_category_descendent_lookup(self, biolinkCategory) -> frozenset:
+        version = self.biolink_version if self.biolink_version is not None else 'latest'
+        url = "https://bl-lookup-sri.renci.org/bl/"+biolinkCategory+"/descendants?version="+version
+        # Sent through the pooled session, so the lookup is counted with the client requests
+        response = send_request('get', url)
+        # Raise on error responses, so their body is never taken for descendants
+        response.raise_for_status()
+        descendants = response.json()
+        if not isinstance(descendants, list):
+            raise ValueError('Unexpected Biolink lookup response for {}: {}'.format(biolinkCategory, descendants))
+        return frozenset(descendants)
 
-            return response.json()
+    def _biolink_category_descendent_lookup(self, biolinkCategory) -> frozenset:
+        if not self.use_remote_lookup:
+            return self.biolink_hierarchy.get_descendants(biolinkCategory)
+        # Keyed by version, so processors on different Biolink versions share the memo without clashing. Failed
+        # lookups raise before anything is memoized.
+        key = (self.biolink_version, biolinkCategory)
+        descendants = DESCENDANT_LOOKUP_CACHE.get(key)
+        if descendants is None:
+            descendants = self._remote_biolink_category_descendent_lookup(biolinkCategory)
+            DESCENDANT_LOOKUP_CACHE.set(key, descendants)
+        return descendants
         
-    def _get_meta_kg(self)->None:
-        curfilePath = os.path.abspath(__file__)
+    def _get_meta_kg(self, meta_kg_filename=None)->None:
+        self._meta_kg_view = get_meta_kg_view(meta_kg_filename)
+        self._meta_kg = None
 
-        # this will return current directory in which python file resides.
-        curDir = os.path.abspath(os.path.join(curfilePath, os.pardir))
+    @property
+    def meta_kg(self) -> dict:
+        # Copied from the shared view on first use only
+        if self._meta_kg is None:
+            self._meta_kg = self._meta_kg_view.to_dict()
+        return self._meta_kg
 
-        # this will return parent directory.
-        parentDir = os.path.abspath(os.path.join(curDir, os.pardir))
-        
-        #resource_package = __name__
-        resource_path = parentDir+'/'.join(('/schemas', 'meta-kg.json'))
-        #file_str = pkg_resources.resource_string(parentDir, resource_path)
-        meta_kg_file = open(resource_path, 'r')
-        self.meta_kg = json.load(meta_kg_file)
+    @meta_kg.setter
+    def meta_kg(self, meta_kg) -> None:
+        self._meta_kg = meta_kg
     
     def _get_wildcard_definitions(self)->None:        
-        metakg_edge_definitions = self.meta_kg["edges"]
-        self.subject_wildcard_definitions = {}
-        self.object_wildcard_definitions = {}
-
-        for metakg_edge_definition in metakg_edge_definitions:
-            subject_category = metakg_edge_definition["subject"]
-            predicate = metakg_edge_definition["predicate"]
-            object_category = metakg_edge_definition["object"]
-            
-            if self.subject_wildcard_definitions.get(object_category) == None:
-                self.subject_wildcard_definitions.update({object_category : list()})
-
-            self.subject_wildcard_definitions[object_category].append({predicate:subject_category})
-
-            if self.object_wildcard_definitions.get(subject_category) == None:
-                self.object_wildcard_definitions.update({subject_category:list()})
-
-            self.object_wildcard_definitions[subject_category].append({predicate:object_category})
+        self.subject_wildcard_definitions = {
+                object: [dict(definition) for definition in definitions]
+                for object, definitions in self._meta_kg_view.subject_wildcard_definitions.items()
+                }
+        self.object_wildcard_definitions = {
+                subject: [dict(definition) for definition in definitions]
+                for subject, definitions in self._meta_kg_view.object_wildcard_definitions.items()
+                }
         
     def _get_node_definitions(self)->None:
-        metakg_node_definitions = self.meta_kg["nodes"]
-        self.supported_categories = metakg_node_definitions.keys()
-        self._node_definitions = dict()
-        for node_definition in metakg_node_definitions:
-            for prefix in metakg_node_definitions[node_definition]["id_prefixes"]:
-                self._node_definitions.update({prefix:node_definition})
+        self.supported_categories = dict.fromkeys(self._meta_kg_view.node_categories).keys()
+        self._node_definitions = self._meta_kg_view.node_definitions
 
     def _get_edge_definitions(self)->None:
-        metakg_edge_definitions = self.meta_kg["edges"]
-        self.edge_definitions = dict()
-        for metakg_edge_definition in metakg_edge_definitions:
-            subject = metakg_edge_definition["subject"]
-            predicate = metakg_edge_definition["predicate"]
-            object = metakg_edge_definition["object"]
-            if self.edge_definitions.get(subject) == None:
-                self.edge_definitions.update({subject:({object:predicate})})
-            else:
-                tmp_dict = self.edge_definitions.get(subject)
-                tmp_dict.update({object:predicate})
-                self.edge_definitions.update({subject:tmp_dict})
+        self.edge_definitions = {
+                subject: dict(object_predicates)
+                for subject, object_predicates in self._meta_kg_view.edge_definitions.items()
+                }
 
     def _process_nodes(self, query_graph: QueryGraph) -> None:
         qnodes = query_graph.nodes
@@ -100,8 +161,7 @@ class SemanticProcessor():
                     if expected_category not in provided_categories:
                         category_descendant_found = False
                         for provided_category in provided_categories:
-                            descendants = self._biolink_category_descendent_lookup(provided_category)
-                            descendants.append(provided_category)
+                            descendants = self._biolink_category_descendent_lookup(provided_category) | {provided_category}
                             print(expected_category)
                             if expected_category in descendants:
                                 category_descendant_found = True
@@ -165,13 +225,10 @@ class SemanticProcessor():
                 
                 for provided_subject_category in provided_subject_categories:
                     for provided_predicate in provided_predicates:
-                        wildcard_subject_descendents = self._biolink_category_descendent_lookup(provided_subject_category)
-                        wildcard_subject_descendents.append(provided_subject_category)
+                        wildcard_subject_descendents = self._biolink_category_descendent_lookup(provided_subject_category) | {provided_subject_category}
 
-                        provided_predicate_descendents = self._biolink_category_descendent_lookup(provided_predicate)
-                        provided_predicate_descendents.append(provided_predicate)
+                        provided_predicate_descendents = self._biolink_category_descendent_lookup(provided_predicate) | {provided_predicate}
 
-                        wildcard_subject_descendents = set(wildcard_subject_descendents)
                         if possible_predicate in provided_predicate_descendents and possible_subject in wildcard_subject_descendents:
                             matches_found = matches_found + 1
                             tuple_match = (possible_subject,possible_predicate)
@@ -214,14 +271,10 @@ class SemanticProcessor():
                 
                 for provided_object_category in provided_object_categories:
                     for provided_predicate in provided_predicates:
-                        wildcard_object_descendents = self._biolink_category_descendent_lookup(provided_object_category)
-                        wildcard_object_descendents.append(provided_object_category) 
+                        wildcard_object_descendents = self._biolink_category_descendent_lookup(provided_object_category) | {provided_object_category}
 
-                        provided_predicate_descendents = self._biolink_category_descendent_lookup(provided_predicate)
-                        provided_predicate_descendents.append(provided_predicate)
+                        provided_predicate_descendents = self._biolink_category_descendent_lookup(provided_predicate) | {provided_predicate}
 
-                        wildcard_object_descendents = set(wildcard_object_descendents)
-                        
                         if possible_predicate in provided_predicate_descendents and possible_object in wildcard_object_descendents:
                             matches_found = matches_found + 1
                             tuple_match = (possible_object,possible_predicate)
@@ -0,0 +1,161 @@
+""" Targeted curie substitution over TRAPI messages.
+"""
+from collections import defaultdict
+
+from trapi_model.biolink.constants import get_biolink_entity
+
+# Location kinds
+QUERY_NODE_IDS = 'query_node_ids'
+QUERY_NODE_CATEGORIES = 'query_node_categories'
+QUERY_EDGE_PREDICATES = 'query_edge_predicates'
+KNOWLEDGE_GRAPH_NODE_KEY = 'knowledge_graph_node_key'
+KNOWLEDGE_GRAPH_NODE_CATEGORIES = 'knowledge_graph_node_categories'
+KNOWLEDGE_GRAPH_EDGE_SUBJECT = 'knowledge_graph_edge_subject'
+KNOWLEDGE_GRAPH_EDGE_OBJECT = 'knowledge_graph_edge_object'
+KNOWLEDGE_GRAPH_EDGE_PREDICATE = 'knowledge_graph_edge_predicate'
+RESULT_NODE_BINDING = 'result_node_binding'
+
+def iter_results(message):
+    """ Yields the results of a message, whether they are wrapped in a Results object or not.
+    """
+    results = getattr(message, 'results', None)
+    if results is None:
+        return
+    for result in getattr(results, 'results', results):
+        yield result
+
+def iter_node_bindings(result):
+    for bindings in result.node_bindings.values():
+        if not isinstance(bindings, list):
+            bindings = [bindings]
+        for binding in bindings:
+            yield binding
+
+class CurieSubstitutionIndex:
+    """ Indexes every location of every curie in a message, so that substitutions touch only the locations
+    where a curie occurs and report whether anything changed without reserializing the message.
+
+    Indexed locations are query graph node ids and categories, query graph edge predicates, knowledge graph
+    node keys and categories, knowledge graph edge subjects, objects and predicates, and result node bindings.
+
+    :param message: The message to index. It is modified in place by substitute.
+    :type message: trapi_model.message.Message
+    """
+    def __init__(self, message):
+        self.message = message
+        self._index = defaultdict(list)
+        self._build()
+
+    def _add(self, curie, kind, container, key=None):
+        self._index[curie].append((kind, container, key))
+
+    def _build(self):
+        query_graph = getattr(self.message, 'query_graph', None)
+        if query_graph is not None:
+            for node in query_graph.nodes.values():
+                for curie in dict.fromkeys(node.ids or []):
+                    self._add(curie, QUERY_NODE_IDS, node)
+                for category in node.categories or []:
+                    self._add(category.get_curie(), QUERY_NODE_CATEGORIES, node)
+            for edge in query_graph.edges.values():
+                for predicate in edge.predicates or []:
+                    self._add(predicate.get_curie(), QUERY_EDGE_PREDICATES, edge)
+        knowledge_graph = getattr(self.message, 'knowledge_graph', None)
+        if knowledge_graph is not None:
+            for node_key, node in knowledge_graph.nodes.items():
+                self._add(node_key, KNOWLEDGE_GRAPH_NODE_KEY, knowledge_graph)
+                for category in getattr(node, 'categories', None) or []:
+                    self._add(category.get_curie(), KNOWLEDGE_GRAPH_NODE_CATEGORIES, node)
+            for edge in knowledge_graph.edges.values():
+                self._add(edge.subject, KNOWLEDGE_GRAPH_EDGE_SUBJECT, edge)
+                self._add(edge.object, KNOWLEDGE_GRAPH_EDGE_OBJECT, edge)
+                if getattr(edge, 'predicate', None) is not None:
+                    self._add(edge.predicate.get_curie(), KNOWLEDGE_GRAPH_EDGE_PREDICATE, edge)
+        for result in iter_results(self.message):
+            for binding in iter_node_bindings(result):
+                self._add(binding.id, RESULT_NODE_BINDING, binding)
+
+    def __contains__(self, curie):
+        return len(self._index.get(curie, ())) > 0
+
+    def locations(self, curie):
+        """ Returns the (kind, container, key) locations of a curie.
+
+        :rtype: list
+        """
+        return list(self._index.get(curie, ()))
+
+    @staticmethod
+    def _replace_entities(entities, mapping):
+        return [
+                get_biolink_entity(mapping[entity.get_curie()]) if entity.get_curie() in mapping else entity
+                for entity in entities
+                ]
+
+    def _check_node_key_collisions(self, mapping):
+        renamed = {}
+        for node_key in self.message.knowledge_graph.nodes:
+            new_node_key = mapping.get(node_key, node_key)
+            if new_node_key in renamed:
+                raise ValueError(
+                        'Substituting knowledge graph node keys {} and {} would both give {}.'.format(
+                            renamed[new_node_key],
+                            node_key,
+                            new_node_key,
+                            )
+                        )
+            renamed[new_node_key] = node_key
+
+    def substitute(self, mapping):
+        """ Applies all substitutions of a mapping in one pass over the locations of its curies. Substitutions
+        are not chained, i.e. a curie substituted in this call is not substituted again.
+
+        :param mapping: A map from curie to its replacement curie.
+        :type mapping: dict
+
+        :returns: The curies that were substituted, empty if nothing changed.
+        :rtype: set
+
+        :raises ValueError: If two knowledge graph node keys would be substituted with the same key. The
+            message is left unchanged.
+        """
+        substituted = {old for old, new in mapping.items() if old != new and old in self}
+        rename_node_keys = any(
+                kind == KNOWLEDGE_GRAPH_NODE_KEY
+                for old in substituted
+                for kind, _, _ in self._index[old]
+                )
+        if rename_node_keys:
+            self._check_node_key_collisions(mapping)
+        # Detach every location first, so a curie substituted here is not substituted again.
+        pending = {old: self._index.pop(old) for old in substituted}
+        touched = {}
+        for old, locations in pending.items():
+            new = mapping[old]
+            for location in locations:
+                kind, container, key = location
+                if kind in (QUERY_NODE_IDS, QUERY_NODE_CATEGORIES, QUERY_EDGE_PREDICATES, KNOWLEDGE_GRAPH_NODE_CATEGORIES):
+                    # List valued locations are rewritten once, whatever the number of curies they hold.
+                    touched[(kind, id(container))] = (kind, container)
+                elif kind == KNOWLEDGE_GRAPH_EDGE_SUBJECT:
+                    container.subject = new
+                elif kind == KNOWLEDGE_GRAPH_EDGE_OBJECT:
+                    container.object = new
+                elif kind == KNOWLEDGE_GRAPH_EDGE_PREDICATE:
+                    container.predicate = get_biolink_entity(new)
+                elif kind == RESULT_NODE_BINDING:
+                    container.id = new
+                self._index[new].append(location)
+        for kind, container in touched.values():
+            if kind == QUERY_NODE_IDS:
+                container.ids = [mapping.get(curie, curie) for curie in container.ids]
+            elif kind == QUERY_NODE_CATEGORIES or kind == KNOWLEDGE_GRAPH_NODE_CATEGORIES:
+                container.categories = self._replace_entities(container.categories, mapping)
+            elif kind == QUERY_EDGE_PREDICATES:
+                container.predicates = self._replace_entities(container.predicates, mapping)
+        if rename_node_keys:
+            knowledge_graph = self.message.knowledge_graph
+            knowledge_graph.nodes = {
+                    mapping.get(node_key, node_key): node for node_key, node in knowledge_graph.nodes.items()
+                    }
+        return substituted
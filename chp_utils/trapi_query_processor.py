@@ -1,4 +1,6 @@
 import logging
+import asyncio
+import inspect
 import itertools
 from copy import deepcopy
 from collections import defaultdict
@@ -10,8 +12,23 @@ from trapi_model.message import Message
 from trapi_model.biolink.constants import *
 from trapi_model.logger import Logger
 
-from chp_utils import SriNodeNormalizerApiClient, SriOntologyKpApiClient
+from chp_utils import (
+        SriNodeNormalizerApiClient,
+        SriOntologyKpApiClient,
+        AsyncSriNodeNormalizerApiClient,
+        AsyncSriOntologyKpApiClient,
+        )
 from chp_utils.exceptions import *
+from chp_utils.meta_kg.index import get_meta_knowledge_graph_index, get_ancestor_depth
+from chp_utils.query_variant import QueryVariant, as_query_variant, materialize as materialize_query
+from chp_utils.substitution import CurieSubstitutionIndex
+from chp_utils.response_merger import ResponseMerger
+from chp_utils.profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent requests issued by the async processing methods
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
 
 class BaseQueryProcessor:
     """ Query Processor class used to abstract the processing infrastructure from
@@ -19,10 +36,13 @@ class BaseQueryProcessor:
 
         :param query: Load trapi query.
         :type query: trapi_model.trapi_model.query.Query
+        :param profiler: Records the time, queries, HTTP requests and cache hits of each processing stage.
+        :type profiler: chp_utils.profiling.StageProfiler
     """
-    def __init__(self, query=None):
+    def __init__(self, query=None, profiler=None):
         if query is not None:
             self.query_copy = query.get_copy()
+        self.profiler = profiler
 
     def setup_query(self, query):
         self.query_copy = query.get_copy()
@@ -37,46 +57,59 @@ class BaseQueryProcessor:
         return curies
 
     def _get_most_general_preference(self, possible_preferences):
-        unsorted_entities = []
-        for curie, category in possible_preferences:
-            unsorted_entities.append((len(category.get_ancestors()), curie, category))
-        return sorted(unsorted_entities)[0]
+        _, curie, category = min(
+                (get_ancestor_depth(category), curie, category) for curie, category in possible_preferences
+                )
+        return curie, category
 
     def _get_most_specific_biolink_entity(self, entities):
-        unsorted_entities = []
-        for entity in entities:
-            unsorted_entities.append((len(entity.get_ancestors()), entity.get_curie()))
-        most_specific_entity_str = sorted(unsorted_entities, reverse=True)[0][1]
+        _, most_specific_entity_str = max(
+                (get_ancestor_depth(entity), entity.get_curie()) for entity in entities
+                )
         return get_biolink_entity(most_specific_entity_str)
 
-    def _get_preferred(self, query, node, normalization_dict, meta_knowledge_graph):
+    def _get_prefix_index(self, normalization):
+        """ Maps each prefix of a normalized node's equivalent identifiers to its first identifier.
+        """
+        prefix_index = {}
+        for equivalent_id_obj in normalization["equivalent_identifier"]:
+            equivalent_id = equivalent_id_obj["identifier"]
+            prefix_index.setdefault(equivalent_id.split(':')[0], equivalent_id)
+        return prefix_index
+
+    def _get_preferred(self, query, node, normalization_dict, meta_knowledge_graph, prefix_indexes=None):
         # Extract curie and category
         curie = node.ids[0]
-        if node.categories is not None:
-            categories = node.categories[0]
-        else:
-            categories = None
+        meta_knowledge_graph_index = get_meta_knowledge_graph_index(meta_knowledge_graph)
+        # The node normalizer returns None for curies it does not know
+        normalization = normalization_dict.get(curie)
+        if normalization is None:
+            raise ValueError('Could not normalize curie: {}.'.format(curie))
         # Ensure query graph categories and normalization type (categories) are consistent
-        curie_types = normalization_dict[curie]["types"]
+        curie_types = normalization["types"]
         curie_prefix = curie.split(':')[0]
+        if prefix_indexes is None:
+            prefix_indexes = {}
+        prefix_index = prefix_indexes.get(curie)
         possible_preferences = []
         for curie_type in curie_types:
-            if curie_type in meta_knowledge_graph.nodes:
-                # Take first entry in id_prefixes of the meta KG
-                preferred_prefix = meta_knowledge_graph.nodes[curie_type].id_prefixes[0]
-                if curie_prefix != preferred_prefix:
-                    for equivalent_id_obj in normalization_dict[curie]["equivalent_identifier"]:
-                        equivalent_id = equivalent_id_obj["identifier"]
-                        equiv_prefix = equivalent_id.split(':')[0]
-                        if equiv_prefix == preferred_prefix:
-                            possible_preferences.append(
-                                    (equivalent_id, curie_type)
-                                    )
-                            break
-                else:
+            if curie_type not in meta_knowledge_graph_index.preferred_prefixes:
+                continue
+            # Take first entry in id_prefixes of the meta KG
+            preferred_prefix = meta_knowledge_graph_index.preferred_prefixes[curie_type]
+            if preferred_prefix is None:
+                raise ValueError('No id prefixes for {} in the meta knowledge graph.'.format(curie_type.get_curie()))
+            if curie_prefix != preferred_prefix:
+                if prefix_index is None:
+                    prefix_index = prefix_indexes[curie] = self._get_prefix_index(normalization)
+                if preferred_prefix in prefix_index:
                     possible_preferences.append(
-                            (curie, curie_type)
+                            (prefix_index[preferred_prefix], curie_type)
                             )
+            else:
+                possible_preferences.append(
+                        (curie, curie_type)
+                        )
         # Go through each possible preference and return the preferred curie that with the most general category
         if len(possible_preferences) == 0:
             query.warning('Could not normalize curie: {}, because no supported curie types where found in the metakg.'.format(curie))
@@ -90,6 +123,8 @@ class BaseQueryProcessor:
     def _normalize_query_graphs(self, queries, normalization_dict, meta_knowledge_graph):
         normalization_map = {}
         non_normalized_queries = []
+        # Equivalent identifiers indexed by prefix, shared by every query holding the same curie
+        prefix_indexes = {}
         for query in queries:
             query_graph = query.message.query_graph
             for node_id, node in query_graph.nodes.items():
@@ -102,8 +137,9 @@ class BaseQueryProcessor:
                             node,
                             normalization_dict, 
                             meta_knowledge_graph,
+                            prefix_indexes=prefix_indexes,
                             )
-                except:
+                except ValueError:
                     non_normalized_queries.append(query)
                     break
                 # Check if curie was actually converted
@@ -133,9 +169,11 @@ class BaseQueryProcessor:
             queries.remove(nnq)
         return queries, normalization_map
 
-    def normalize_to_preferred(self, queries, meta_knowledge_graph=None, with_normalization_map=False):
-        # Instantiate client
-        node_normalizer_client = SriNodeNormalizerApiClient()
+    @profile_stage('normalization')
+    def normalize_to_preferred(self, queries, meta_knowledge_graph=None, with_normalization_map=False, node_normalizer_client=None):
+        # Instantiate client, e.g. pass a chp_utils.normalization_store.NormalizationStore to avoid the node normalizer
+        if node_normalizer_client is None:
+            node_normalizer_client = SriNodeNormalizerApiClient()
         
         # Get all curies to normalize
         curies_to_normalize = self._extract_all_curies(queries)
@@ -153,12 +191,38 @@ class BaseQueryProcessor:
             return queries, normalization_map
         return queries
 
+    @profile_stage('normalization')
+    async def normalize_to_preferred_async(self, queries, meta_knowledge_graph=None, with_normalization_map=False, node_normalizer_client=None):
+        # Instantiate client, offline clients such as a NormalizationStore answer synchronously
+        if node_normalizer_client is None:
+            node_normalizer_client = AsyncSriNodeNormalizerApiClient()
+
+        # Get all curies to normalize
+        curies_to_normalize = self._extract_all_curies(queries)
+        # Get normalized nodes
+        try:
+            normalization_dict = node_normalizer_client.get_normalized_nodes(curies_to_normalize)
+            if inspect.isawaitable(normalization_dict):
+                normalization_dict = await normalization_dict
+        except SriNodeNormalizerException as ex:
+            # Iterate through each query and add a normalization error message
+            for query in queries:
+                query.error(f'Node Normalization error. Nodes are NOT normalized. {ex.message}')
+            return queries, {}
+        # Normalize query graph
+        queries, normalization_map = self._normalize_query_graphs(queries, normalization_dict, meta_knowledge_graph)
+        if with_normalization_map:
+            return queries, normalization_map
+        return queries
+
+    @profile_stage('conflation')
     def conflate_categories(self, queries, conflation_map=None):
         for query in queries:
             query = conflation_map.conflate(query)
         return queries
 
 
+    @profile_stage('batch_expansion')
     def expand_batch_query(self, query):
         # Expand if batch query
         if query.is_batch_query():
@@ -183,28 +247,81 @@ class BaseQueryProcessor:
                             )
         return dict(curies), dict(curies_to_query)
 
-    def _expand_query_with_supported_ontological_descendants(self, curies_to_query_dict, descendants_map, curies):
+    def _build_ontological_variant(self, query, curie, descendant):
+        # Only query graph node ids are substituted, nothing is copied if the curie is not among them.
+        node_ids = {}
+        for node_id, node in query.message.query_graph.nodes.items():
+            if node.ids is not None and curie in node.ids:
+                node_ids[node_id] = [descendant if _id == curie else _id for _id in node.ids]
+        if len(node_ids) == 0:
+            return None
+        variant = QueryVariant(query, node_ids=node_ids)
+        variant.info('Ontologically expanded {} to {}'.format(curie, descendant))
+        return variant
+
+    def _expand_query_with_supported_ontological_descendants(self, curies_to_query_dict, descendants_map, curies, materialize=True):
         onto_expanded_queries = []
         for biolink_entity, curie_descendants_dict in descendants_map.items():
             if biolink_entity not in curies.curies:
-                query.error('{} is not support in the meta knowledge graph'.format(biolink_entity.get_curie()))
+                logger.error('{} is not support in the meta knowledge graph'.format(biolink_entity.get_curie()))
                 continue
             for curie, descendants in curie_descendants_dict.items():
                 for query in curies_to_query_dict[curie]:
                     for descendant in descendants:
-                        new_query = query.get_copy()
-                        onto_expanded_message = new_query.message.find_and_replace(curie, descendant)
-                        if onto_expanded_message.to_dict() != new_query.message.to_dict():
-                            new_query.info('Ontologically expanded {} to {}'.format(curie, descendant))
-                            new_query.message = onto_expanded_message
-                            onto_expanded_queries.append(new_query)
+                        if descendant == curie:
+                            continue
+                        variant = self._build_ontological_variant(query, curie, descendant)
+                        if variant is not None:
+                            onto_expanded_queries.append(variant.materialize() if materialize else variant)
         return onto_expanded_queries
 
-    def expand_supported_ontological_descendants(self, queries, curies_database=None):
+    def _get_supported_descendants(self, biolink_entity, descendants, curies_database):
+        curie_map = dict()
+        unique_descendants = set()
+        for curie, curie_descendants in descendants.items():
+            supported_descendants = [
+                    curie_descendant
+                    for curie_descendant in curies_database.filter_supported(biolink_entity, curie_descendants)
+                    if curie_descendant not in unique_descendants
+                    ]
+            if len(supported_descendants) > 0: 
+                unique_descendants.update(supported_descendants)
+                curie_map[curie] = supported_descendants
+        return curie_map
+
+    def _finalize_ontological_expansion(self, queries, curies_to_query_dict, descendants_map, curies_database, queries_logger, materialize=True):
+        # Expand each query ontologically with all supported descendants
+        onto_expanded_queries = self._expand_query_with_supported_ontological_descendants(curies_to_query_dict,
+                                                                                          descendants_map,
+                                                                                          curies_database,
+                                                                                          materialize)
+        for query in queries:
+            onto_expanded_queries.append(query)
+        # Merge in queries logger to each individual query log
+        logs = queries_logger.to_dict()
+        for query in onto_expanded_queries:
+            if isinstance(query, QueryVariant):
+                query.add_logs(logs)
+            else:
+                query.logger.add_logs(logs)
+        return onto_expanded_queries
+
+    @profile_stage('ontology_expansion')
+    def expand_supported_ontological_descendants(self, queries, curies_database=None, ontology_client=None, materialize=True):
+        """ Expands queries with the descendants of their curies that are in the curies database.
+
+        :param materialize: Return full queries, otherwise return the expansions as
+            chp_utils.query_variant.QueryVariant objects that are only copied once materialized, e.g. by
+            filter_queries_inconsistent_with_meta_knowledge_graph.
+        :type materialize: bool
+
+        :rtype: list
+        """
         # Intialize queries logger
         queries_logger = Logger()
-        # Initialize client
-        ontology_kp_client = SriOntologyKpApiClient()
+        # Initialize client, e.g. pass a chp_utils.ontology_index.LocalOntologyIndex to avoid the Ontology KP
+        if ontology_client is None:
+            ontology_client = SriOntologyKpApiClient()
 
         # Get all curies to expand via the Ontology KP
         curies_to_onto_expand, curies_to_query_dict = self._extract_all_curies_for_ontology_kp(queries)
@@ -212,45 +329,68 @@ class BaseQueryProcessor:
         descendants_map = {}
         for biolink_entity, curies in curies_to_onto_expand.items():
             try:
-                descendants = ontology_kp_client.get_ontology_descendants(curies, biolink_entity)
+                descendants = ontology_client.get_ontology_descendants(curies, biolink_entity)
             except SriOntologyKpException as ex:
                 queries_logger.error(str(ex))
                 continue
             if len(descendants) > 0:
-                curie_map = dict()
-                unique_descendants = []
-                for curie, curie_descendants in descendants.items():
-                    supported_descendants = []
-                    for curie_descendant in curie_descendants:
-                        try:
-                            x = curies_database.curies[biolink_entity][curie_descendant]
-                            if curie_descendant not in unique_descendants:
-                                supported_descendants.append(curie_descendant)
-                                unique_descendants.append(curie_descendant)
-                        except:
-                            continue
-                    if len(supported_descendants) > 0: 
-                        curie_map[curie] = supported_descendants
-                descendants_map[biolink_entity] = curie_map
-        # Expand each query ontologically with all supported descendants
-        onto_expanded_queries = self._expand_query_with_supported_ontological_descendants(curies_to_query_dict,
-                                                                                          descendants_map,
-                                                                                          curies_database)
-        for query in queries:
-            onto_expanded_queries.append(query)
-        # Merge in queries logger to each individual query log
-        for query in onto_expanded_queries:
-            query.logger.add_logs(queries_logger.to_dict())
-        return onto_expanded_queries
+                descendants_map[biolink_entity] = self._get_supported_descendants(biolink_entity, descendants, curies_database)
+        return self._finalize_ontological_expansion(queries, curies_to_query_dict, descendants_map, curies_database, queries_logger, materialize)
+
+    @profile_stage('ontology_expansion')
+    async def expand_supported_ontological_descendants_async(
+            self,
+            queries,
+            curies_database=None,
+            max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS,
+            materialize=True,
+            ontology_client=None,
+            ):
+        # Intialize queries logger
+        queries_logger = Logger()
+        # Initialize client, offline clients such as a LocalOntologyIndex answer synchronously
+        if ontology_client is None:
+            ontology_client = AsyncSriOntologyKpApiClient()
+        # Bound the number of in flight Ontology KP requests
+        semaphore = asyncio.Semaphore(max_concurrent_requests)
 
-    def _expand_categories_with_semantic_operations(self, query, meta_knowledge_graph):
-        query_graph = query.message.query_graph
-        queries = []
+        # Get all curies to expand via the Ontology KP
+        curies_to_onto_expand, curies_to_query_dict = self._extract_all_curies_for_ontology_kp(queries)
+
+        async def get_descendants(biolink_entity, curies):
+            async with semaphore:
+                try:
+                    descendants = ontology_client.get_ontology_descendants(curies, biolink_entity)
+                    if inspect.isawaitable(descendants):
+                        descendants = await descendants
+                    return descendants
+                except SriOntologyKpException as ex:
+                    queries_logger.error(str(ex))
+                    return None
+
+        biolink_entities = list(curies_to_onto_expand.keys())
+        all_descendants = await asyncio.gather(
+                *[get_descendants(biolink_entity, curies_to_onto_expand[biolink_entity]) for biolink_entity in biolink_entities]
+                )
+        descendants_map = {}
+        for biolink_entity, descendants in zip(biolink_entities, all_descendants):
+            if descendants is not None and len(descendants) > 0:
+                descendants_map[biolink_entity] = self._get_supported_descendants(biolink_entity, descendants, curies_database)
+        return self._finalize_ontological_expansion(queries, curies_to_query_dict, descendants_map, curies_database, queries_logger, materialize)
+
+    def _get_category_expansion_map(self, query, meta_knowledge_graph_index):
+        # Queries may be QueryVariants, whose categories are read through the variant.
+        view = as_query_variant(query)
         node_expansion_map = {}
-        for node_id, node in query_graph.nodes.items():
+        for node_id, node in view.query_graph.nodes.items():
+            categories = view.get_node_categories(node_id)
             # Greg added base case - if no category we assume Named Thing
-            if node.categories is None:
-                node.categories = [BiolinkEntity(BIOLINK_NAMED_THING)]
+            if categories is None:
+                categories = [BiolinkEntity(BIOLINK_NAMED_THING)]
+                if isinstance(query, QueryVariant):
+                    query.node_categories[node_id] = categories
+                else:
+                    node.categories = categories
 
             # Greg commented out, similar to predicate expansion, just because a node category happens to be in our meta-kg
             # does not mean we do not want its descendants and so we should expand. e.g., lets say we had DiseaseOrPhenotypicFeature
@@ -260,44 +400,27 @@ class BaseQueryProcessor:
             #    continue
 
             # Else run semantic operations to get descedants
-            descendants = node.categories[0].get_descendants()
-            supported_descendants = list(
-                    set.intersection(
-                        *[
-                            set(descendants),
-                            set(meta_knowledge_graph.nodes),
-                            ]
-                        )
-                    )
-            for m_node in meta_knowledge_graph.nodes:
-                if m_node.get_curie() == node.categories[0].get_curie():
-                    supported_descendants.append(node.categories[0])
+            supported_descendants = meta_knowledge_graph_index.get_supported_category_descendants(categories[0])
             if len(supported_descendants) == 0:
-                query.warning('Biolink category {} is not inherently supported and could not find any supported descendants,'.format(node.categories[0].get_curie()))
+                query.warning('Biolink category {} is not inherently supported and could not find any supported descendants,'.format(categories[0].get_curie()))
                 continue
-            node_expansion_map[node_id] = sorted(supported_descendants)
-        # Now expand query using supported descendants
-        node_id_map = sorted([node_id for node_id in node_expansion_map])
-        supported_descendants_map = [node_expansion_map[node_id] for node_id in node_id_map]
-        for category_prod in itertools.product(*supported_descendants_map):
-            new_query = query.get_copy()
-            for node_id, category in zip(node_id_map, category_prod):
-                new_query.message.query_graph.nodes[node_id].categories = [category]
-                new_query.info('Converted category {} to {} using Biolink semantic operations.'.format(query_graph.nodes[node_id].categories[0].get_curie(), category.get_curie()))
-            queries.append(new_query)
-        # Check if any category expansions occurred
-        if len(queries) == 0:
-            return [query]
-        return queries
+            node_expansion_map[node_id] = list(supported_descendants)
+        return node_expansion_map
 
-    def _expand_predicates_with_semantic_operations(self, query, supported_edge_predicates):
-        query_graph = query.message.query_graph
-        queries = []
+    def _get_predicate_expansion_map(self, query, meta_knowledge_graph_index, unsupported_warnings):
+        # Warnings about unsupported predicates are collected in unsupported_warnings rather than logged, so
+        # they can follow the category conversions in the log of each expanded query.
+        view = as_query_variant(query)
         edge_expansion_map = {}
-        for edge_id, edge in query_graph.edges.items():
+        for edge_id, edge in view.query_graph.edges.items():
+            predicates = view.get_edge_predicates(edge_id)
             # If predicate is null that substitute with biolink related to.
-            if edge.predicates is None:
-                edge.predicates = [BIOLINK_RELATED_TO_ENTITY]
+            if predicates is None:
+                predicates = [BIOLINK_RELATED_TO_ENTITY]
+                if isinstance(query, QueryVariant):
+                    query.edge_predicates[edge_id] = predicates
+                else:
+                    edge.predicates = predicates
 
             # Greg removed this. A hit for a predicate in our supported edges does not mean it should be skipped. This
             # leads to strange semantic operation expansions. For instance on a gene->gene edge using 'interacts_with'
@@ -310,133 +433,230 @@ class BaseQueryProcessor:
 
 
             # Else run semantic operations to get descedants
-            descendants = edge.predicates[0].get_descendants()
-            supported_descendants = list(
-                    set.intersection(
-                        *[
-                            set(descendants),
-                            set(supported_edge_predicates),
-                            ]
-                        )
-                    )
-            if edge.predicates[0] in supported_edge_predicates:
-                supported_descendants.append(edge.predicates[0])
-
+            supported_descendants = meta_knowledge_graph_index.get_supported_predicate_descendants(predicates[0])
             if len(supported_descendants) == 0:
-                query.warning('Biolink predicate {} is not inherently supported and could not find any supported descendants,'.format(edge.predicates[0].get_curie()))
+                unsupported_warnings.append('Biolink predicate {} is not inherently supported and could not find any supported descendants,'.format(predicates[0].get_curie()))
                 continue
-            edge_expansion_map[edge_id] = sorted(supported_descendants)
-        # Now expand query using supported descendants
-        edge_id_map = sorted([edge_id for edge_id in edge_expansion_map])
-        supported_descendants_map = [edge_expansion_map[edge_id] for edge_id in edge_id_map]
-        for predicate_prod in itertools.product(*supported_descendants_map):
-            new_query = query.get_copy()
-            for edge_id, predicate in zip(edge_id_map, predicate_prod):
-                new_query.message.query_graph.edges[edge_id].predicates = [predicate]
-                new_query.info('Converted predicate {} to {} using Biolink semantic operations.'.format(query_graph.edges[edge_id].predicates[0].get_curie(), predicate.get_curie()))
-            queries.append(new_query)
-        # Check if any predicate expansions occurred
-        if len(queries) == 0:
-            return [query]
-        return queries
- 
-    def expand_with_semantic_ops(self, queries, meta_knowledge_graph=None):
-        supported_edge_predicates = [meta_edge.predicate for meta_edge in meta_knowledge_graph.edges]
-        expanded_categories = []
-        # Expand categories
+            edge_expansion_map[edge_id] = list(supported_descendants)
+        return edge_expansion_map
+
+    def _iter_expansion_products(self, expansion_map):
+        # Lazily yields every combination of the expansion map as a {id: replacement} dict.
+        ids = sorted(expansion_map)
+        for replacements in itertools.product(*[expansion_map[_id] for _id in ids]):
+            yield dict(zip(ids, replacements))
+
+    def _is_consistent_expansion(self, query, categories, predicates, meta_knowledge_graph_index):
+        view = as_query_variant(query)
+        for edge_id, edge in view.query_graph.edges.items():
+            subject_category = categories[edge.subject] if edge.subject in categories else view.get_node_categories(edge.subject)[0]
+            object_category = categories[edge.object] if edge.object in categories else view.get_node_categories(edge.object)[0]
+            predicate = predicates[edge_id] if edge_id in predicates else view.get_edge_predicates(edge_id)[0]
+            if not meta_knowledge_graph_index.supports_edge(subject_category, predicate, object_category):
+                return False
+        return True
+
+    def _build_expanded_variant(self, query, categories, predicates, unsupported_warnings=()):
+        # Expanding a QueryVariant derives from it, so both share the same base query.
+        view = as_query_variant(query)
+        variant = view.derive(
+                node_categories={node_id: [category] for node_id, category in categories.items()},
+                edge_predicates={edge_id: [predicate] for edge_id, predicate in predicates.items()},
+                )
+        for node_id, category in categories.items():
+            variant.info('Converted category {} to {} using Biolink semantic operations.'.format(view.get_node_categories(node_id)[0].get_curie(), category.get_curie()))
+        for message in unsupported_warnings:
+            variant.warning(message)
+        for edge_id, predicate in predicates.items():
+            variant.info('Converted predicate {} to {} using Biolink semantic operations.'.format(view.get_edge_predicates(edge_id)[0].get_curie(), predicate.get_curie()))
+        return variant
+
+    def iter_expand_with_semantic_ops(self, queries, meta_knowledge_graph=None, max_expansions=None, prune_inconsistent=False, materialize=True):
+        """ Lazily expands queries with the supported Biolink descendants of their categories and predicates,
+        yielding one expanded query at a time. A query is only copied once its combination is accepted.
+
+        :param queries: The queries to expand, may be QueryVariants, e.g. from ontological expansion.
+        :type queries: iterable
+        :param meta_knowledge_graph: The meta knowledge graph whose categories and predicates are supported.
+        :type meta_knowledge_graph: trapi_model.meta_knowledge_graph.MetaKnowledgeGraph
+        :param max_expansions: Stop after this many expanded queries, defaults to no limit.
+        :type max_expansions: int
+        :param prune_inconsistent: Skip combinations with an edge that is not in the meta knowledge graph, so
+            only queries that filter_queries_inconsistent_with_meta_knowledge_graph could keep are yielded.
+            Off by default, which yields every combination like expand_with_semantic_ops always has.
+        :type prune_inconsistent: bool
+        :param materialize: Yield full queries, otherwise yield chp_utils.query_variant.QueryVariant objects
+            that share the input query until their materialize method is called.
+        :type materialize: bool
+        """
+        meta_knowledge_graph_index = get_meta_knowledge_graph_index(meta_knowledge_graph)
+        num_expansions = 0
+        # Each variant is held back until the next one is found, so the last one yielded can carry the
+        # warning that expansion was stopped.
+        pending = None
         for query in queries:
-            expanded_categories.extend(
-                    self._expand_categories_with_semantic_operations(query, meta_knowledge_graph)
-                    )
-        # Expand predicates on already expanded category queries.
-        expanded_predicates = []
-        for query in expanded_categories:
-            # Expand predicates
-            expanded_predicates.extend(
-                    self._expand_predicates_with_semantic_operations(query, supported_edge_predicates)
+            node_expansion_map = self._get_category_expansion_map(query, meta_knowledge_graph_index)
+            unsupported_warnings = []
+            edge_expansion_map = self._get_predicate_expansion_map(query, meta_knowledge_graph_index, unsupported_warnings)
+            for categories in self._iter_expansion_products(node_expansion_map):
+                for predicates in self._iter_expansion_products(edge_expansion_map):
+                    if prune_inconsistent and not self._is_consistent_expansion(query, categories, predicates, meta_knowledge_graph_index):
+                        continue
+                    if max_expansions is not None and num_expansions >= max_expansions:
+                        message = 'Stopped semantic operations expansion after {} expanded queries.'.format(max_expansions)
+                        if pending is not None:
+                            pending.warning(message)
+                            yield pending.materialize() if materialize else pending
+                        else:
+                            query.warning(message)
+                        logger.warning('Stopped semantic operations expansion after %d expanded queries.', max_expansions)
+                        return
+                    num_expansions += 1
+                    if pending is not None:
+                        yield pending.materialize() if materialize else pending
+                    pending = self._build_expanded_variant(query, categories, predicates, unsupported_warnings)
+        if pending is not None:
+            yield pending.materialize() if materialize else pending
+ 
+    @profile_stage('semantic_ops_expansion')
+    def expand_with_semantic_ops(self, queries, meta_knowledge_graph=None, max_expansions=None, prune_inconsistent=False, materialize=True):
+        """ Expands queries with the supported Biolink descendants of their categories and predicates. See
+        iter_expand_with_semantic_ops. Set prune_inconsistent to drop combinations that the meta knowledge
+        graph filter would reject before they are copied, and materialize to False to leave copying to
+        filter_queries_inconsistent_with_meta_knowledge_graph.
+
+        :rtype: list
+        """
+        return list(
+                self.iter_expand_with_semantic_ops(
+                    queries,
+                    meta_knowledge_graph,
+                    max_expansions=max_expansions,
+                    prune_inconsistent=prune_inconsistent,
+                    materialize=materialize,
                     )
-        return expanded_predicates
+                )
+
+    def _is_duplicate_query_graph(self, edges, accepted_graphs_by_edge, num_accepted_graphs):
+        # True if every edge is in one accepted graph. A graph without edges is in any accepted graph.
+        if len(edges) == 0:
+            return num_accepted_graphs > 0
+        candidates = None
+        for edge in edges:
+            graphs = accepted_graphs_by_edge.get(edge)
+            if not graphs:
+                return False
+            candidates = set(graphs) if candidates is None else candidates & graphs
+            if not candidates:
+                return False
+        return True
 
-    def filter_queries_inconsistent_with_meta_knowledge_graph(self, queries, meta_knowledge_graph=None, with_inconsistent_queries=False):
+    @profile_stage('meta_kg_filter')
+    def filter_queries_inconsistent_with_meta_knowledge_graph(self, queries, meta_knowledge_graph=None, with_inconsistent_queries=False, materialize=True):
+        """ Drops queries with edges that are not in the meta knowledge graph and queries whose edges are all in
+        an already accepted query.
+
+        :param queries: The queries to filter, may be QueryVariants, which are checked without being copied.
+        :type queries: list
+        :param materialize: Return the QueryVariants that are kept as full queries. Rejected QueryVariants are
+            returned as they are, so only the queries that are kept are copied.
+        :type materialize: bool
+
+        :rtype: list
+        """
         consistent_queries = []
         inconsistent_queries = []
-        meta_knowledge_graph_predicate_map = defaultdict(list)
-        for edge in meta_knowledge_graph.edges:
-            meta_knowledge_graph_predicate_map[edge.predicate].append(edge)
-        consistent_graphs = []
+        meta_knowledge_graph_index = get_meta_knowledge_graph_index(meta_knowledge_graph)
+        # A query is a duplicate if all its edges are in one accepted query graph. Each edge maps to the
+        # accepted graphs holding it, so that check is an intersection rather than a scan of every graph.
+        accepted_graphs_by_edge = defaultdict(set)
+        num_accepted_graphs = 0
         for query in queries:
             # Check each edge that it's subject and object are consistent with the meta KG.
-            query_graph = query.message.query_graph
+            view = as_query_variant(query)
             is_consistent_query = True
             consistent_edges = []
-            for edge_id, edge in query_graph.edges.items():
-                if edge.predicates is None:
-                    edge.predicates = [BIOLINK_RELATED_TO_ENTITY]
-                subject_node = query_graph.nodes[edge.subject]
-                object_node = query_graph.nodes[edge.object]
-                predicate = edge.predicates[0]
-                if predicate in meta_knowledge_graph_predicate_map:
-                    found_consistent_edge = False
-                    for meta_edge in meta_knowledge_graph_predicate_map[predicate]:
-                        if subject_node.categories is not None and object_node.categories is not None:
-                            if subject_node.categories[0] == meta_edge.subject and object_node.categories[0] == meta_edge.object:
-                                found_consistent_edge = True
-                                if subject_node.ids is not None:
-                                    sub = subject_node.ids[0]
-                                else:
-                                    sub = '?'
-                                if object_node.ids is not None:
-                                    obj = object_node.ids[0]
-                                else:
-                                    obj = '?'
-                                edge = (subject_node.categories[0].get_curie(), sub, predicate.get_curie(), object_node.categories[0].get_curie(), obj)
-                                consistent_edges.append(edge)
-                                break
-                    if not found_consistent_edge:
-                        query.error('Edge predicate subject/object mismatch with meta knowledge graph.')
-                        is_consistent_query = False
-                        inconsistent_queries.append(query)
-                else:
+            for edge_id, edge in view.query_graph.edges.items():
+                predicates = view.get_edge_predicates(edge_id)
+                if predicates is None:
+                    predicates = [BIOLINK_RELATED_TO_ENTITY]
+                    if isinstance(query, QueryVariant):
+                        query.edge_predicates[edge_id] = predicates
+                    else:
+                        edge.predicates = predicates
+                subject_categories = view.get_node_categories(edge.subject)
+                object_categories = view.get_node_categories(edge.object)
+                predicate = predicates[0]
+                if not meta_knowledge_graph_index.supports_predicate(predicate):
                     query.error(f'Predicate: {predicate.get_curie()} not supported in our meta knowledge graph.')
                     is_consistent_query = False
-                    inconsistent_queries.append(query)
                     break
+                if subject_categories is None or object_categories is None or \
+                        not meta_knowledge_graph_index.supports_edge(subject_categories[0], predicate, object_categories[0]):
+                    query.error('Edge predicate subject/object mismatch with meta knowledge graph.')
+                    is_consistent_query = False
+                    continue
+                subject_ids = view.get_node_ids(edge.subject)
+                if subject_ids is not None:
+                    sub = subject_ids[0]
+                else:
+                    sub = '?'
+                object_ids = view.get_node_ids(edge.object)
+                if object_ids is not None:
+                    obj = object_ids[0]
+                else:
+                    obj = '?'
+                consistent_edges.append(
+                        (subject_categories[0].get_curie(), sub, predicate.get_curie(), object_categories[0].get_curie(), obj)
+                        )
+            if not is_consistent_query:
+                inconsistent_queries.append(query)
+                continue
 
-            is_unique = True
-            for consistent_graph in consistent_graphs:
-                all_edges_match = True
-                for edge in consistent_edges:
-                    if edge not in consistent_graph:
-                        all_edges_match = False
-                        break
-                if all_edges_match:
-                    is_unique = False
-                    break
-            if is_unique:
-                consistent_graphs.append(consistent_edges)
-                consistent_queries.append(query)
-            else:
+            if self._is_duplicate_query_graph(consistent_edges, accepted_graphs_by_edge, num_accepted_graphs):
                 query.error(f'Duplicate query.')
                 inconsistent_queries.append(query)
+            else:
+                for edge in consistent_edges:
+                    accepted_graphs_by_edge[edge].add(num_accepted_graphs)
+                num_accepted_graphs += 1
+                consistent_queries.append(query)
 
+        # Only the queries that are kept are copied.
+        if materialize:
+            consistent_queries = [materialize_query(query) for query in consistent_queries]
         if with_inconsistent_queries:
             return consistent_queries, inconsistent_queries
         return consistent_queries
 
+    def get_response_merger(self, target_query):
+        """ Returns a ResponseMerger for streaming sub-responses into a response query as they complete.
+
+        :rtype: chp_utils.response_merger.ResponseMerger
+        """
+        return ResponseMerger(target_query)
+
+    @profile_stage('merge', queries_arg=1)
     def merge_responses(self, target_query, response_queries):
-        response_query = target_query.get_copy()
-        for query in response_queries:
-            # Update message
-            response_query.message.update(
-                    query.message.knowledge_graph,
-                    query.message.results,
-                    )
-            # Update Logs
-            response_query.logger.add_logs(query.logger.to_dict())
-        return response_query
+        return self.get_response_merger(target_query).add_many(response_queries).finalize()
 
+    @profile_stage('undo_normalization')
     def undo_normalization(self, response_query, normalization_map):
-        for normalized_curie, passed_curie in normalization_map.items():
-            response_query.message = response_query.message.find_and_replace(normalized_curie, passed_curie)
+        """ Reverts every normalized curie in the response query to the curie that was originally passed.
+        All curies are reverted in a single traversal of the query graph, knowledge graph and results, and
+        the response message is modified in place.
+
+        :param response_query: The response query to revert.
+        :type response_query: trapi_model.query.Query
+        :param normalization_map: A map from normalized curie to the originally passed curie.
+        :type normalization_map: dict
+
+        :rtype: trapi_model.query.Query
+
+        :raises ValueError: If two knowledge graph nodes would be reverted to the same curie.
+        """
+        if len(normalization_map) == 0:
+            return response_query
+        CurieSubstitutionIndex(response_query.message).substitute(normalization_map)
         return response_query
     
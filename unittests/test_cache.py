@@ -0,0 +1,34 @@
+import unittest
+import time
+
+from chp_utils.cache import LRUCache
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_many(self):
+        cache = LRUCache(maxsize=10)
+        cache.set_many({"HGNC:613": 1, "HP:0007354": None})
+        found, missing = cache.get_many(["HGNC:613", "HP:0007354", "MONDO:0005148"])
+        self.assertDictEqual(found, {"HGNC:613": 1, "HP:0007354": None})
+        self.assertListEqual(missing, ["MONDO:0005148"])
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Touch a so b is the least recently used
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
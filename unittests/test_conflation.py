@@ -0,0 +1,49 @@
+import unittest
+from types import SimpleNamespace
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.conflation import ConflationMap
+
+class Query:
+    def __init__(self, categories, predicates):
+        self.warnings = []
+        self.message = SimpleNamespace(
+                query_graph=SimpleNamespace(
+                    nodes={"n0": SimpleNamespace(categories=categories)},
+                    edges={"e0": SimpleNamespace(predicates=predicates)},
+                    ),
+                )
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+class TestConflationMap(unittest.TestCase):
+
+    def test_conflate_chains(self):
+        conflation_map = ConflationMap(conflation_map={
+            "biolink:SmallMolecule": "biolink:ChemicalSubstance",
+            "biolink:ChemicalSubstance": "biolink:Drug",
+            })
+        query = conflation_map.conflate(Query([get_biolink_entity("biolink:SmallMolecule")], None))
+        self.assertListEqual(query.message.query_graph.nodes["n0"].categories, [BIOLINK_DRUG_ENTITY])
+        self.assertListEqual(
+                query.warnings,
+                [
+                    'Conflated biolink:SmallMolecule with biolink:ChemicalSubstance',
+                    'Conflated biolink:ChemicalSubstance with biolink:Drug',
+                    ],
+                )
+
+    def test_conflate_predicates(self):
+        conflation_map = ConflationMap(conflation_map={"biolink:treats": "biolink:related_to"})
+        query = conflation_map.conflate(Query(None, [get_biolink_entity("biolink:treats")]))
+        self.assertListEqual(query.message.query_graph.edges["e0"].predicates, [BIOLINK_RELATED_TO_ENTITY])
+        self.assertEqual(len(query.warnings), 1)
+
+    def test_conflate_untouched(self):
+        conflation_map = ConflationMap(conflation_map_filename='test_conflation.json')
+        categories = [BIOLINK_GENE_ENTITY]
+        query = conflation_map.conflate(Query(categories, None))
+        self.assertIs(query.message.query_graph.nodes["n0"].categories, categories)
+        self.assertListEqual(query.warnings, [])
@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import json
+import io
+import os
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.curie_database import CurieDatabase, _JSONStreamReader
+
+CURIES = {
+    "biolink:Gene": {
+        "ENSEMBL:ENSG00000106665": ["CLIP2"],
+        "ENSEMBL:ENSG00000241973": ["PI4KA"],
+        },
+    "biolink:Drug": {
+        "CHEMBL.COMPOUND:CHEMBL1431": [],
+        },
+    }
+
+class TestCurieDatabase(unittest.TestCase):
+
+    def test_contains(self):
+        curies = CurieDatabase(curies=CURIES)
+        self.assertTrue(curies.contains(BIOLINK_GENE_ENTITY, 'ENSEMBL:ENSG00000106665'))
+        self.assertTrue(curies.contains('biolink:Drug', 'CHEMBL.COMPOUND:CHEMBL1431'))
+        self.assertFalse(curies.contains(BIOLINK_DRUG_ENTITY, 'ENSEMBL:ENSG00000106665'))
+        self.assertFalse(curies.contains(BIOLINK_DISEASE_ENTITY, 'MONDO:0005148'))
+        self.assertEqual(len(curies), 3)
+
+    def test_filter_supported(self):
+        curies = CurieDatabase(curies=CURIES)
+        self.assertListEqual(
+                curies.filter_supported(
+                    BIOLINK_GENE_ENTITY,
+                    ['ENSEMBL:ENSG00000241973', 'ENSEMBL:0', 'ENSEMBL:ENSG00000241973', 'ENSEMBL:ENSG00000106665'],
+                    ),
+                ['ENSEMBL:ENSG00000241973', 'ENSEMBL:ENSG00000106665'],
+                )
+
+    def test_to_dict(self):
+        self.assertDictEqual(CurieDatabase(curies=CURIES).to_dict(), CURIES)
+
+    def test_merge(self):
+        other = CurieDatabase(curies={
+            "biolink:Gene": {
+                "ENSEMBL:ENSG00000106665": ["CLIP2", "CLIP-115"],
+                "ENSEMBL:ENSG00000143126": ["CELSR2"],
+                },
+            })
+        merged = CurieDatabase.merge([CurieDatabase(curies=CURIES), other])
+        self.assertTupleEqual(
+                merged.get_info(BIOLINK_GENE_ENTITY, 'ENSEMBL:ENSG00000106665'),
+                ('CLIP2', 'CLIP-115'),
+                )
+        self.assertEqual(len(merged), 4)
+        self.assertEqual(len(CurieDatabase(curies=CURIES)), 3)
+
+    def test_load_json(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'curies.json')
+            CurieDatabase(curies=CURIES).json(filename)
+            self.assertDictEqual(CurieDatabase(curies_filename=filename).to_dict(), CURIES)
+
+    def test_write_binary(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'curies.bin')
+            CurieDatabase(curies=CURIES).write_binary(filename)
+            curies = CurieDatabase(curies_filename=filename)
+            self.assertTrue(curies.contains(BIOLINK_GENE_ENTITY, 'ENSEMBL:ENSG00000241973'))
+            self.assertFalse(curies.contains(BIOLINK_GENE_ENTITY, 'ENSEMBL:0'))
+            self.assertTupleEqual(curies.get_info(BIOLINK_GENE_ENTITY, 'ENSEMBL:ENSG00000241973'), ('PI4KA',))
+            self.assertDictEqual(curies.to_dict(), CURIES)
+
+    def test_stream_reader_chunks(self):
+        documents = [
+                json.dumps(CURIES, indent=2),
+                json.dumps(CURIES, separators=(',', ':')),
+                '{"biolink:Gene": {"HGNC:1": [12345, -0.5e3, true, null, "a \\"quoted\\" name"], "HGNC:2": {}}, "biolink:Drug": {}}',
+                ]
+        # Small chunks split keys, values and numbers across reads.
+        for chunk_size in [1, 7, 1 << 20]:
+            for document in documents:
+                reader = _JSONStreamReader(io.StringIO(document), chunk_size=chunk_size)
+                curies = {}
+                for biolink_entity in reader.iter_object():
+                    curies[biolink_entity] = {curie: reader.decode() for curie in reader.iter_object()}
+                self.assertDictEqual(curies, json.loads(document), msg='chunk_size={}'.format(chunk_size))
+                self.assertEqual(reader.peek(), '')
@@ -0,0 +1,54 @@
+import unittest
+
+from chp_utils.generic import dict_replace_value, dict_replace_values, list_replace_values
+
+MESSAGE = {
+    "nodes": {
+        "CHEBI:6801": {"categories": ["biolink:Drug"]},
+        "MONDO:0005148": {"name": "type 2 diabetes mellitus"},
+        },
+    "edges": [
+        {"subject": "CHEBI:6801", "object": "MONDO:0005148"},
+        ],
+    }
+
+class TestGeneric(unittest.TestCase):
+
+    def test_dict_replace_values(self):
+        mapping = {"CHEBI:6801": "CHEMBL.COMPOUND:CHEMBL1431", "MONDO:0005148": "DOID:9352"}
+        expected = MESSAGE
+        for old, new in mapping.items():
+            expected = dict_replace_value(expected, old, new)
+        self.assertDictEqual(dict_replace_values(MESSAGE, mapping), expected)
+
+    def test_in_place(self):
+        message = dict_replace_values(MESSAGE, {})
+        result = dict_replace_values(message, {"MONDO:0005148": "DOID:9352"}, in_place=True)
+        self.assertIs(result, message)
+        self.assertListEqual(list(message["nodes"]), ["CHEBI:6801", "DOID:9352"])
+        self.assertEqual(message["edges"][0]["object"], "DOID:9352")
+
+    def test_exact(self):
+        values = ["MONDO:0005148", "MONDO:00051481"]
+        self.assertListEqual(
+                list_replace_values(values, {"MONDO:0005148": "DOID:9352"}, exact=True),
+                ["DOID:9352", "MONDO:00051481"],
+                )
+        # Substring replacement does not chain
+        self.assertListEqual(
+                list_replace_values(["ab"], {"a": "b", "b": "c"}),
+                ["bc"],
+                )
+
+    def test_key_collisions(self):
+        message = {"nodes": {"MONDO:0005148": {}, "DOID:9352": {"name": "type 2 diabetes mellitus"}}}
+        with self.assertRaises(ValueError):
+            dict_replace_values(message, {"MONDO:0005148": "DOID:9352"})
+        with self.assertRaises(ValueError):
+            dict_replace_values(message, {"MONDO:0005148": "DOID:9352"}, in_place=True)
+        # The colliding dictionary is left as it was.
+        self.assertDictEqual(message, {"nodes": {"MONDO:0005148": {}, "DOID:9352": {"name": "type 2 diabetes mellitus"}}})
+        with self.assertRaises(ValueError):
+            dict_replace_values({"a": 1, "b": 2}, {"a": "c", "b": "c"})
+        # Swapping keys is not a collision
+        self.assertDictEqual(dict_replace_values({"a": 1, "b": 2}, {"a": "b", "b": "a"}), {"b": 1, "a": 2})
@@ -0,0 +1,83 @@
+import unittest
+from types import SimpleNamespace
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.meta_kg.index import (
+        get_meta_knowledge_graph_index,
+        get_ancestor_depth,
+        clear_meta_knowledge_graph_indexes,
+        )
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+from test_query_variant import Query
+
+class Entity:
+    def __init__(self, curie, biolink_version, num_ancestors):
+        self.curie = curie
+        self.biolink_version = biolink_version
+        self.num_ancestors = num_ancestors
+
+    def get_ancestors(self):
+        return [None] * self.num_ancestors
+
+    def __eq__(self, other):
+        return self.curie == other.curie
+
+    def __hash__(self):
+        return hash(self.curie)
+
+class TestMetaKnowledgeGraphIndex(unittest.TestCase):
+
+    def setUp(self):
+        clear_meta_knowledge_graph_indexes()
+        self.meta_knowledge_graph = SimpleNamespace(
+                nodes={
+                    BIOLINK_GENE_ENTITY: SimpleNamespace(id_prefixes=["NCBIGene"]),
+                    BIOLINK_DRUG_ENTITY: SimpleNamespace(id_prefixes=[]),
+                    },
+                edges=[SimpleNamespace(subject=BIOLINK_GENE_ENTITY, predicate=BIOLINK_RELATED_TO_ENTITY, object=BIOLINK_DRUG_ENTITY)],
+                )
+
+    def test_index(self):
+        index = get_meta_knowledge_graph_index(self.meta_knowledge_graph)
+        self.assertIs(get_meta_knowledge_graph_index(self.meta_knowledge_graph), index)
+        self.assertTrue(index.supports_predicate(BIOLINK_RELATED_TO_ENTITY))
+        self.assertTrue(index.supports_edge(BIOLINK_GENE_ENTITY, BIOLINK_RELATED_TO_ENTITY, BIOLINK_DRUG_ENTITY))
+        self.assertFalse(index.supports_edge(BIOLINK_DRUG_ENTITY, BIOLINK_RELATED_TO_ENTITY, BIOLINK_GENE_ENTITY))
+        self.assertDictEqual(index.preferred_prefixes, {BIOLINK_GENE_ENTITY: "NCBIGene", BIOLINK_DRUG_ENTITY: None})
+        self.assertIn(BIOLINK_GENE_ENTITY, index.get_supported_category_descendants(BIOLINK_GENE_ENTITY))
+        self.assertIn(BIOLINK_RELATED_TO_ENTITY, index.get_supported_predicate_descendants(BIOLINK_RELATED_TO_ENTITY))
+
+    def test_modified_meta_knowledge_graph(self):
+        index = get_meta_knowledge_graph_index(self.meta_knowledge_graph)
+        self.meta_knowledge_graph.edges.append(
+                SimpleNamespace(subject=BIOLINK_DRUG_ENTITY, predicate=BIOLINK_RELATED_TO_ENTITY, object=BIOLINK_GENE_ENTITY)
+                )
+        modified_index = get_meta_knowledge_graph_index(self.meta_knowledge_graph)
+        self.assertIsNot(modified_index, index)
+        self.assertTrue(modified_index.supports_edge(BIOLINK_DRUG_ENTITY, BIOLINK_RELATED_TO_ENTITY, BIOLINK_GENE_ENTITY))
+        self.meta_knowledge_graph.nodes = {BIOLINK_GENE_ENTITY: SimpleNamespace(id_prefixes=["ENSEMBL"])}
+        self.assertDictEqual(
+                get_meta_knowledge_graph_index(self.meta_knowledge_graph).preferred_prefixes,
+                {BIOLINK_GENE_ENTITY: "ENSEMBL"},
+                )
+
+    def test_filter(self):
+        processor = BaseQueryProcessor()
+        query = Query([BIOLINK_DRUG_ENTITY], [BIOLINK_RELATED_TO_ENTITY], [BIOLINK_GENE_ENTITY])
+        self.assertListEqual(processor.filter_queries_inconsistent_with_meta_knowledge_graph([query], self.meta_knowledge_graph), [])
+        self.meta_knowledge_graph.edges.append(
+                SimpleNamespace(subject=BIOLINK_DRUG_ENTITY, predicate=BIOLINK_RELATED_TO_ENTITY, object=BIOLINK_GENE_ENTITY)
+                )
+        self.assertListEqual(processor.filter_queries_inconsistent_with_meta_knowledge_graph([query], self.meta_knowledge_graph), [query])
+
+    def test_ancestor_depth(self):
+        self.assertEqual(get_ancestor_depth(Entity('biolink:Gene', '2.1.0', 3)), 3)
+        self.assertEqual(get_ancestor_depth(Entity('biolink:Gene', '2.1.0', 4)), 3)
+        self.assertEqual(get_ancestor_depth(Entity('biolink:Gene', '2.2.0', 4)), 4)
+        clear_meta_knowledge_graph_indexes()
+        self.assertEqual(get_ancestor_depth(Entity('biolink:Gene', '2.1.0', 4)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
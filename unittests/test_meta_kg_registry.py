@@ -0,0 +1,53 @@
+import unittest
+import json
+
+from chp_utils.meta_kg.registry import get_meta_kg_view, DEFAULT_META_KG_FILENAME
+from chp_utils.meta_kg_validation.meta_kg_validator import MetaKGValidator
+from chp_utils.semantic_operations.semantic_processor import SemanticProcessor
+from chp_utils.semantic_operations.biolink_hierarchy import BiolinkHierarchy
+
+class TestMetaKGRegistry(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMetaKGRegistry, cls).setUpClass()
+        with open(DEFAULT_META_KG_FILENAME) as f_:
+            cls.meta_kg = json.load(f_)
+
+    def test_view(self):
+        view = get_meta_kg_view()
+        self.assertIs(get_meta_kg_view(DEFAULT_META_KG_FILENAME), view)
+        with self.assertRaises(TypeError):
+            view.frozen_meta_kg["nodes"] = {}
+        meta_kg = view.to_dict()
+        self.assertDictEqual(meta_kg, self.meta_kg)
+        meta_kg["nodes"].clear()
+        self.assertDictEqual(view.to_dict(), self.meta_kg)
+
+    def test_validator_attributes(self):
+        validator = MetaKGValidator()
+        self.assertDictEqual(validator.meta_knowledge_graph, self.meta_kg)
+        json.dumps(validator.meta_knowledge_graph)
+        self.assertIsInstance(validator.supported_predicates, list)
+        self.assertIsInstance(validator.supported_categories, set)
+        self.assertIsInstance(validator.supported_id_prefixes, set)
+        self.assertIsInstance(validator.supported_relationships, set)
+        self.assertIsInstance(validator.supported_prefix_category_pairs["biolink:Gene"], list)
+        # Validators do not share their attributes.
+        validator.supported_predicates.append('biolink:treats')
+        validator.meta_knowledge_graph["edges"].clear()
+        other_validator = MetaKGValidator()
+        self.assertNotIn('biolink:treats', other_validator.supported_predicates)
+        self.assertDictEqual(other_validator.meta_knowledge_graph, self.meta_kg)
+
+    def test_semantic_processor_attributes(self):
+        semantic_processor = SemanticProcessor(biolink_hierarchy=BiolinkHierarchy({}))
+        self.assertDictEqual(semantic_processor.meta_kg, self.meta_kg)
+        json.dumps(semantic_processor.meta_kg)
+        self.assertListEqual(list(semantic_processor.supported_categories), list(self.meta_kg["nodes"]))
+        self.assertIsInstance(semantic_processor.edge_definitions["biolink:Gene"], dict)
+        self.assertIsInstance(semantic_processor.subject_wildcard_definitions["biolink:Gene"], list)
+        self.assertIsInstance(semantic_processor.object_wildcard_definitions["biolink:Gene"][0], dict)
+
+if __name__ == '__main__':
+    unittest.main()
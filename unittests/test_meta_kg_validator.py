@@ -0,0 +1,73 @@
+import unittest
+from types import SimpleNamespace
+
+from chp_utils.meta_kg_validation.meta_kg_validator import MetaKGValidator, MetaKGValidationResult
+from chp_utils.meta_kg_validation.metakg_validation_exceptions import *
+
+def entities(*passed_names):
+    return [SimpleNamespace(passed_name=passed_name) for passed_name in passed_names]
+
+def build_query_graph(subject_ids, subject_category, predicate, object_category):
+    return SimpleNamespace(
+            nodes={
+                "n0": SimpleNamespace(ids=subject_ids, categories=entities(subject_category)),
+                "n1": SimpleNamespace(ids=None, categories=entities(object_category)),
+                },
+            edges={"e0": SimpleNamespace(subject="n0", object="n1", predicates=entities(predicate))},
+            )
+
+class TestMetaKGValidator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMetaKGValidator, cls).setUpClass()
+        cls.validator = MetaKGValidator()
+
+    def test_validate(self):
+        query_graph = build_query_graph(["ENSEMBL:ENSG00000008853"], "biolink:Gene", "biolink:interacts_with", "biolink:Drug")
+        result = self.validator.validate(query_graph)
+        self.assertIs(result.query_graph, query_graph)
+        self.assertTrue(result.valid)
+        self.assertDictEqual(result.to_dict(), {"valid": True, "errors": []})
+        self.validator.validate_graph(query_graph)
+
+    def test_validate_collects_errors(self):
+        query_graph = build_query_graph(["FOO:1"], "biolink:Gene", "biolink:treats", "biolink:Drug")
+        result = self.validator.validate(query_graph)
+        self.assertFalse(result.valid)
+        self.assertListEqual(
+                [type(error) for error in result.errors],
+                [UnsupportedPrefix, UnsupportedPrefixCategoryPair, UnsupportedPredicate, UnsupportedNodeEdgeRelationship],
+                )
+        self.assertDictEqual(
+                result.to_dict()["errors"][0],
+                {"type": "UnsupportedPrefix", "message": "Unsupported Prefix: FOO"},
+                )
+        with self.assertRaises(UnsupportedPrefix):
+            self.validator.validate_graph(query_graph)
+
+    def test_invalid_curie(self):
+        query_graph = build_query_graph(["ENSG00000008853"], "biolink:Gene", "biolink:interacts_with", "biolink:Drug")
+        result = self.validator.validate(query_graph)
+        self.assertListEqual([type(error) for error in result.errors], [InvalidCurie])
+        self.assertEqual(str(result.errors[0]), 'Invalid Curie: ENSG00000008853')
+        with self.assertRaises(InvalidCurie):
+            self.validator.validate_graph(query_graph)
+
+    def test_validate_many(self):
+        query_graphs = [
+                build_query_graph(["ENSEMBL:ENSG00000008853"], "biolink:Gene", "biolink:interacts_with", "biolink:Drug"),
+                build_query_graph(["ENSG00000008853"], "biolink:Gene", "biolink:interacts_with", "biolink:Drug"),
+                build_query_graph(None, "biolink:Protein", "biolink:interacts_with", "biolink:Drug"),
+                ]
+        results = self.validator.validate_many(query_graphs)
+        self.assertTrue(all(isinstance(result, MetaKGValidationResult) for result in results))
+        self.assertListEqual([result.query_graph for result in results], query_graphs)
+        self.assertListEqual([result.valid for result in results], [True, False, False])
+        self.assertListEqual(
+                [type(error) for error in results[2].errors],
+                [UnsupportedCategory, UnsupportedNodeEdgeRelationship],
+                )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import tempfile
+import json
+import os
+
+from chp_utils.normalization_store import NormalizationStore
+
+DUMP = {
+    "HGNC:613": {
+        "id": {"identifier": "NCBIGene:348", "label": "APOE"},
+        "equivalent_identifiers": [
+            {"identifier": "NCBIGene:348", "label": "APOE"},
+            {"identifier": "ENSEMBL:ENSG00000130203"},
+            {"identifier": "HGNC:613", "label": "APOE"},
+            ],
+        "type": ["biolink:Gene", "biolink:NamedThing"],
+        },
+    "HP:9999999": None,
+    }
+
+class TestNormalizationStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestNormalizationStore, cls).setUpClass()
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        dump_filename = os.path.join(cls.tmp_dir.name, 'dump.json')
+        with open(dump_filename, 'w') as f_:
+            json.dump(DUMP, f_)
+        cls.store = NormalizationStore.build(os.path.join(cls.tmp_dir.name, 'store.bin'), [dump_filename])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.close()
+        cls.tmp_dir.cleanup()
+
+    def test_get_normalization(self):
+        self.assertDictEqual(
+                self.store.get_normalization('ENSEMBL:ENSG00000130203'),
+                DUMP["HGNC:613"],
+                )
+        self.assertIsNone(self.store.get_normalization('HP:9999999'))
+
+    def test_get_normalized_nodes(self):
+        resp = self.store.get_normalized_nodes(['HGNC:613', 'NCBIGene:348', 'HP:9999999'])
+        self.assertListEqual(sorted(resp), ['HGNC:613', 'NCBIGene:348'])
+        self.assertListEqual(
+                resp['HGNC:613']['equivalent_identifier'],
+                DUMP["HGNC:613"]["equivalent_identifiers"],
+                )
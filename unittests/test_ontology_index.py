@@ -0,0 +1,65 @@
+import unittest
+import os
+import tempfile
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.ontology_index import LocalOntologyIndex
+
+EDGES = [
+    ('MONDO:0005148', 'biolink:subclass_of', 'MONDO:0005015'),
+    ('MONDO:0014488', 'biolink:subclass_of', 'MONDO:0005148'),
+    ('MONDO:0014488', 'biolink:subclass_of', 'MONDO:0005015'),
+    ('MONDO:0005015', 'biolink:related_to', 'MONDO:0000001'),
+    ]
+
+class TestLocalOntologyIndex(unittest.TestCase):
+
+    def test_descendants(self):
+        index = LocalOntologyIndex(EDGES)
+        self.assertListEqual(
+                index.descendants('MONDO:0005015'),
+                ['MONDO:0005015', 'MONDO:0005148', 'MONDO:0014488'],
+                )
+        self.assertListEqual(index.descendants('MONDO:0014488'), ['MONDO:0014488'])
+        # Non ontology predicates are not followed
+        self.assertListEqual(index.descendants('MONDO:0000001'), [])
+
+    def test_get_ontology_descendants(self):
+        index = LocalOntologyIndex(EDGES)
+        resp = index.get_ontology_descendants(
+                ['MONDO:0005148', 'MONDO:9999999'],
+                BIOLINK_DISEASE_ENTITY,
+                )
+        self.assertDictEqual(resp, {'MONDO:0005148': ['MONDO:0005148', 'MONDO:0014488']})
+
+    def test_category_filter(self):
+        categories = {'MONDO:0014488': [BIOLINK_PHENOTYPIC_FEATURE_ENTITY.get_curie()]}
+        index = LocalOntologyIndex(EDGES, categories=categories)
+        self.assertListEqual(
+                index.descendants('MONDO:0005148', BIOLINK_DISEASE_ENTITY),
+                ['MONDO:0005148'],
+                )
+
+    def write_tsv(self, lines):
+        f_ = tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False)
+        self.addCleanup(os.remove, f_.name)
+        with f_:
+            f_.write('\n'.join(lines) + '\n')
+        return f_.name
+
+    def test_load_tsv(self):
+        filename = self.write_tsv(
+                ['object\tpredicate\tsubject'] + ['\t'.join((o, p, s)) for s, p, o in EDGES]
+                )
+        index = LocalOntologyIndex.load(filename)
+        self.assertListEqual(
+                index.descendants('MONDO:0005015'),
+                ['MONDO:0005015', 'MONDO:0005148', 'MONDO:0014488'],
+                )
+
+    def test_load_tsv_without_predicate_column(self):
+        filename = self.write_tsv(['subject\tobject', 'MONDO:0005148\tMONDO:0005015'])
+        with self.assertRaises(ValueError) as context:
+            LocalOntologyIndex.load(filename)
+        self.assertIn(filename, str(context.exception))
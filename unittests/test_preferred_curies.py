@@ -0,0 +1,101 @@
+import unittest
+from types import SimpleNamespace
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+class Query:
+    def __init__(self, curie, categories=None):
+        self.message = SimpleNamespace(
+                query_graph=SimpleNamespace(
+                    nodes={"n0": SimpleNamespace(ids=[curie], categories=categories)},
+                    edges={},
+                    ),
+                )
+        self.logs = []
+
+    def info(self, message):
+        self.logs.append(('info', message))
+
+    def warning(self, message):
+        self.logs.append(('warning', message))
+
+    def error(self, message):
+        self.logs.append(('error', message))
+
+class NodeNormalizer:
+    def __init__(self, normalization_dict):
+        self.normalization_dict = normalization_dict
+
+    def get_normalized_nodes(self, curies):
+        return {curie: self.normalization_dict[curie] for curie in curies if curie in self.normalization_dict}
+
+class CountingQueryProcessor(BaseQueryProcessor):
+    def __init__(self):
+        super().__init__()
+        self.num_prefix_indexes = 0
+
+    def _get_prefix_index(self, normalization):
+        self.num_prefix_indexes += 1
+        return super()._get_prefix_index(normalization)
+
+class LegacyQueryProcessor(BaseQueryProcessor):
+    def _get_preferred(self, query, node, normalization_dict, meta_knowledge_graph):
+        return super()._get_preferred(query, node, normalization_dict, meta_knowledge_graph)
+
+class TestPreferredCuries(unittest.TestCase):
+
+    def setUp(self):
+        named_thing = get_biolink_entity(BIOLINK_NAMED_THING)
+        self.meta_knowledge_graph = SimpleNamespace(
+                nodes={
+                    BIOLINK_GENE_ENTITY: SimpleNamespace(id_prefixes=["NCBIGene", "HGNC"]),
+                    named_thing: SimpleNamespace(id_prefixes=["ENSEMBL"]),
+                    },
+                edges=[],
+                )
+        self.node_normalizer = NodeNormalizer({
+            "HGNC:1": {
+                "types": [BIOLINK_GENE_ENTITY],
+                "equivalent_identifier": [
+                    {"identifier": "HGNC:1"},
+                    {"identifier": "NCBIGene:9"},
+                    {"identifier": "NCBIGene:10"},
+                    ],
+                },
+            "HGNC:2": {
+                "types": [BIOLINK_GENE_ENTITY, named_thing],
+                "equivalent_identifier": [{"identifier": "NCBIGene:2"}, {"identifier": "ENSEMBL:2"}],
+                },
+            })
+
+    def normalize(self, query_processor, queries):
+        return query_processor.normalize_to_preferred(
+                queries,
+                self.meta_knowledge_graph,
+                with_normalization_map=True,
+                node_normalizer_client=self.node_normalizer,
+                )
+
+    def test_prefix_indexes(self):
+        query_processor = CountingQueryProcessor()
+        queries = [Query("HGNC:1", [BIOLINK_GENE_ENTITY]), Query("HGNC:1"), Query("HGNC:2")]
+        queries, normalization_map = self.normalize(query_processor, queries)
+        nodes = [query.message.query_graph.nodes["n0"] for query in queries]
+        self.assertListEqual([node.ids for node in nodes], [["NCBIGene:9"], ["NCBIGene:9"], ["ENSEMBL:2"]])
+        self.assertListEqual([node.categories for node in nodes[:2]], [[BIOLINK_GENE_ENTITY], [BIOLINK_GENE_ENTITY]])
+        self.assertDictEqual(normalization_map, {"NCBIGene:9": "HGNC:1", "ENSEMBL:2": "HGNC:2"})
+        # Queries holding the same curie share its prefix index.
+        self.assertEqual(query_processor.num_prefix_indexes, 2)
+
+    def test_unknown_curie(self):
+        queries, normalization_map = self.normalize(BaseQueryProcessor(), [Query("HGNC:3"), Query("HGNC:1")])
+        self.assertListEqual([query.message.query_graph.nodes["n0"].ids for query in queries], [["NCBIGene:9"]])
+
+    def test_legacy_override(self):
+        with self.assertRaises(TypeError):
+            self.normalize(LegacyQueryProcessor(), [Query("HGNC:1")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import asyncio
+from unittest import mock
+
+from chp_utils.cache import LRUCache
+from chp_utils.profiling import StageProfiler, profile_stage
+from chp_utils.client import send_request, get_request_counts
+
+class Processor:
+    def __init__(self, profiler=None, cache=None):
+        self.profiler = profiler
+        self.cache = cache
+
+    @profile_stage('expand')
+    def expand(self, queries):
+        self.cache.get('missing')
+        return queries + queries
+
+    @profile_stage('filter')
+    async def filter(self, queries):
+        return queries[:1], queries[1:]
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_stages(self):
+        cache = LRUCache()
+        records = []
+        profiler = StageProfiler(callback=records.append, caches={"test": cache})
+        processor = Processor(profiler, cache)
+        queries = processor.expand(['q0', 'q1'])
+        asyncio.run(processor.filter(queries))
+        stages = profiler.to_dict()["stages"]
+        self.assertListEqual(records, stages)
+        self.assertListEqual([record["stage"] for record in stages], ['expand', 'filter'])
+        self.assertEqual(stages[0]["queries_in"], 2)
+        self.assertEqual(stages[0]["queries_out"], 4)
+        self.assertDictEqual(stages[0]["cache_misses"], {"test": 1})
+        self.assertEqual(stages[0]["http_requests"], 0)
+        self.assertEqual(stages[1]["queries_out"], 1)
+        self.assertListEqual(sorted(profiler.to_dict()["total_wall_time"]), ['expand', 'filter'])
+
+    def test_disabled(self):
+        processor = Processor(cache=LRUCache())
+        self.assertListEqual(processor.expand(['q0']), ['q0', 'q0'])
+
+    def test_request_counts(self):
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(from_cache=False)
+        session.post.return_value = mock.Mock(from_cache=True)
+        counts = get_request_counts()
+        # Requests are counted whichever way their query is passed.
+        send_request('get', 'http://localhost/', session=session, params={"q": 1})
+        send_request('post', 'http://localhost/', session=session, json={"q": 1})
+        send_request('post', 'http://localhost/', session=session, data='{"q": 1}')
+        new_counts = get_request_counts()
+        self.assertEqual(new_counts["requests"] - counts["requests"], 3)
+        self.assertEqual(new_counts["from_cache"] - counts["from_cache"], 2)
+        session.post.assert_called_with('http://localhost/', data='{"q": 1}')
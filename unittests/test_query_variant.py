@@ -0,0 +1,114 @@
+import unittest
+from copy import deepcopy
+from types import SimpleNamespace
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.query_variant import QueryVariant, as_query_variant, materialize
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+class Logger:
+    def __init__(self):
+        self.logs = []
+
+    def add_logs(self, logs):
+        self.logs.extend(logs)
+
+    def to_dict(self):
+        return list(self.logs)
+
+class Query:
+    num_copies = 0
+
+    def __init__(self, subject_categories, predicates, object_categories):
+        self.message = SimpleNamespace(
+                query_graph=SimpleNamespace(
+                    nodes={
+                        "n0": SimpleNamespace(ids=["CURIE:A"], categories=subject_categories),
+                        "n1": SimpleNamespace(ids=None, categories=object_categories),
+                        },
+                    edges={"e0": SimpleNamespace(subject="n0", object="n1", predicates=predicates)},
+                    ),
+                )
+        self.logger = Logger()
+
+    def get_copy(self):
+        Query.num_copies += 1
+        return deepcopy(self)
+
+    def info(self, message):
+        self.logger.logs.append(('info', message))
+
+    def warning(self, message):
+        self.logger.logs.append(('warning', message))
+
+    def error(self, message):
+        self.logger.logs.append(('error', message))
+
+class TestQueryVariant(unittest.TestCase):
+
+    def setUp(self):
+        Query.num_copies = 0
+        self.query = Query([BIOLINK_GENE_ENTITY], [BIOLINK_RELATED_TO_ENTITY], [BIOLINK_DISEASE_ENTITY])
+
+    def test_materialize(self):
+        variant = QueryVariant(self.query, node_ids={"n1": ["CURIE:B"]}, node_categories={"n1": [BIOLINK_DRUG_ENTITY]})
+        variant.info('first')
+        variant.add_logs([('info', 'merged')])
+        variant.error('last')
+        query = variant.materialize()
+        query_graph = query.message.query_graph
+        self.assertListEqual(query_graph.nodes["n1"].ids, ["CURIE:B"])
+        self.assertListEqual(query_graph.nodes["n1"].categories, [BIOLINK_DRUG_ENTITY])
+        self.assertListEqual(query_graph.edges["e0"].predicates, [BIOLINK_RELATED_TO_ENTITY])
+        self.assertListEqual(query.logger.logs, [('info', 'first'), ('info', 'merged'), ('error', 'last')])
+        self.assertEqual(Query.num_copies, 1)
+        self.assertIsNone(self.query.message.query_graph.nodes["n1"].ids)
+        self.assertListEqual(self.query.logger.logs, [])
+
+    def test_copy_on_write(self):
+        variant = as_query_variant(self.query)
+        self.assertIs(as_query_variant(variant), variant)
+        drug = variant.derive(node_categories={"n1": [BIOLINK_DRUG_ENTITY]})
+        drug.info('drug')
+        gene = drug.derive(node_categories={"n1": [BIOLINK_GENE_ENTITY]})
+        gene.info('gene')
+        self.assertIs(gene.base_query, self.query)
+        self.assertListEqual(variant.get_node_categories("n1"), [BIOLINK_DISEASE_ENTITY])
+        self.assertListEqual(drug.get_node_categories("n1"), [BIOLINK_DRUG_ENTITY])
+        self.assertListEqual(gene.get_node_categories("n1"), [BIOLINK_GENE_ENTITY])
+        self.assertListEqual(drug.logs, [('info', 'drug')])
+        self.assertListEqual(gene.logs, [('info', 'drug'), ('info', 'gene')])
+        self.assertEqual(Query.num_copies, 0)
+        self.assertIs(materialize(self.query), self.query)
+        self.assertEqual(Query.num_copies, 0)
+
+    def test_filter(self):
+        meta_knowledge_graph = SimpleNamespace(
+                nodes={
+                    BIOLINK_GENE_ENTITY: SimpleNamespace(id_prefixes=["CURIE"]),
+                    BIOLINK_DRUG_ENTITY: SimpleNamespace(id_prefixes=["CURIE"]),
+                    },
+                edges=[SimpleNamespace(subject=BIOLINK_GENE_ENTITY, predicate=BIOLINK_RELATED_TO_ENTITY, object=BIOLINK_DRUG_ENTITY)],
+                )
+        variant = as_query_variant(self.query)
+        variants = [
+                variant.derive(node_categories={"n1": [BIOLINK_DRUG_ENTITY]}),
+                variant.derive(node_categories={"n1": [BIOLINK_GENE_ENTITY]}),
+                variant.derive(node_categories={"n1": [BIOLINK_DRUG_ENTITY]}),
+                ]
+        consistent_queries, inconsistent_queries = BaseQueryProcessor().filter_queries_inconsistent_with_meta_knowledge_graph(
+                variants,
+                meta_knowledge_graph,
+                with_inconsistent_queries=True,
+                )
+        self.assertEqual(Query.num_copies, 1)
+        self.assertEqual(len(consistent_queries), 1)
+        self.assertIsInstance(consistent_queries[0], Query)
+        self.assertListEqual(consistent_queries[0].message.query_graph.nodes["n1"].categories, [BIOLINK_DRUG_ENTITY])
+        self.assertListEqual(inconsistent_queries, variants[1:])
+        self.assertListEqual(variants[1].logs, [('error', 'Edge predicate subject/object mismatch with meta knowledge graph.')])
+        self.assertListEqual(variants[2].logs, [('error', 'Duplicate query.')])
+
+if __name__ == '__main__':
+    unittest.main()
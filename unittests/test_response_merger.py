@@ -0,0 +1,102 @@
+import unittest
+from types import SimpleNamespace
+
+from chp_utils.response_merger import ResponseMerger, get_result_key
+
+class Logger:
+    def __init__(self, logs=None):
+        self.logs = list(logs or [])
+
+    def add_logs(self, logs):
+        self.logs.extend(logs)
+
+    def to_dict(self):
+        return list(self.logs)
+
+class Message:
+    def __init__(self, knowledge_graph=None, results=None):
+        self.knowledge_graph = knowledge_graph
+        self.results = results
+
+    def update(self, knowledge_graph, results):
+        self.knowledge_graph = knowledge_graph
+        self.results = results
+
+class Query:
+    def __init__(self, message, logs=None):
+        self.message = message
+        self.logger = Logger(logs)
+
+    def get_copy(self):
+        return Query(Message(), self.logger.to_dict())
+
+def build_response(edge_id, subject, object, logs=None):
+    knowledge_graph = SimpleNamespace(
+            nodes={subject: SimpleNamespace(), object: SimpleNamespace()},
+            edges={edge_id: SimpleNamespace(subject=subject, predicate='biolink:treats', object=object)},
+            )
+    results = [
+            SimpleNamespace(
+                node_bindings={"n0": [SimpleNamespace(id=subject)], "n1": [SimpleNamespace(id=object)]},
+                edge_bindings={"e0": [SimpleNamespace(id=edge_id)]},
+                ),
+            ]
+    return Query(Message(knowledge_graph, results), logs)
+
+class TestResponseMerger(unittest.TestCase):
+
+    def test_edge_id_collision(self):
+        merger = ResponseMerger(Query(Message()))
+        merger.add(build_response('kge0', 'CURIE:A', 'CURIE:B'))
+        merger.add(build_response('kge0', 'CURIE:A', 'CURIE:C'))
+        response_query = merger.finalize()
+        knowledge_graph = response_query.message.knowledge_graph
+        self.assertListEqual(list(knowledge_graph.nodes), ['CURIE:A', 'CURIE:B', 'CURIE:C'])
+        self.assertListEqual(list(knowledge_graph.edges), ['kge0', 'kge0_1'])
+        self.assertEqual(knowledge_graph.edges['kge0_1'].object, 'CURIE:C')
+        results = response_query.message.results
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[1].edge_bindings["e0"][0].id, 'kge0_1')
+
+    def test_duplicates(self):
+        merger = ResponseMerger(Query(Message()))
+        merger.add_many([
+            build_response('kge0', 'CURIE:A', 'CURIE:B', logs=['first']),
+            build_response('kge0', 'CURIE:A', 'CURIE:B', logs=['second']),
+            ])
+        self.assertEqual(len(merger), 2)
+        response_query = merger.finalize()
+        self.assertListEqual(list(response_query.message.knowledge_graph.edges), ['kge0'])
+        self.assertEqual(len(response_query.message.results), 1)
+        self.assertListEqual(response_query.logger.to_dict(), ['first', 'second'])
+
+    def test_sub_responses_untouched(self):
+        first = build_response('kge0', 'CURIE:A', 'CURIE:B')
+        knowledge_graph = first.message.knowledge_graph
+        merger = ResponseMerger(Query(Message()))
+        merger.add(first)
+        merger.add(build_response('kge1', 'CURIE:A', 'CURIE:C'))
+        response_query = merger.finalize()
+        self.assertIsNot(response_query.message.knowledge_graph, knowledge_graph)
+        self.assertListEqual(list(knowledge_graph.nodes), ['CURIE:A', 'CURIE:B'])
+        self.assertListEqual(list(knowledge_graph.edges), ['kge0'])
+        self.assertEqual(len(first.message.results), 1)
+
+    def test_result_key(self):
+        result = build_response('kge0', 'CURIE:A', 'CURIE:B').message.results[0]
+        reordered = SimpleNamespace(
+                node_bindings={"n1": SimpleNamespace(id='CURIE:B'), "n0": [SimpleNamespace(id='CURIE:A')]},
+                edge_bindings={"e0": [SimpleNamespace(id='kge0')]},
+                )
+        self.assertEqual(get_result_key(result), get_result_key(reordered))
+
+    def test_finalized(self):
+        merger = ResponseMerger(Query(Message()))
+        response_query = merger.finalize()
+        self.assertIsNone(response_query.message.knowledge_graph)
+        self.assertIs(merger.finalize(), response_query)
+        with self.assertRaises(RuntimeError):
+            merger.add(build_response('kge0', 'CURIE:A', 'CURIE:B'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from types import SimpleNamespace
+
+from trapi_model.biolink.constants import *
+
+from chp_utils.query_variant import QueryVariant
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+from test_query_variant import Query
+
+class TestSemanticOpsExpansion(unittest.TestCase):
+
+    def setUp(self):
+        Query.num_copies = 0
+        # Categories of n1 expand to Disease, Drug and Gene, of which only Drug is consistent.
+        self.query = Query([BIOLINK_GENE_ENTITY], [BIOLINK_RELATED_TO_ENTITY], None)
+        self.meta_knowledge_graph = SimpleNamespace(
+                nodes={
+                    BIOLINK_GENE_ENTITY: SimpleNamespace(id_prefixes=["CURIE"]),
+                    BIOLINK_DRUG_ENTITY: SimpleNamespace(id_prefixes=["CURIE"]),
+                    BIOLINK_DISEASE_ENTITY: SimpleNamespace(id_prefixes=["CURIE"]),
+                    },
+                edges=[SimpleNamespace(subject=BIOLINK_GENE_ENTITY, predicate=BIOLINK_RELATED_TO_ENTITY, object=BIOLINK_DRUG_ENTITY)],
+                )
+
+    def get_categories(self, queries):
+        return [query.message.query_graph.nodes["n1"].categories for query in queries]
+
+    def test_expand(self):
+        queries = BaseQueryProcessor().expand_with_semantic_ops([self.query], self.meta_knowledge_graph)
+        self.assertListEqual(
+                self.get_categories(queries),
+                [[BIOLINK_DISEASE_ENTITY], [BIOLINK_DRUG_ENTITY], [BIOLINK_GENE_ENTITY]],
+                )
+        self.assertEqual(Query.num_copies, 3)
+
+    def test_max_expansions(self):
+        queries = BaseQueryProcessor().expand_with_semantic_ops([self.query], self.meta_knowledge_graph, max_expansions=2)
+        self.assertListEqual(self.get_categories(queries), [[BIOLINK_DISEASE_ENTITY], [BIOLINK_DRUG_ENTITY]])
+        warning = ('warning', 'Stopped semantic operations expansion after 2 expanded queries.')
+        self.assertNotIn(warning, queries[0].logger.logs)
+        self.assertEqual(queries[1].logger.logs[-1], warning)
+        self.assertListEqual(self.query.logger.logs, [])
+
+    def test_max_expansions_reached_before_any_query(self):
+        queries = BaseQueryProcessor().expand_with_semantic_ops([self.query], self.meta_knowledge_graph, max_expansions=0)
+        self.assertListEqual(queries, [])
+        self.assertListEqual(
+                self.query.logger.logs,
+                [('warning', 'Stopped semantic operations expansion after 0 expanded queries.')],
+                )
+
+    def test_prune_inconsistent(self):
+        processor = BaseQueryProcessor()
+        queries = processor.expand_with_semantic_ops(
+                [self.query],
+                self.meta_knowledge_graph,
+                prune_inconsistent=True,
+                materialize=False,
+                )
+        self.assertEqual(len(queries), 1)
+        self.assertIsInstance(queries[0], QueryVariant)
+        self.assertEqual(Query.num_copies, 0)
+        self.assertListEqual(queries[0].get_node_categories("n1"), [BIOLINK_DRUG_ENTITY])
+        filtered_queries = processor.filter_queries_inconsistent_with_meta_knowledge_graph(queries, self.meta_knowledge_graph)
+        self.assertListEqual(self.get_categories(filtered_queries), [[BIOLINK_DRUG_ENTITY]])
+        self.assertEqual(Query.num_copies, 1)
+
+if __name__ == '__main__':
+    unittest.main()
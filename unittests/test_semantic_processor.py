@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from chp_utils.semantic_operations.semantic_processor import (
+        SemanticProcessor,
+        invalidate_descendant_lookup_cache,
+        get_descendant_lookup_stats,
+        )
+from chp_utils.semantic_operations.biolink_hierarchy import BiolinkHierarchy
+from chp_utils.client import get_request_counts
+
+def mock_response(body, status_code=200):
+    response = mock.Mock(status_code=status_code, from_cache=False)
+    response.json.return_value = body
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError('{} error'.format(status_code))
+    return response
+
+class TestSemanticProcessor(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_descendant_lookup_cache()
+        patcher = mock.patch('chp_utils.client.get_session')
+        self.get = patcher.start().return_value.get
+        self.addCleanup(patcher.stop)
+
+    def test_local_table_default(self):
+        semantic_processor = SemanticProcessor()
+        descendants = semantic_processor._biolink_category_descendent_lookup('biolink:NamedThing')
+        self.assertIsInstance(descendants, frozenset)
+        self.assertIn('biolink:Gene', descendants)
+        self.assertNotIn('biolink:NamedThing', descendants)
+        self.assertIs(SemanticProcessor().biolink_hierarchy, semantic_processor.biolink_hierarchy)
+        self.get.assert_not_called()
+
+    def test_saved_table(self):
+        biolink_hierarchy = BiolinkHierarchy({'biolink:Gene': ['biolink:Protein']}, biolink_version='2.2.0')
+        semantic_processor = SemanticProcessor(biolink_hierarchy=biolink_hierarchy, biolink_version='2.2.0')
+        self.assertEqual(semantic_processor._biolink_category_descendent_lookup('biolink:Gene'), frozenset(['biolink:Protein']))
+        self.assertEqual(semantic_processor._biolink_category_descendent_lookup('biolink:Drug'), frozenset())
+        with self.assertRaises(ValueError):
+            SemanticProcessor(biolink_version='2.2.0')
+        self.get.assert_not_called()
+
+    def test_remote_lookup(self):
+        self.get.return_value = mock_response(['biolink:Protein'])
+        semantic_processor = SemanticProcessor(use_remote_lookup=True)
+        self.assertIsNone(semantic_processor.biolink_hierarchy)
+        num_requests = get_request_counts()["requests"]
+        self.assertEqual(semantic_processor._biolink_category_descendent_lookup('biolink:Gene'), frozenset(['biolink:Protein']))
+        self.get.assert_called_once_with('https://bl-lookup-sri.renci.org/bl/biolink:Gene/descendants?version=latest')
+        self.assertEqual(get_request_counts()["requests"], num_requests + 1)
+
+    def test_remote_lookup_error(self):
+        self.get.return_value = mock_response({'detail': 'Not Found'}, status_code=404)
+        semantic_processor = SemanticProcessor(use_remote_lookup=True, biolink_version='2.2.0')
+        with self.assertRaises(requests.HTTPError):
+            semantic_processor._biolink_category_descendent_lookup('biolink:Gene')
+
+    def test_memoized_remote_lookup(self):
+        self.get.return_value = mock_response(['biolink:Protein'])
+        semantic_processor = SemanticProcessor(use_remote_lookup=True)
+        stats = get_descendant_lookup_stats()
+        for _ in range(2):
+            self.assertEqual(semantic_processor._biolink_category_descendent_lookup('biolink:Gene'), frozenset(['biolink:Protein']))
+        self.assertEqual(SemanticProcessor(use_remote_lookup=True)._biolink_category_descendent_lookup('biolink:Gene'), frozenset(['biolink:Protein']))
+        self.assertEqual(self.get.call_count, 1)
+        new_stats = get_descendant_lookup_stats()
+        self.assertEqual((new_stats["hits"] - stats["hits"], new_stats["misses"] - stats["misses"]), (2, 1))
+        # Other Biolink versions are looked up separately.
+        SemanticProcessor(use_remote_lookup=True, biolink_version='2.2.0')._biolink_category_descendent_lookup('biolink:Gene')
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_failed_remote_lookup_not_memoized(self):
+        semantic_processor = SemanticProcessor(use_remote_lookup=True)
+        self.get.return_value = mock_response({'detail': 'Service Unavailable'}, status_code=503)
+        with self.assertRaises(requests.HTTPError):
+            semantic_processor._biolink_category_descendent_lookup('biolink:Gene')
+        self.get.return_value = mock_response({'detail': 'Not a list'})
+        with self.assertRaises(ValueError):
+            semantic_processor._biolink_category_descendent_lookup('biolink:Gene')
+        self.get.return_value = mock_response(['biolink:Protein'])
+        self.assertEqual(semantic_processor._biolink_category_descendent_lookup('biolink:Gene'), frozenset(['biolink:Protein']))
+        self.assertEqual(self.get.call_count, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,23 @@ import unittest
 import logging
 import json
 import sys
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
 
 import trapi_model
 trapi_model.set_biolink_debug_mode(False)
 from trapi_model.query import Query
 from trapi_model.biolink.constants import *
 
-from chp_utils import SriNodeNormalizerApiClient
+from chp_utils import SriNodeNormalizerApiClient, AsyncSriNodeNormalizerApiClient
+from chp_utils.exceptions import SriNodeNormalizerException
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+from test_preferred_curies import Query as CurieQuery
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -18,6 +28,38 @@ logger.addHandler(stream_handler)
 logger_root = logging.getLogger()
 logger_root.setLevel(logging.INFO)
 
+class NodeNormalizerSession:
+    """ Stand-in for a requests session that answers node normalizer posts. Each curie in failures makes
+    the posts of its chunk fail that many times.
+    """
+    def __init__(self, failures=None, exception=None, equivalent_identifiers=None):
+        self.equivalent_identifiers = equivalent_identifiers or {}
+        self.failures = dict(failures or {})
+        self.exception = exception
+        self.posted_chunks = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json=None):
+        curies = json["curies"]
+        with self.lock:
+            self.posted_chunks.append(curies)
+            failed = [curie for curie in curies if self.failures.get(curie, 0) > 0]
+            for curie in failed:
+                self.failures[curie] -= 1
+        if len(failed) > 0 and self.exception is not None:
+            raise self.exception
+        response = mock.Mock(status_code=500 if len(failed) > 0 else 200, from_cache=False, content=b'')
+        response.json.return_value = {
+                curie: {
+                    "equivalent_identifiers": [
+                        {"identifier": identifier} for identifier in self.equivalent_identifiers.get(curie, [curie])
+                        ],
+                    "type": ["biolink:Gene"],
+                    }
+                for curie in curies
+                }
+        return response
+
 class TestSriNodeNormalizerApiClient(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -58,3 +100,82 @@ class TestSriNodeNormalizerApiClient(unittest.TestCase):
                 )
         self.assertDictEqual(resp, saved_resp)
 
+class TestChunkedNormalization(unittest.TestCase):
+    CURIES = ["HGNC:1", "HGNC:2", "HGNC:3", "HGNC:4", "HGNC:5", "HGNC:1"]
+
+    def get_client(self, session):
+        client = SriNodeNormalizerApiClient(session=session)
+        client.normalization_cache = None
+        return client
+
+    def test_chunks(self):
+        session = NodeNormalizerSession()
+        resp = self.get_client(session).get_normalized_nodes(self.CURIES, chunk_size=2, verbose=False)
+        self.assertListEqual(list(resp), ["HGNC:1", "HGNC:2", "HGNC:3", "HGNC:4", "HGNC:5"])
+        self.assertListEqual(resp["HGNC:3"]["equivalent_identifier"], [{"identifier": "HGNC:3"}])
+        self.assertListEqual(
+                sorted(session.posted_chunks),
+                [["HGNC:1", "HGNC:2"], ["HGNC:3", "HGNC:4"], ["HGNC:5"]],
+                )
+
+    def test_retry_failed_chunks(self):
+        for exception in [None, requests.RequestException('Connection reset')]:
+            session = NodeNormalizerSession(failures={"HGNC:3": 2}, exception=exception)
+            resp = self.get_client(session).get_normalized_nodes(self.CURIES, chunk_size=2, verbose=False)
+            self.assertListEqual(list(resp), ["HGNC:1", "HGNC:2", "HGNC:3", "HGNC:4", "HGNC:5"])
+            # Only the failed chunk is retried.
+            self.assertEqual(len(session.posted_chunks), 5)
+            self.assertListEqual(session.posted_chunks[-2:], [["HGNC:3", "HGNC:4"], ["HGNC:3", "HGNC:4"]])
+
+    def test_last_attempt_fails(self):
+        session = NodeNormalizerSession(failures={"HGNC:3": 3})
+        with self.assertRaises(SriNodeNormalizerException):
+            self.get_client(session).get_normalized_nodes(self.CURIES, chunk_size=2, verbose=False)
+        self.assertEqual(session.posted_chunks.count(["HGNC:3", "HGNC:4"]), 3)
+
+        session = NodeNormalizerSession(failures={"HGNC:3": 1}, exception=requests.RequestException('Connection reset'))
+        with self.assertRaises(requests.RequestException):
+            self.get_client(session).get_normalized_nodes(["HGNC:3"], chunk_retries=0, verbose=False)
+        self.assertEqual(len(session.posted_chunks), 1)
+
+class TestAsyncNormalization(unittest.TestCase):
+
+    def setUp(self):
+        self.session = NodeNormalizerSession(equivalent_identifiers={"HGNC:1": ["HGNC:1", "NCBIGene:9"]})
+        self.meta_knowledge_graph = SimpleNamespace(
+                nodes={BIOLINK_GENE_ENTITY: SimpleNamespace(id_prefixes=["NCBIGene"])},
+                edges=[],
+                )
+
+    def get_client(self):
+        client = AsyncSriNodeNormalizerApiClient(session=self.session)
+        client.normalization_cache = None
+        return client
+
+    def test_get_normalized_nodes(self):
+        resp = asyncio.run(self.get_client().get_normalized_nodes(["HGNC:1", "HGNC:2", "HGNC:3"], chunk_size=2, verbose=False))
+        self.assertListEqual(list(resp), ["HGNC:1", "HGNC:2", "HGNC:3"])
+        self.assertListEqual(resp["HGNC:1"]["equivalent_identifier"], [{"identifier": "HGNC:1"}, {"identifier": "NCBIGene:9"}])
+        self.assertListEqual(sorted(self.session.posted_chunks), [["HGNC:1", "HGNC:2"], ["HGNC:3"]])
+
+    def test_normalize_to_preferred_async(self):
+        queries, normalization_map = asyncio.run(BaseQueryProcessor().normalize_to_preferred_async(
+                [CurieQuery("HGNC:1", [BIOLINK_GENE_ENTITY])],
+                self.meta_knowledge_graph,
+                with_normalization_map=True,
+                node_normalizer_client=self.get_client(),
+                ))
+        self.assertListEqual(queries[0].message.query_graph.nodes["n0"].ids, ["NCBIGene:9"])
+        self.assertDictEqual(normalization_map, {"NCBIGene:9": "HGNC:1"})
+        self.assertListEqual(self.session.posted_chunks, [["HGNC:1"]])
+
+    def test_default_client(self):
+        # Without an explicit client, the processor's client sends its requests through the pooled session.
+        with mock.patch('chp_utils.client.get_session', return_value=self.session):
+            with mock.patch.object(AsyncSriNodeNormalizerApiClient, 'normalization_cache', None):
+                queries = asyncio.run(BaseQueryProcessor().normalize_to_preferred_async(
+                        [CurieQuery("HGNC:1", [BIOLINK_GENE_ENTITY])],
+                        self.meta_knowledge_graph,
+                        ))
+        self.assertListEqual(queries[0].message.query_graph.nodes["n0"].ids, ["NCBIGene:9"])
+        self.assertListEqual(self.session.posted_chunks, [["HGNC:1"]])
@@ -2,10 +2,13 @@ import unittest
 import logging
 import json
 import sys
+import asyncio
+from unittest import mock
 
 from trapi_model.biolink.constants import *
 
-from chp_utils import SriOntologyKpApiClient
+from chp_utils import SriOntologyKpApiClient, AsyncSriOntologyKpApiClient
+from chp_utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -15,6 +18,27 @@ logger.addHandler(stream_handler)
 logger_root = logging.getLogger()
 logger_root.setLevel(logging.INFO)
 
+class OntologyKpSession:
+    """ Stand-in for a requests session that answers Ontology KP posts from a curie to descendants map.
+    """
+    def __init__(self, descendants):
+        self.descendants = descendants
+        self.posted_curies = []
+
+    def post(self, url, json=None):
+        curies = json["message"]["query_graph"]["nodes"]["n0"]["ids"]
+        self.posted_curies.append(curies)
+        response = mock.Mock(status_code=200, from_cache=False)
+        response.json.return_value = {
+                "message": {
+                    "results": [
+                        {"node_bindings": {"n0": [{"id": curie}], "n1": [{"id": descendant}]}}
+                        for curie in curies for descendant in self.descendants.get(curie, [])
+                        ],
+                    },
+                }
+        return response
+
 class TestSriNodeNormalizerApiClient(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -32,3 +56,65 @@ class TestSriNodeNormalizerApiClient(unittest.TestCase):
                 )
         for curie in resp:
             self.assertSetEqual(set(resp[curie]), set(saved_resp[curie]))
+
+class TestAsyncSriOntologyKpApiClient(unittest.TestCase):
+
+    def test_get_ontology_descendants(self):
+        session = OntologyKpSession({"MONDO:0005015": ["MONDO:0005015", "MONDO:0005148"]})
+        client = AsyncSriOntologyKpApiClient(session=session)
+        client.descendant_cache = None
+        resp = asyncio.run(client.get_ontology_descendants(
+                ["MONDO:0005015", "MONDO:9999999"],
+                BIOLINK_DISEASE_ENTITY,
+                verbose=False,
+                ))
+        self.assertDictEqual(resp, {"MONDO:0005015": ["MONDO:0005015", "MONDO:0005148"]})
+        self.assertListEqual(session.posted_curies, [["MONDO:0005015", "MONDO:9999999"]])
+
+class TestDescendantCache(unittest.TestCase):
+
+    def setUp(self):
+        self.session = OntologyKpSession({"MONDO:0005015": ["MONDO:0005015", "MONDO:0005148"]})
+        self.client = SriOntologyKpApiClient(session=self.session)
+        self.client.descendant_cache = LRUCache(ttl=60)
+
+    def get_descendants(self, curies, biolink_entity=BIOLINK_DISEASE_ENTITY):
+        return self.client.get_ontology_descendants(curies, biolink_entity, verbose=False)
+
+    def test_hits_and_misses(self):
+        expected = {"MONDO:0005015": ["MONDO:0005015", "MONDO:0005148"]}
+        self.assertDictEqual(self.get_descendants(["MONDO:0005015"]), expected)
+        self.assertDictEqual(self.get_descendants(["MONDO:0005015"]), expected)
+        self.assertListEqual(self.session.posted_curies, [["MONDO:0005015"]])
+        # Only curies missing from the cache are sent.
+        self.get_descendants(["MONDO:0005015", "MONDO:0005148"])
+        self.assertListEqual(self.session.posted_curies[-1], ["MONDO:0005148"])
+        # Entries are keyed by biolink entity.
+        self.get_descendants(["MONDO:0005015"], BIOLINK_PHENOTYPIC_FEATURE_ENTITY)
+        self.assertListEqual(self.session.posted_curies[-1], ["MONDO:0005015"])
+        self.assertEqual(len(self.session.posted_curies), 3)
+        stats = self.client.descendant_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+
+    def test_cached_negatives(self):
+        self.assertDictEqual(self.get_descendants(["MONDO:9999999"]), {})
+        self.assertTupleEqual(
+                self.client.descendant_cache.get((self.client.url, BIOLINK_DISEASE_ENTITY.get_curie(), "MONDO:9999999")),
+                (),
+                )
+        self.assertDictEqual(self.get_descendants(["MONDO:9999999"]), {})
+        self.assertEqual(len(self.session.posted_curies), 1)
+
+    def test_ttl(self):
+        with mock.patch('chp_utils.cache.time.monotonic', return_value=0):
+            self.get_descendants(["MONDO:0005015", "MONDO:9999999"])
+        with mock.patch('chp_utils.cache.time.monotonic', return_value=59):
+            self.get_descendants(["MONDO:0005015", "MONDO:9999999"])
+        self.assertEqual(len(self.session.posted_curies), 1)
+        with mock.patch('chp_utils.cache.time.monotonic', return_value=61):
+            self.assertDictEqual(
+                    self.get_descendants(["MONDO:0005015", "MONDO:9999999"]),
+                    {"MONDO:0005015": ["MONDO:0005015", "MONDO:0005148"]},
+                    )
+        self.assertListEqual(self.session.posted_curies[-1], ["MONDO:0005015", "MONDO:9999999"])
+        self.assertEqual(self.client.descendant_cache.stats()["expirations"], 2)
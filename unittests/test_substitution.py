@@ -0,0 +1,133 @@
+import unittest
+import json
+from types import SimpleNamespace
+
+import trapi_model
+trapi_model.set_biolink_debug_mode(False)
+from trapi_model.query import Query
+from trapi_model.biolink.constants import *
+
+from chp_utils.substitution import CurieSubstitutionIndex, KNOWLEDGE_GRAPH_EDGE_SUBJECT
+from chp_utils.trapi_query_processor import BaseQueryProcessor
+
+def build_message():
+    return SimpleNamespace(
+            query_graph=SimpleNamespace(
+                nodes={
+                    "n0": SimpleNamespace(ids=["CURIE:A"], categories=[BIOLINK_GENE_ENTITY]),
+                    "n1": SimpleNamespace(ids=["CURIE:B"], categories=[BIOLINK_DRUG_ENTITY]),
+                    },
+                edges={"e0": SimpleNamespace(predicates=[get_biolink_entity("biolink:treats")])},
+                ),
+            knowledge_graph=SimpleNamespace(
+                nodes={
+                    "CURIE:A": SimpleNamespace(categories=[BIOLINK_GENE_ENTITY]),
+                    "CURIE:B": SimpleNamespace(categories=[BIOLINK_DRUG_ENTITY]),
+                    },
+                edges={
+                    "kge0": SimpleNamespace(
+                        subject="CURIE:A",
+                        object="CURIE:B",
+                        predicate=get_biolink_entity("biolink:treats"),
+                        ),
+                    },
+                ),
+            results=[
+                SimpleNamespace(node_bindings={
+                    "n0": [SimpleNamespace(id="CURIE:A")],
+                    "n1": [SimpleNamespace(id="CURIE:B")],
+                    }),
+                ],
+            )
+
+class TestCurieSubstitutionIndex(unittest.TestCase):
+
+    def test_swap(self):
+        message = build_message()
+        substituted = CurieSubstitutionIndex(message).substitute({"CURIE:A": "CURIE:B", "CURIE:B": "CURIE:A"})
+        self.assertSetEqual(substituted, {"CURIE:A", "CURIE:B"})
+        self.assertListEqual(message.query_graph.nodes["n0"].ids, ["CURIE:B"])
+        self.assertListEqual(message.query_graph.nodes["n1"].ids, ["CURIE:A"])
+        edge = message.knowledge_graph.edges["kge0"]
+        self.assertEqual((edge.subject, edge.object), ("CURIE:B", "CURIE:A"))
+        bindings = message.results[0].node_bindings
+        self.assertEqual((bindings["n0"][0].id, bindings["n1"][0].id), ("CURIE:B", "CURIE:A"))
+
+    def test_no_chaining(self):
+        message = build_message()
+        index = CurieSubstitutionIndex(message)
+        index.substitute({"CURIE:A": "CURIE:C", "CURIE:C": "CURIE:D"})
+        self.assertListEqual(message.query_graph.nodes["n0"].ids, ["CURIE:C"])
+        self.assertNotIn("CURIE:A", index)
+        self.assertIn(
+                (KNOWLEDGE_GRAPH_EDGE_SUBJECT, message.knowledge_graph.edges["kge0"], None),
+                index.locations("CURIE:C"),
+                )
+
+    def test_knowledge_graph_node_keys(self):
+        message = build_message()
+        node = message.knowledge_graph.nodes["CURIE:A"]
+        CurieSubstitutionIndex(message).substitute({"CURIE:A": "CURIE:C"})
+        self.assertListEqual(list(message.knowledge_graph.nodes), ["CURIE:C", "CURIE:B"])
+        self.assertIs(message.knowledge_graph.nodes["CURIE:C"], node)
+
+    def test_entities(self):
+        message = build_message()
+        CurieSubstitutionIndex(message).substitute({
+            "biolink:Gene": "biolink:Protein",
+            "biolink:treats": "biolink:related_to",
+            })
+        self.assertListEqual(message.query_graph.nodes["n0"].categories, [get_biolink_entity("biolink:Protein")])
+        self.assertListEqual(message.query_graph.nodes["n1"].categories, [BIOLINK_DRUG_ENTITY])
+        self.assertListEqual(message.query_graph.edges["e0"].predicates, [BIOLINK_RELATED_TO_ENTITY])
+        self.assertListEqual(
+                message.knowledge_graph.nodes["CURIE:A"].categories,
+                [get_biolink_entity("biolink:Protein")],
+                )
+        self.assertEqual(message.knowledge_graph.edges["kge0"].predicate, BIOLINK_RELATED_TO_ENTITY)
+
+    def test_unchanged(self):
+        message = build_message()
+        self.assertSetEqual(CurieSubstitutionIndex(message).substitute({"CURIE:X": "CURIE:Y"}), set())
+        self.assertSetEqual(CurieSubstitutionIndex(message).substitute({"CURIE:A": "CURIE:A"}), set())
+        self.assertListEqual(message.query_graph.nodes["n0"].ids, ["CURIE:A"])
+
+    def test_find_and_replace_parity(self):
+        with open('query_samples/standard_batch_onehop_queries.json') as f_:
+            json_queries = json.load(f_)
+        mapping = {"biolink:ChemicalEntity": "biolink:Drug"}
+        for json_query in json_queries:
+            query = Query.load(json_query["trapi_version"], None, query=json_query)
+            for node in query.message.query_graph.nodes.values():
+                for i, curie in enumerate(node.ids or []):
+                    mapping[curie] = 'TEST:{}'.format(i)
+            expected = query.get_copy().message
+            for old, new in mapping.items():
+                expected = expected.find_and_replace(old, new)
+            CurieSubstitutionIndex(query.message).substitute(mapping)
+            self.assertDictEqual(query.message.to_dict(), expected.to_dict())
+
+    def test_node_key_collision(self):
+        message = build_message()
+        index = CurieSubstitutionIndex(message)
+        with self.assertRaises(ValueError):
+            index.substitute({"CURIE:A": "CURIE:B"})
+        with self.assertRaises(ValueError):
+            index.substitute({"CURIE:A": "CURIE:C", "CURIE:B": "CURIE:C"})
+        self.assertListEqual(list(message.knowledge_graph.nodes), ["CURIE:A", "CURIE:B"])
+        self.assertEqual(message.knowledge_graph.edges["kge0"].subject, "CURIE:A")
+        self.assertIn("CURIE:A", index)
+
+    def test_undo_normalization(self):
+        message = build_message()
+        response_query = SimpleNamespace(message=message)
+        processor = BaseQueryProcessor()
+        self.assertIs(processor.undo_normalization(response_query, {"CURIE:A": "CURIE:a"}), response_query)
+        self.assertListEqual(message.query_graph.nodes["n0"].ids, ["CURIE:a"])
+        self.assertListEqual(list(message.knowledge_graph.nodes), ["CURIE:a", "CURIE:B"])
+        self.assertEqual(message.knowledge_graph.edges["kge0"].subject, "CURIE:a")
+        self.assertEqual(message.results[0].node_bindings["n0"][0].id, "CURIE:a")
+        self.assertIs(processor.undo_normalization(response_query, {}), response_query)
+
+if __name__ == '__main__':
+    unittest.main()